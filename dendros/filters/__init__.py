@@ -0,0 +1 @@
+from .text import TextIn
@@ -0,0 +1,22 @@
+# filters/text.py
+from aiogram.filters import Filter
+from aiogram.types import Message
+
+
+class TextIn(Filter):
+    """
+    Точное совпадение текста сообщения с одним из вариантов (поиск в frozenset).
+
+    Замена F.text == ... / F.text.in_(...): магические фильтры синхронные, и
+    aiogram вычисляет каждый из них в пуле потоков — по прыжку на каждый
+    проверенный хендлер. Асинхронный фильтр выполняется прямо в цикле.
+    """
+
+    def __init__(self, *texts: str):
+        self.texts = frozenset(texts)
+
+    async def __call__(self, message: Message) -> bool:
+        return message.text in self.texts
+
+    def __str__(self) -> str:
+        return f"TextIn({', '.join(sorted(self.texts))})"
@@ -13,4 +13,5 @@ from .achievements import router as achievements
 from .leaderboard import router as leaderboard
 from .gallery_nav import router as gallery_nav
 from .search import router as search
-from .reviews import router as reviews
\ No newline at end of file
+from .reviews import router as reviews
+from .tournament import router as tournament
\ No newline at end of file
@@ -1,46 +1,105 @@
-from aiogram import Router, F
+import html
+import os
+
+from aiogram import Bot, Router
+from aiogram.filters import Filter
 from aiogram.types import Message
+from filters import TextIn
 
+from services import broadcast
 from services.db import list_users, add_event, get_events
+from services.messenger import send_text
+from services.quiz_bank import get_bank
+from services.quiz_stats import hardest
 
 router = Router()
 
-ADMIN_ID = 000000000  # ← обязательно замени на свой Telegram ID !!!
+ADMIN_ID = int(os.getenv("ADMIN_ID", "0"))  # ← обязательно укажи свой Telegram ID в .env !!!
+
+# Админы, от которых ждём текст объявления
+_awaiting_event: set = set()
 
-@router.message(F.text == "👑 Админ-панель")
+@router.message(TextIn("👑 Админ-панель"))
 async def admin_menu(message: Message):
     if message.from_user.id != ADMIN_ID:
-        return await message.answer("⛔ У вас нет доступа.")
+        return await send_text(message, "⛔ У вас нет доступа.")
 
     text = (
         "👑 *Админ-панель*\n"
         "Выберите действие:\n\n"
         "📢 Добавить объявление\n"
-        "👥 Список пользователей"
+        "📣 Разослать объявление\n"
+        "⏸ Остановить рассылку\n"
+        "👥 Список пользователей\n"
+        "📊 Сложные вопросы"
     )
 
-    await message.answer(text)
+    await send_text(message, text)
 
 # ---------- Добавление объявления ----------
 
-@router.message(F.text == "📢 Добавить объявление")
+@router.message(TextIn("📢 Добавить объявление"))
 async def ask_event(message: Message):
     if message.from_user.id != ADMIN_ID:
         return
 
-    await message.answer("Введите текст объявления:")
-    message.conf.set("event_mode", True)
+    await send_text(message, "Введите текст объявления:")
+    _awaiting_event.add(message.from_user.id)
 
-@router.message()
+class AwaitingEvent(Filter):
+    # асинхронный фильтр: без прыжка в пул потоков на каждое сообщение
+    async def __call__(self, message: Message) -> bool:
+        return message.from_user is not None and message.from_user.id in _awaiting_event
+
+@router.message(AwaitingEvent())
 async def save_event(message: Message):
-    if message.conf.get("event_mode"):
-        add_event(message.text)
-        message.conf["event_mode"] = False
-        await message.answer("✅ Объявление добавлено!")
+    _awaiting_event.discard(message.from_user.id)
+    # событие сразу попадает в индекс в памяти, запись на диск — в фоне
+    await add_event(message.text)
+    await send_text(message, "✅ Объявление добавлено!")
+
+# ---------- Рассылка объявления ----------
+
+@router.message(TextIn("📣 Разослать объявление"))
+async def admin_broadcast(message: Message, bot: Bot):
+    if message.from_user.id != ADMIN_ID:
+        return
+
+    job = broadcast.current()
+    if broadcast.is_running():
+        return await send_text(message, broadcast.progress_text(job))
+
+    # рассылается последнее добавленное объявление
+    events = await get_events()
+    if not events:
+        return await send_text(message, "Сначала добавьте объявление.")
+    event = max(events, key=lambda ev: ev.get("id", 0))
+
+    same = job is not None and job["event_id"] == event.get("id")
+    if same and job["state"] == "done":
+        # повторно то же объявление не рассылаем — для этого его нужно добавить заново
+        return await send_text(message, broadcast.progress_text(job))
+    # та же рассылка на паузе — продолжаем с сохранённой позиции
+    if not same:
+        job = broadcast.create(message.from_user.id, event)
+    report = await send_text(message, broadcast.progress_text(job))
+    job["report"] = [report.chat.id, report.message_id]
+    broadcast.start(bot)
+
+@router.message(TextIn("⏸ Остановить рассылку"))
+async def admin_broadcast_pause(message: Message):
+    if message.from_user.id != ADMIN_ID:
+        return
+
+    if not broadcast.is_running():
+        return await send_text(message, "Рассылка сейчас не идёт.")
+    # текущая пачка досылается, позиция сохраняется; продолжить — «📣 Разослать объявление»
+    broadcast.pause()
+    await send_text(message, "⏸ Рассылка будет остановлена после текущей пачки.")
 
 # ---------- Список пользователей ----------
 
-@router.message(F.text == "👥 Список пользователей")
+@router.message(TextIn("👥 Список пользователей"))
 async def admin_users(message: Message):
     if message.from_user.id != ADMIN_ID:
         return
@@ -48,10 +107,44 @@ async def admin_users(message: Message):
     users = list_users()
 
     if not users:
-        return await message.answer("Список пуст.")
+        return await send_text(message, "Список пуст.")
 
     text = "👥 *Список пользователей:*\n\n"
-    for uid, data in users.items():
-        text += f"• {uid} — {data.get('name', 'Unknown')}\n"
+    for data in users:
+        text += f"• {data.get('id')} — {data.get('name', 'Unknown')}\n"
+
+    await send_text(message, text)
+
+# ---------- Статистика викторины ----------
+
+@router.message(TextIn("📊 Сложные вопросы"))
+async def admin_hardest(message: Message):
+    if message.from_user.id != ADMIN_ID:
+        return
 
-    await message.answer(text)
+    rows = hardest(limit=10)
+    if not rows:
+        return await send_text(message, "Пока мало ответов для статистики.")
+
+    bank = get_bank()
+    text = "📊 *Сложные вопросы:*\n\n"
+    for i, row in enumerate(rows, 1):
+        idx = bank.find(row["key"])
+        if idx is None:
+            title, opts = f"(вопрос удалён, {row['key']})", []
+        else:
+            view = bank.view(idx, "ru")
+            title, opts = view.text.split("\n", 1)[0].lstrip("❓ "), view.opts
+        text += f"{i}. {html.escape(title)}\n"
+        text += f"   ❌ {row['wrong_rate']:.0%} неверных из {row['answered']}"
+        if row["timeouts"]:
+            text += f", ⏰ {row['timeouts']} по таймеру"
+        if row["median_latency"]:
+            text += f", ⏱ медиана ≤ {row['median_latency']} с"
+        text += "\n"
+        if row["picks"]:
+            top = max(range(len(row["picks"])), key=row["picks"].__getitem__)
+            if top < len(opts):
+                text += f"   Чаще всего выбирают: {html.escape(opts[top])}\n"
+
+    await send_text(message, text)
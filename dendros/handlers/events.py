@@ -1,20 +1,23 @@
-from aiogram import Router, F
+from aiogram import Router
 from aiogram.types import Message
+from filters import TextIn
 from services.db import ensure_user, get_lang, get_events
 from keyboards.main_kb import main_menu_kb
+from services.messenger import send_text
 
 router = Router()
 
 
-@router.message(F.text == "📅 Іс-шаралар")
+@router.message(TextIn("📅 Іс-шаралар"))
 async def cmd_events(message: Message):
     ensure_user(message.from_user.id, message.from_user.first_name)
     lang = get_lang(message.from_user.id)
 
-    events = get_events()
+    events = await get_events()
 
     if not events:
-        await message.answer(
+        await send_text(
+            message,
             "📅 Қазіргі уақытта ешқандай іс-шара жоқ.",
             reply_markup=main_menu_kb()
         )
@@ -30,4 +33,4 @@ async def cmd_events(message: Message):
             text += f"📝 {desc}\n"
         text += "\n"
 
-    await message.answer(text, parse_mode="Markdown", reply_markup=main_menu_kb())
+    await send_text(message, text, parse_mode="Markdown", reply_markup=main_menu_kb())
@@ -2,6 +2,7 @@ from aiogram import Router
 from aiogram.filters import Command
 from aiogram.types import Message
 from services.db import get_lang
+from services.messenger import send_text
 
 router = Router()
 
@@ -20,4 +21,4 @@ FAQ_TEXT_RU = '''❓ *Часто задаваемые вопросы (FAQ)*
 @router.message(Command('faq'))
 async def cmd_faq(message: Message):
     lang = get_lang(message.from_user.id)
-    await message.answer(FAQ_TEXT_RU if lang == 'ru' else FAQ_TEXT_KK, parse_mode='Markdown')
+    await send_text(message, FAQ_TEXT_RU if lang == 'ru' else FAQ_TEXT_KK, parse_mode='Markdown')
@@ -1,14 +1,58 @@
 from aiogram import Router
 from aiogram.filters import Command
-from aiogram.types import Message
-from pathlib import Path
+from aiogram.filters.callback_data import CallbackData
+from aiogram.types import CallbackQuery, InlineKeyboardButton, InlineKeyboardMarkup, Message
+from services import gallery
+from services.assets import send_media_group
+from services.db import ensure_user, get_gallery_page, get_user_lang, set_gallery_page
+from services.i18n import t
+from services.messenger import send, send_text
 router = Router()
-BASE = Path(__file__).parent.parent
-IMG_DIR = BASE / 'images'
+
+
+class GalleryPage(CallbackData, prefix="gp"):
+    page: int
+
+
+def _nav_kb(lang: str, number: int, pages: int):
+    if pages < 2:
+        return None
+    return InlineKeyboardMarkup(inline_keyboard=[[
+        InlineKeyboardButton(text=t(lang, "gallery_prev"), callback_data=GalleryPage(page=(number - 1) % pages).pack()),
+        InlineKeyboardButton(text=t(lang, "gallery_next"), callback_data=GalleryPage(page=(number + 1) % pages).pack()),
+    ]])
+
+
+async def show_page(message: Message, user_id: int, number: int):
+    """Страница галереи: альбом до 10 фото одним sendMediaGroup и сообщение с кнопками «назад/далее»."""
+    lang = get_user_lang(user_id)
+    # индекс картинок строится один раз и обновляется при изменении папки (services/gallery.py)
+    number, pages, paths = await gallery.page(number)
+    if not paths:
+        return await send_text(message, t(lang, "gallery_empty"))
+    set_gallery_page(user_id, number)
+    # file_id из реестра; загружаются только картинки, которых Telegram ещё не видел
+    await send(message.chat.id, lambda: send_media_group(message, paths))
+    await send_text(message, t(lang, "gallery_page", page=number + 1, pages=pages),
+                    reply_markup=_nav_kb(lang, number, pages))
+
+
+@router.message(Command('gallery'))
+async def gallery_open(message: Message):
+    user = message.from_user
+    ensure_user(user.id, user.username or user.first_name)
+    await show_page(message, user.id, max(get_gallery_page(user.id), 0))
+
+
 @router.message(Command('gallery_next'))
 async def gallery_next(message: Message):
-    imgs = sorted([p for p in IMG_DIR.iterdir() if p.suffix.lower() in ('.jpg','.png')]) if IMG_DIR.exists() else []
-    if not imgs:
-        await message.answer('No images')
-        return
-    await message.answer_photo(photo=imgs[0].open('rb'))
+    user = message.from_user
+    ensure_user(user.id, user.username or user.first_name)
+    # курсор хранится у пользователя: каждая команда — следующая страница
+    await show_page(message, user.id, get_gallery_page(user.id) + 1)
+
+
+@router.callback_query(GalleryPage.filter())
+async def gallery_page(callback: CallbackQuery, callback_data: GalleryPage):
+    await callback.answer()
+    await show_page(callback.message, callback.from_user.id, callback_data.page)
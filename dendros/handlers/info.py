@@ -1,10 +1,14 @@
 from pathlib import Path
 import logging
-from aiogram import Router, F
-from aiogram.types import Message, FSInputFile
+from aiogram import Router
+from aiogram.types import Message
+from filters import TextIn
 from keyboards.main_kb import info_options_kb, main_menu_kb, sights_kb
 from services.db import ensure_user, get_user_lang
 from services.i18n import t
+from services.assets import send_document, send_photo
+from services.messenger import send, send_text
+from services.images import IMAGES_DIR, image_paths
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -12,31 +16,16 @@ logger = logging.getLogger(__name__)
 router = Router()
 
 # --------------------------
-# Базовая директория и папка с изображениями (универсально при переносе проекта)
+# Папка с изображениями (services/images.py, универсально при переносе проекта)
 # --------------------------
-BASE_DIR = Path(__file__).resolve().parent.parent
-IMAGES_DIR = (BASE_DIR / "images").resolve()
 logger.info("Images dir resolved to: %s", IMAGES_DIR)
 
 # --------------------------
-# Собираем маппинг 1..10 -> Path|None (поддержка разных расширений и постфикса _fixed)
+# Маппинг 1..10 -> Path|None из images/manifest.json (его пишет scripts/prepare_images.py)
 # --------------------------
-IMAGE_BY_INDEX: dict[str, Path | None] = {}
-for i in range(1, 11):
-    found = None
-    # сначала пробуем явно указанные варианты
-    for cand_name in (f"{i}_fixed.jpg", f"{i}.jpg", f"{i}.jpeg", f"{i}.png", f"{i}.webp", f"{i}.bmp"):
-        cand = IMAGES_DIR / cand_name
-        if cand.exists() and cand.is_file():
-            found = cand
-            break
-    # fallback: любой файл, начинающийся с индекса (например "1-portrait.png")
-    if not found and IMAGES_DIR.exists():
-        for candidate in sorted(IMAGES_DIR.glob(f"{i}*")):
-            if candidate.is_file():
-                found = candidate
-                break
-    IMAGE_BY_INDEX[str(i)] = found
+_prepared = image_paths()
+IMAGE_BY_INDEX: dict[str, Path | None] = {str(i): _prepared.get(str(i)) for i in range(1, 11)}
+for i, found in IMAGE_BY_INDEX.items():
     logger.info("Mapping image %s -> %s", i, found)
 
 # --------------------------
@@ -294,63 +283,53 @@ SOS_TEXT = {
 # --------------------------
 # Обработчики
 # --------------------------
-@router.message(F.text == "ℹ️ Инфо")
-@router.message(F.text == "ℹ️ Info")
-@router.message(F.text == "ℹ️ Ақпарат")
+@router.message(TextIn("ℹ️ Инфо", "ℹ️ Info", "ℹ️ Ақпарат"))
 async def cmd_info(message: Message):
     ensure_user(message.from_user.id, message.from_user.username or "", message.from_user.first_name or "")
     lang = get_user_lang(message.from_user.id)
     header = t(lang, "main_menu_prompt")
-    await message.answer(header + "\n\n" + INFO_TEXTS["about"].get(lang, INFO_TEXTS["about"]["ru"]),
-                         reply_markup=info_options_kb(lang=lang))
+    await send_text(message, header + "\n\n" + INFO_TEXTS["about"].get(lang, INFO_TEXTS["about"]["ru"]),
+                    reply_markup=info_options_kb(lang=lang))
 
 
-@router.message(F.text == "📍 Адрес")
-@router.message(F.text == "📍 Орналасқан жері")
-@router.message(F.text == "📍 Location")
+@router.message(TextIn("📍 Адрес", "📍 Орналасқан жері", "📍 Location"))
 async def cmd_address(message: Message):
     lang = get_user_lang(message.from_user.id)
-    await message.answer(INFO_TEXTS["address_and_transport"].get(lang, INFO_TEXTS["address_and_transport"]["ru"]),
-                         reply_markup=info_options_kb(lang=lang))
+    await send_text(message, INFO_TEXTS["address_and_transport"].get(lang, INFO_TEXTS["address_and_transport"]["ru"]),
+                    reply_markup=info_options_kb(lang=lang))
 
 
-@router.message(F.text == "🕒 Время работы")
-@router.message(F.text == "🕒 Жұмыс уақыты")
-@router.message(F.text == "🕒 Opening hours")
+@router.message(TextIn("🕒 Время работы", "🕒 Жұмыс уақыты", "🕒 Opening hours"))
 async def cmd_hours(message: Message):
     lang = get_user_lang(message.from_user.id)
-    await message.answer(INFO_TEXTS["hours_and_price"].get(lang, INFO_TEXTS["hours_and_price"]["ru"]),
-                         reply_markup=info_options_kb(lang=lang))
+    await send_text(message, INFO_TEXTS["hours_and_price"].get(lang, INFO_TEXTS["hours_and_price"]["ru"]),
+                    reply_markup=info_options_kb(lang=lang))
 
 
-@router.message(F.text == "📜 Правила")
-@router.message(F.text == "📜 Rules")
-@router.message(F.text == "📜 Ережелер")
+@router.message(TextIn("📜 Правила", "📜 Rules", "📜 Ережелер"))
 async def cmd_rules(message: Message):
     ensure_user(message.from_user.id, message.from_user.username or "", message.from_user.first_name or "")
     lang = get_user_lang(message.from_user.id)
-    await message.answer(PARK_RULES.get(lang, PARK_RULES["ru"]), reply_markup=info_options_kb(lang=lang))
+    await send_text(message, PARK_RULES.get(lang, PARK_RULES["ru"]), reply_markup=info_options_kb(lang=lang))
 
 
 # SOS handler: отправляет текст без изменения клавиатуры
-@router.message(F.text == "🆘 SOS")
+@router.message(TextIn("🆘 SOS"))
 async def cmd_sos(message: Message):
     try:
         ensure_user(message.from_user.id, message.from_user.username or "", message.from_user.first_name or "")
         lang = get_user_lang(message.from_user.id)
         sos_text = SOS_TEXT.get(lang, SOS_TEXT["ru"])
         logger.info("cmd_sos triggered by user=%s text=%r", message.from_user.id, message.text)
-        await message.answer(sos_text)  # клавиатура не меняется
+        await send_text(message, sos_text)  # клавиатура не меняется
     except Exception:
         logger.exception("Error in cmd_sos")
 
 
-@router.message(F.text == "🌿 Көрікті жерлер")
-@router.message(F.text == "🌿 Sights")
-@router.message(F.text == "🌿 Красивые места")
+@router.message(TextIn("🌿 Көрікті жерлер", "🌿 Sights", "🌿 Красивые места"))
 async def cmd_sights_menu(message: Message):
     lang = get_user_lang(message.from_user.id)
-    await message.answer(t(lang, "main_menu_prompt"), reply_markup=sights_kb(lang=lang))
+    await send_text(message, t(lang, "main_menu_prompt"), reply_markup=sights_kb(lang=lang))
 
 
 # --------------------------
@@ -367,17 +346,17 @@ NAV_SET = {
 }
 
 
-@router.message(F.text.in_(SIGHT_BUTTON_TEXTS.union(NAV_SET)))
+@router.message(TextIn(*SIGHT_BUTTON_TEXTS.union(NAV_SET)))
 async def cmd_sight_detail_filtered(message: Message):
     text = (message.text or "").strip()
     lang = get_user_lang(message.from_user.id) or "ru"
 
     # навигация
     if text in ("🔙 Артқа", "🔙 Back", "🔙 Назад"):
-        await message.answer(t(lang, "main_menu_prompt"), reply_markup=info_options_kb(lang=lang))
+        await send_text(message, t(lang, "main_menu_prompt"), reply_markup=info_options_kb(lang=lang))
         return
     if text in ("🏠 Басты мәзір", "🏠 Main menu", "🏠 Главное меню"):
-        await message.answer(t(lang, "main_menu_prompt"), reply_markup=main_menu_kb(lang=lang))
+        await send_text(message, t(lang, "main_menu_prompt"), reply_markup=main_menu_kb(lang=lang))
         return
 
     details_map = SIGHTS_DETAILS.get(lang, SIGHTS_DETAILS.get("ru", {}))
@@ -391,28 +370,25 @@ async def cmd_sight_detail_filtered(message: Message):
         # логирование о наличии файла
         if not img_path:
             logger.warning("No image mapped for idx=%s", idx)
-        elif not img_path.exists():
-            logger.warning("Mapped image missing on disk: %s", img_path)
         else:
             try:
-                size = img_path.stat().st_size
-                logger.info("Attempt to send image %s size=%d", img_path, size)
-                photo = FSInputFile(str(img_path.resolve()))
-                await message.answer_photo(photo=photo, caption=caption, reply_markup=sights_kb(lang=lang))
-                return
+                # file_id из реестра (services/assets.py); файл загружается только в первый раз.
+                # Через планировщик: после RetryAfter запрос повторяется, а не теряется
+                if await send(message.chat.id, lambda: send_photo(message, img_path, caption=caption, reply_markup=sights_kb(lang=lang))):
+                    return
+                logger.warning("Mapped image missing on disk: %s", img_path)
             except Exception as e:
                 logger.exception("Failed to send as photo %s: %s", img_path, e)
                 try:
-                    doc = FSInputFile(str(img_path.resolve()))
-                    await message.answer_document(document=doc, caption=caption, reply_markup=sights_kb(lang=lang))
-                    return
+                    if await send(message.chat.id, lambda: send_document(message, img_path, caption=caption, reply_markup=sights_kb(lang=lang))):
+                        return
                 except Exception as e2:
                     logger.exception("Failed document fallback for %s: %s", img_path, e2)
-                    await message.answer("Файл недоступен для отправки. Попробуйте позже.", reply_markup=sights_kb(lang=lang))
+                    await send_text(message, "Файл недоступен для отправки. Попробуйте позже.", reply_markup=sights_kb(lang=lang))
                     return
 
         # если файла нет или не найден — просто отправляем текст
-        await message.answer(caption, reply_markup=sights_kb(lang=lang))
+        await send_text(message, caption, reply_markup=sights_kb(lang=lang))
         return
 
     # если ключ не совпал по локали — попытка найти по номеру в любом языке
@@ -427,22 +403,20 @@ async def cmd_sight_detail_filtered(message: Message):
                     break
         caption = caption_map.get(lang) or caption_map.get("ru") or ""
         img_path = IMAGE_BY_INDEX.get(idx)
-        if img_path and img_path.exists():
+        if img_path:
             try:
-                photo = FSInputFile(str(img_path.resolve()))
-                await message.answer_photo(photo=photo, caption=caption, reply_markup=sights_kb(lang=lang))
-                return
+                if await send(message.chat.id, lambda: send_photo(message, img_path, caption=caption, reply_markup=sights_kb(lang=lang))):
+                    return
             except Exception as e:
                 logger.exception("Failed to send photo %s as image, will try as document: %s", img_path, e)
                 try:
-                    doc = FSInputFile(str(img_path.resolve()))
-                    await message.answer_document(document=doc, caption=caption, reply_markup=sights_kb(lang=lang))
-                    return
+                    if await send(message.chat.id, lambda: send_document(message, img_path, caption=caption, reply_markup=sights_kb(lang=lang))):
+                        return
                 except Exception as e2:
                     logger.exception("Failed document fallback for %s: %s", img_path, e2)
-                    await message.answer("Файл недоступен для отправки. Попробуйте позже.", reply_markup=sights_kb(lang=lang))
+                    await send_text(message, "Файл недоступен для отправки. Попробуйте позже.", reply_markup=sights_kb(lang=lang))
                     return
-        await message.answer(caption or "Информация временно недоступна.", reply_markup=sights_kb(lang=lang))
+        await send_text(message, caption or "Информация временно недоступна.", reply_markup=sights_kb(lang=lang))
         return
 
 # --------------------------
@@ -1,6 +1,7 @@
 # handlers/lang.py
-from aiogram import Router, F
+from aiogram import Router
 from aiogram.types import Message
+from filters import TextIn
 from keyboards.main_kb import lang_kb, main_menu_kb
 from services.i18n import t
 from services.messenger import send_text
@@ -8,7 +9,7 @@ from services.db import ensure_user, set_user_lang
 
 router = Router()
 
-@router.message(F.text.in_({"🇰🇿 Қазақша", "🇷🇺 Русский", "🇬🇧 English"}))
+@router.message(TextIn("🇰🇿 Қазақша", "🇷🇺 Русский", "🇬🇧 English"))
 async def choose_language(message: Message):
     """
     User pressed a language button from lang_kb.
@@ -1,12 +1,14 @@
-from aiogram import Router, F
+from aiogram import Router
 from aiogram.types import Message
-from services.db import ensure_user, get_lang, get_leaderboard
+from filters import TextIn
+from services.db import ensure_user, get_lang, get_leaderboard, get_user_rank
 from keyboards.main_kb import main_menu_kb
+from services.messenger import send_text
 
 router = Router()
 
 
-@router.message(F.text == "🏆 Лидерборд")
+@router.message(TextIn("🏆 Лидерборд"))
 async def cmd_leaderboard(message: Message):
     ensure_user(message.from_user.id, message.from_user.first_name)
     lang = get_lang(message.from_user.id)
@@ -14,7 +16,8 @@ async def cmd_leaderboard(message: Message):
     leaders = get_leaderboard()
 
     if not leaders:
-        await message.answer(
+        await send_text(
+            message,
             "🏆 Лидерборд бос.",
             reply_markup=main_menu_kb()
         )
@@ -24,7 +27,11 @@ async def cmd_leaderboard(message: Message):
 
     for i, user in enumerate(leaders, start=1):
         name = user.get("name", "Аты жоқ")
-        score = user.get("correct_answers", 0)
+        score = user.get("score", 0)
         text += f"{i}. *{name}* — {score} дұрыс жауап\n"
 
-    await message.answer(text, parse_mode="Markdown", reply_markup=main_menu_kb())
+    rank = get_user_rank(message.from_user.id)
+    if rank:
+        text += f"\n📍 Сіздің орныңыз: {rank}\n"
+
+    await send_text(message, text, parse_mode="Markdown", reply_markup=main_menu_kb())
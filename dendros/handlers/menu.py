@@ -1,5 +1,6 @@
-from aiogram import Router, F
+from aiogram import Router
 from aiogram.types import Message
+from filters import TextIn
 from keyboards.main_kb import main_menu_kb
 from services.i18n import t
 from services.messenger import send_text
@@ -7,7 +8,7 @@ from services.db import ensure_user, get_user_lang
 
 router = Router()
 
-@router.message(F.text == "/start")
+@router.message(TextIn("/start"))
 async def menu_start(message: Message):
     """
     Начальное сообщение: сохраняет пользователя и показывает главное меню.
@@ -17,9 +18,7 @@ async def menu_start(message: Message):
     lang = get_user_lang(message.from_user.id) or "ru"
     await send_text(message, t(lang, "main_menu_prompt"), reply_markup=main_menu_kb(lang=lang))
 
-@router.message(F.text == "🌐 Тіл")
-@router.message(F.text == "🌐 Language")
-@router.message(F.text == "🌐 Язык")
+@router.message(TextIn("🌐 Тіл", "🌐 Language", "🌐 Язык"))
 async def menu_lang(message: Message):
     """
     Показать экран выбора языка.
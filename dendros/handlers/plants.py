@@ -1,17 +1,15 @@
 from aiogram import Router
 from aiogram.filters import Command
 from aiogram.types import Message
-import json, pathlib
+import pathlib
+from services.fileio import read_json
 router = Router()
 DATA_FILE = pathlib.Path(__file__).parent.parent / 'data' / 'plants.json'
-def load():
-    try:
-        return json.loads(DATA_FILE.read_text(encoding='utf-8'))
-    except:
-        return []
+async def load_async():
+    return await read_json(DATA_FILE, [])
 @router.message(Command('plants'))
 async def cmd_plants(message: Message):
-    plants = load()
+    plants = await load_async()
     if not plants:
         await message.answer('Растения отсутствуют.')
         return
@@ -1,12 +1,14 @@
-from aiogram import Router, F
+from aiogram import Router
 from aiogram.types import Message
+from filters import TextIn
 from services.db import ensure_user, get_user_lang
 from services.i18n import t
+from services.messenger import send_text
 from keyboards.main_kb import main_menu_kb
 
 router = Router()
 
-@router.message(F.text.in_({"👤 Профиль", "👤 Profile", "👤 Профиль"}))
+@router.message(TextIn("👤 Профиль", "👤 Profile", "👤 Профиль"))
 async def cmd_profile(message: Message):
     user = message.from_user
     lang = get_user_lang(user.id) or "ru"
@@ -25,4 +27,4 @@ async def cmd_profile(message: Message):
         "en": f"👤 Your profile:\n\nName: {full_name or 'Anonymous'}\nUsername: {username}"
     }.get(lang, f"👤 Имя: {full_name or 'Аноним'}\nЮзернейм: {username}")
 
-    await message.answer(text, reply_markup=main_menu_kb(lang=lang))
\ No newline at end of file
+    await send_text(message, text, reply_markup=main_menu_kb(lang=lang))
\ No newline at end of file
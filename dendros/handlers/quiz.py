@@ -1,8 +1,11 @@
-from aiogram import Router, F
-from aiogram.types import Message, KeyboardButton, ReplyKeyboardMarkup
-import json
-import os
+from aiogram import Bot, Router
+from aiogram.exceptions import TelegramAPIError, TelegramBadRequest
+from aiogram.filters import Filter
+from aiogram.types import CallbackQuery, Message
+from filters import TextIn
 import logging
+import os
+import time
 
 from keyboards.main_kb import main_menu_kb
 from services.db import (
@@ -11,143 +14,280 @@ from services.db import (
     stop_quiz,
     is_quiz_active,
     get_quiz_state,
+    get_seen,
+    get_quiz_deadline,
+    list_quiz_deadlines,
     advance_quiz,
     get_user_lang
 )
 from services.i18n import t
+from services.messenger import Composer, send
+from services.quiz_bank import EXIT_BTN, EXIT_OPTION, QuizAnswer, get_bank, normalize, refresh_bank
+from services.quiz_stats import record_answer, record_shown
+from services.timer_wheel import TimerWheel
 
 router = Router()
 logging.getLogger().setLevel(logging.INFO)
 
-QUIZ_FILE = os.path.join(os.path.dirname(__file__), "..", "data", "quiz_data.json")
+logging.info("Loaded quiz with %d questions", len(get_bank()))
 
-def _load_quiz():
-    try:
-        with open(QUIZ_FILE, "r", encoding="utf-8") as f:
-            data = json.load(f)
-            if not isinstance(data, list):
-                logging.error("Quiz file must contain a list of questions")
-                return []
-            return data
-    except Exception as e:
-        logging.exception("Failed to load quiz file: %s", e)
-        return []
-
-QUIZ = _load_quiz()
-logging.info("Loaded quiz with %d questions", len(QUIZ))
-
-EXIT_BTN = "❌ Выйти"
 START_TEXTS = {"ru": "🧪 Викторина", "kz": "🧪 Викторина", "en": "🧪 Quiz"}
 
-def build_answers_kb(opts):
-    return ReplyKeyboardMarkup(
-        resize_keyboard=True,
-        keyboard=[[KeyboardButton(text=o)] for o in opts] + [[KeyboardButton(text=EXIT_BTN)]]
-    )
+# reply — ответы кнопками обычной клавиатуры, результат и следующий вопрос — одним сообщением;
+# inline — инлайн-кнопки, результат и следующий вопрос редактируют одно сообщение
+QUIZ_MODE = os.getenv("QUIZ_MODE", "reply")
+INLINE = QUIZ_MODE == "inline"
+# Сколько вопросов в одной сессии (выбираются случайно из пула языка)
+SESSION_SIZE = int(os.getenv("QUIZ_SESSION_SIZE", "10"))
+# Лимит времени на вопрос, секунд; 0 — без лимита
+TIME_LIMIT = float(os.getenv("QUIZ_TIME_LIMIT", "0"))
+
+# Таймеры вопросов всех пользователей — одно колесо, одна фоновая задача (см. main.py)
+quiz_timers = TimerWheel()
+
+def next_deadline():
+    """Дедлайн вопроса, который сейчас будет показан; сохраняется той же записью, что и прогресс."""
+    return time.time() + TIME_LIMIT if TIME_LIMIT > 0 else None
+
+def arm_timer(user_id: int, q_idx: int):
+    """Поставить таймер на показанный вопрос (старый таймер пользователя заменяется)."""
+    if TIME_LIMIT <= 0:
+        return
+    # дедлайн уже записан start_quiz/advance_quiz — отдельной записи на показ вопроса нет
+    saved = get_quiz_deadline(user_id)
+    if saved and saved[1] == q_idx:
+        quiz_timers.schedule(user_id, saved[0], q_idx)
+
+def question_shown(user_id: int, q_idx: int, lang: str):
+    """Вопрос показан: статистика показов и таймер ответа."""
+    record_shown(user_id, get_bank().key(q_idx), lang)
+    arm_timer(user_id, q_idx)
 
-@router.message(F.text.in_({START_TEXTS["ru"], START_TEXTS["en"], START_TEXTS["kz"]}))
-async def cmd_quiz_start(message: Message):
+def end_quiz(user_id: int):
+    """Остановить викторину и снять таймер вопроса (сохранённый дедлайн чистит stop_quiz)."""
+    quiz_timers.cancel(user_id)
+    stop_quiz(user_id)
+
+def restore_quiz_timers() -> int:
+    """Вернуть на колесо дедлайны, сохранённые до перезапуска; истёкшие сработают сразу."""
+    restored = 0
+    for user_id, deadline, q_idx in list_quiz_deadlines():
+        quiz_timers.schedule(user_id, deadline, q_idx)
+        restored += 1
+    return restored
+
+@router.message(TextIn(START_TEXTS["ru"], START_TEXTS["en"], START_TEXTS["kz"]))
+async def cmd_quiz_start(message: Message, response: Composer):
     ensure_user(message.from_user.id, message.from_user.username or message.from_user.first_name)
-    # Перезагружаем вопросы на случай правок файла
-    global QUIZ
-    QUIZ = _load_quiz()
-    logging.info("User %s started quiz; questions=%d", message.from_user.id, len(QUIZ))
+    # Банк перекомпилируется только если файл изменился (см. services/quiz_bank.py)
+    bank = await refresh_bank()
+    logging.info("User %s started quiz; questions=%d", message.from_user.id, len(bank))
     lang = get_user_lang(message.from_user.id)
-    if not QUIZ:
-        await message.answer(t(lang, "quiz_start") + "\n\n" + "Викторина временно недоступна.", reply_markup=main_menu_kb(lang=lang))
+    if not len(bank):
+        response.text(t(lang, "quiz_start") + "\n\n" + "Викторина временно недоступна.", reply_markup=main_menu_kb(lang=lang))
         return
-    start_quiz(message.from_user.id)
-    await send_current_question(message)
+    # k вопросов без повторов, недавно виденные пропускаются (метки — в записи пользователя)
+    seen = get_seen(message.from_user.id, bank.layout)
+    order = bank.sample(lang, SESSION_SIZE, seen)
+    start_quiz(message.from_user.id, order, seen, deadline=next_deadline(), layout=bank.layout)
+    send_current_question(message, response)
 
-async def send_current_question(message: Message):
-    state = get_quiz_state(message.from_user.id)
+def current_question(user_id: int):
+    """
+    (номер текущего вопроса в банке или None, если сессия закончилась; состояние; всего вопросов).
+    Сессия без order (начатая до выборок) идёт по банку подряд.
+    Номера сессии относятся к раскладке банка на момент старта: если банк с тех пор
+    перезагружен с другой раскладкой, они указывают на другие вопросы — сессия
+    заканчивается, а в состоянии появляется outdated.
+    """
+    state = get_quiz_state(user_id)
+    order = state.get("order")
     progress = state.get("progress", 0)
-    score = state.get("score", 0)
+    bank = get_bank()
+    total = len(order) if order is not None else len(bank)
+    if progress >= total:
+        return None, state, total
+    if state.get("layout") != bank.layout:
+        return None, dict(state, outdated=True), total
+    return (order[progress] if order is not None else progress), state, total
+
+def finished_text(lang: str, state: dict, total: int) -> str:
+    """Итог викторины; сессии, закрытой перезагрузкой банка, — с объяснением."""
+    if state.get("outdated"):
+        return t(lang, "quiz_outdated", score=state.get("score", 0))
+    return t(lang, "quiz_finished", score=state.get("score", 0), total=total)
+
+def send_current_question(message: Message, response: Composer):
+    """Текущий вопрос (или итог) — в ответы апдейта; уходит вместе с тем, что сложено до него."""
+    idx, state, total = current_question(message.from_user.id)
     lang = get_user_lang(message.from_user.id)
 
-    if progress >= len(QUIZ):
-        await message.answer(t(lang, "quiz_finished", score=score, total=len(QUIZ)), reply_markup=main_menu_kb(lang=lang))
-        stop_quiz(message.from_user.id)
+    if idx is None:
+        response.text(finished_text(lang, state, total), reply_markup=main_menu_kb(lang=lang))
+        end_quiz(message.from_user.id)
         return
 
-    q = QUIZ[progress]
-    q_text_block = q.get("q", {})
-    opts_block = q.get("opts", {})
-    q_text_str = q_text_block.get(lang) or q_text_block.get("ru") or str(q_text_block)
-    opts = opts_block.get(lang) or opts_block.get("ru") or []
-
-    if not isinstance(opts, list):
-        opts = list(opts)
+    # текст и клавиатура вопроса собраны заранее
+    view = get_bank().view(idx, lang)
+    question_shown(message.from_user.id, idx, lang)
+    response.text(view.text, reply_markup=view.inline_keyboard if INLINE else view.keyboard)
 
-    text = f"❓ {q_text_str}\n\n"
-    for i, o in enumerate(opts, 1):
-        text += f"{i}) {o}\n"
+def next_step(user_id: int, lang: str, feedback: str, inline: bool = True):
+    """
+    Текст и клавиатура для одного сообщения: результат ответа и следующий
+    вопрос, либо итог викторины (викторина остановлена; для инлайн-режима
+    клавиатуры нет, иначе — главное меню).
+    """
+    idx, state, total = current_question(user_id)
+    if idx is None:
+        end_quiz(user_id)
+        text = f"{feedback}\n\n" + finished_text(lang, state, total)
+        return text, None if inline else main_menu_kb(lang=lang)
+    view = get_bank().view(idx, lang)
+    question_shown(user_id, idx, lang)
+    return f"{feedback}\n\n{view.text}", view.inline_keyboard if inline else view.keyboard
 
-    await message.answer(text, reply_markup=build_answers_kb(opts))
+async def on_question_timeout(bot: Bot, user_id: int, q_idx: int):
+    """Время на вопрос вышло: ответ засчитывается неверным, пользователь видит следующий вопрос."""
+    # проверка и advance идут без await между ними — гонки с ответом пользователя нет
+    if not is_quiz_active(user_id):
+        return
+    current, state, total = current_question(user_id)
+    lang = get_user_lang(user_id)
+    if state.get("outdated"):
+        # банк перезагружен с другой раскладкой: номер в таймере — уже другой вопрос
+        end_quiz(user_id)
+        text, markup = finished_text(lang, state, total), None if INLINE else main_menu_kb(lang=lang)
+    elif current != q_idx:
+        return
+    else:
+        bank = get_bank()
+        view = bank.view(q_idx, lang)
+        record_answer(user_id, bank.key(q_idx), lang, None, False)
+        advance_quiz(user_id, correct=False, deadline=next_deadline())
+        text, markup = next_step(user_id, lang, t(lang, "quiz_timeout") + "\n" + view.wrong_text, inline=INLINE)
+    try:
+        # через общий планировщик: лимиты Telegram и повтор после 429
+        await send(user_id, lambda: bot.send_message(user_id, text, reply_markup=markup))
+    except TelegramAPIError as e:
+        # бот заблокирован или чат недоступен — дальше таймеры не нужны
+        logging.warning("Quiz timeout message to %s failed: %s", user_id, e)
+        end_quiz(user_id)
 
-@router.message(F.text == EXIT_BTN)
-async def quiz_exit_button(message: Message):
-    stop_quiz(message.from_user.id)
+@router.message(TextIn(EXIT_BTN))
+async def quiz_exit_button(message: Message, response: Composer):
+    end_quiz(message.from_user.id)
     lang = get_user_lang(message.from_user.id)
-    await message.answer(t(lang, "quiz_exit_confirm"), reply_markup=main_menu_kb(lang=lang))
+    response.text(t(lang, "quiz_exit_confirm"), reply_markup=main_menu_kb(lang=lang))
+
+class QuizActive(Filter):
+    """
+    Пропускает только пользователей с активной викториной: проверка по множеству
+    сессий в services.db за O(1). Асинхронный фильтр aiogram вызывает прямо в
+    цикле — синхронные (lambda) он гоняет через пул потоков на каждый апдейт.
+    Команды (/join, /tournament, /gallery...) не считаются ответом и идут дальше
+    к своим роутерам — сессия викторины не истекает и не должна их перехватывать.
+    """
+
+    async def __call__(self, message: Message) -> bool:
+        if (message.text or "").startswith("/"):
+            return False
+        return message.from_user is not None and is_quiz_active(message.from_user.id)
 
-def normalize(s: str):
-    return (s or "").strip().lower().replace(".", "").replace("  ", " ")
+# Ответы на вопросы — отдельный роутер с фильтром на уровне роутера:
+# сообщения вне викторины отсекаются одной проверкой и не доходят до хендлеров
+answers_router = Router(name="quiz_answers")
+answers_router.message.filter(QuizActive())
+router.include_router(answers_router)
 
-@router.message(lambda message: is_quiz_active(message.from_user.id))
-async def quiz_answer_handler(message: Message):
+@answers_router.message()
+async def quiz_answer_handler(message: Message, response: Composer):
     user_id = message.from_user.id
     lang = get_user_lang(user_id)
     text = normalize(message.text)
 
     # Allow textual exit variants too
     if text in ("stop", "выйти", "стоп", "exit"):
-        stop_quiz(user_id)
-        await message.answer(t(lang, "quiz_exit_confirm"), reply_markup=main_menu_kb(lang=lang))
+        end_quiz(user_id)
+        response.text(t(lang, "quiz_exit_confirm"), reply_markup=main_menu_kb(lang=lang))
         return
 
-    state = get_quiz_state(user_id)
-    progress = state.get("progress", 0)
+    q_idx, state, total = current_question(user_id)
 
-    if progress >= len(QUIZ):
-        stop_quiz(user_id)
-        await message.answer(t(lang, "quiz_finished", score=state.get("score", 0), total=len(QUIZ)), reply_markup=main_menu_kb(lang=lang))
+    if q_idx is None:
+        end_quiz(user_id)
+        response.text(finished_text(lang, state, total), reply_markup=main_menu_kb(lang=lang))
         return
 
-    q = QUIZ[progress]
-    opts = q.get("opts", {}).get(lang) or q.get("opts", {}).get("ru") or []
-    answer_correct = q.get("a", {}).get(lang) or q.get("a", {}).get("ru")
-    explanation = q.get("explanation", {}).get(lang) if isinstance(q.get("explanation"), dict) else q.get("explanation", "")
-
-    selected = None
-    # choose by number
-    if text.isdigit():
-        idx = int(text) - 1
-        if 0 <= idx < len(opts):
-            selected = opts[idx]
-
-    # choose by text
-    if selected is None:
-        for o in opts:
-            if normalize(o) == text:
-                selected = o
-                break
-
-    if selected is None:
-        await message.answer(t(lang, "pick_from_buttons"), reply_markup=build_answers_kb(opts))
+    bank = get_bank()
+    view = bank.view(q_idx, lang)
+    # по номеру или по нормализованному тексту варианта
+    idx = view.match(text)
+
+    if idx is None:
+        response.text(t(lang, "pick_from_buttons"), reply_markup=view.inline_keyboard if INLINE else view.keyboard)
         return
 
-    correct = False
-    if answer_correct is not None:
-        correct = normalize(selected) == normalize(answer_correct)
+    correct = view.correct[idx]
 
-    advance_quiz(user_id, correct=correct)
+    record_answer(user_id, bank.key(q_idx), lang, idx, correct)
+    advance_quiz(user_id, correct=correct, deadline=next_deadline())
 
-    # Сообщаем результат, затем отправляем следующий вопрос (если есть)
-    if correct:
-        await message.answer(t(lang, "answer_correct"), reply_markup=build_answers_kb(opts))
+    if INLINE:
+        # результат и следующий вопрос — одним сообщением
+        text, markup = next_step(user_id, lang, view.correct_text if correct else view.wrong_text)
+        response.text(text, reply_markup=markup)
+        return
+
+    # Результат и следующий вопрос (или итог) складываются в ответы апдейта
+    # и уходят одним сообщением с клавиатурой вопроса
+    response.text(view.correct_text if correct else view.wrong_text, reply_markup=view.keyboard)
+    send_current_question(message, response)
+
+@router.callback_query(QuizAnswer.filter())
+async def quiz_inline_answer(callback: CallbackQuery, callback_data: QuizAnswer):
+    user_id = callback.from_user.id
+    lang = get_user_lang(user_id)
+    message = callback.message
+    bank = get_bank()
+    option = callback_data.o
+    n, state, total = current_question(user_id) if is_quiz_active(user_id) else (None, {}, 0)
+
+    # Проверяем payload: викторина идёт, кнопка относится к текущему вопросу (по ключу,
+    # а не по номеру в файле), вариант существует, а сообщение ещё доступно для редактирования
+    valid = (
+        isinstance(message, Message)
+        and n is not None
+        and callback_data.k == bank.key(n)
+        and (option == EXIT_OPTION or 0 <= option < len(bank.view(n, lang).opts))
+    )
+    if not valid and not (state.get("outdated") and isinstance(message, Message)):
+        await callback.answer(t(lang, "quiz_stale"))
+        return
+
+    # состояние меняется до первого await: таймер вопроса не может вклиниться
+    # между проверкой и ответом
+    if not valid:
+        # банк перезагружен с другой раскладкой — сессия закрывается итогом в том же сообщении
+        end_quiz(user_id)
+        text, markup = finished_text(lang, state, total), None
+    elif option == EXIT_OPTION:
+        end_quiz(user_id)
+        text, markup = t(lang, "quiz_exit_confirm"), None
     else:
-        await message.answer(t(lang, "answer_wrong", answer=answer_correct or "", ex=explanation or ""), reply_markup=build_answers_kb(opts))
+        view = bank.view(n, lang)
+        correct = view.correct[option]
+        record_answer(user_id, bank.key(n), lang, option, correct)
+        advance_quiz(user_id, correct=correct, deadline=next_deadline())
+        text, markup = next_step(user_id, lang, view.correct_text if correct else view.wrong_text)
+    # отвечаем сразу, чтобы у пользователя не крутились «часики» на кнопке;
+    # answerCallbackQuery не сообщение в чат и не ждёт очереди планировщика
+    await callback.answer()
 
-    # Отправляем следующий вопрос (или финальное сообщение)
-    await send_current_question(message)
\ No newline at end of file
+    # правка тоже сообщение для лимитов Telegram: через планировщик, с повтором после RetryAfter
+    try:
+        await send(message.chat.id, lambda: message.edit_text(text, reply_markup=markup))
+    except TelegramBadRequest as e:
+        # сообщение удалено или слишком старое — отправляем новое
+        logging.warning("Quiz message edit failed for user %s: %s", user_id, e)
+        await send(message.chat.id, lambda: message.answer(text, reply_markup=markup))
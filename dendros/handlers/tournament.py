@@ -0,0 +1,228 @@
+# handlers/tournament.py
+import asyncio
+import html
+import logging
+import os
+import time
+from typing import Dict
+
+from aiogram import Bot, Router
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.filters import Command, CommandObject
+from aiogram.filters.callback_data import CallbackData
+from aiogram.types import CallbackQuery, InlineKeyboardButton, InlineKeyboardMarkup, Message
+
+from services.bitset import Bitset
+from services.db import ensure_user, get_user_lang
+from services.fanout import fan_out
+from services.messenger import NORMAL, send_text
+from services.i18n import t
+from services.quiz_bank import refresh_bank
+from services import tournament as tournaments
+from services.tournament import Tournament
+
+router = Router()
+logger = logging.getLogger(__name__)
+
+QUESTIONS = int(os.getenv("TOURNAMENT_QUESTIONS", "10"))
+# Сколько секунд ждать ответов после того, как вопрос разослан всем
+QUESTION_TIME = float(os.getenv("TOURNAMENT_QUESTION_TIME", "20"))
+# Табло редактируется не чаще раза в BOARD_INTERVAL секунд и только если изменилось
+BOARD_INTERVAL = float(os.getenv("TOURNAMENT_BOARD_INTERVAL", "3"))
+BOARD_TOP = 10
+# Лобби, которое так и не запустили, закрывается через час
+LOBBY_TTL = 3600
+
+# ссылки на фоновые задачи турниров, чтобы их не собрал сборщик мусора
+_tasks: set = set()
+
+
+class TournamentStart(CallbackData, prefix="ts"):
+    code: str
+
+
+class TournamentAnswer(CallbackData, prefix="ta"):
+    """"ta:<код>:<номер вопроса в турнире>:<вариант>"."""
+    code: str
+    q: int
+    o: int
+
+
+def _spawn(coro):
+    task = asyncio.create_task(coro)
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+    return task
+
+
+# ---------- Табло ----------
+
+def board_text(tour: Tournament) -> str:
+    lang = tour.lang
+    players = len(tour.players)
+    if tour.state == "lobby":
+        head = t(lang, "tour_board_lobby", code=tour.code, players=players)
+    elif tour.state == "running":
+        head = t(lang, "tour_board_question", code=tour.code, n=tour.current + 1,
+                 total=len(tour.questions), answered=len(tour.answers), players=players)
+    else:
+        head = t(lang, "tour_board_final", code=tour.code)
+    if tour.state == "lobby":
+        return head
+    lines = [head, ""]
+    for place, p in enumerate(tour.standings()[:BOARD_TOP], 1):
+        lines.append(f"{place}. {html.escape(p.name)} — {p.score}")
+    return "\n".join(lines)
+
+
+def _start_kb(tour: Tournament):
+    return InlineKeyboardMarkup(inline_keyboard=[[InlineKeyboardButton(
+        text=t(tour.lang, "tour_start_btn"), callback_data=TournamentStart(code=tour.code).pack())]])
+
+
+async def _edit_board(bot: Bot, tour: Tournament):
+    if tour.board is None:
+        return
+    chat_id, message_id = tour.board
+    text = board_text(tour)
+    markup = _start_kb(tour) if tour.state == "lobby" else None
+
+    async def edit(_):
+        try:
+            return await bot.edit_message_text(text, chat_id=chat_id, message_id=message_id, reply_markup=markup)
+        except TelegramBadRequest as e:
+            # «message is not modified» и подобное — табло просто не меняется
+            logger.debug("Scoreboard edit skipped: %s", e)
+
+    # через общий планировщик отправки: правки тоже расходуют лимит бота
+    await fan_out([chat_id], edit, priority=NORMAL)
+
+
+async def run_board(bot: Bot, tour: Tournament):
+    """
+    Единственная задача, которая правит табло ведущего: раз в BOARD_INTERVAL и
+    только если с прошлого раза что-то изменилось — сколько бы ни пришло ответов.
+    """
+    started = time.monotonic()
+    while tour.state != "finished":
+        await asyncio.sleep(BOARD_INTERVAL)
+        if tour.state == "lobby" and time.monotonic() - started > LOBBY_TTL:
+            tournaments.close(tour)
+            return
+        if tour.dirty:
+            tour.dirty = False
+            await _edit_board(bot, tour)
+
+
+# ---------- Ход турнира ----------
+
+async def _send_question(bot: Bot, tour: Tournament, idx: int):
+    """Разослать вопрос всем участникам: текст и кнопки собираются один раз на язык."""
+    per_lang: Dict[str, tuple] = {}
+    for lang in {p.lang for p in tour.players.values()}:
+        view = tour.bank.view(idx, lang)
+        kb = InlineKeyboardMarkup(inline_keyboard=[
+            [InlineKeyboardButton(text=o, callback_data=TournamentAnswer(code=tour.code, q=tour.current, o=i).pack())]
+            for i, o in enumerate(view.opts)
+        ])
+        header = t(lang, "tour_question", n=tour.current + 1, total=len(tour.questions))
+        per_lang[lang] = (f"{header}\n\n{view.text}", kb)
+
+    async def send(chat_id: int):
+        p = tour.players[chat_id]
+        text, kb = per_lang[p.lang]
+        msg = await bot.send_message(chat_id, text, reply_markup=kb)
+        p.sent_at = time.monotonic()
+        return msg
+
+    await fan_out(list(tour.players), send, priority=NORMAL)
+
+
+async def run_tournament(bot: Bot, tour: Tournament):
+    try:
+        while (idx := tour.next_question()) is not None:
+            await _send_question(bot, tour, idx)
+            # ждём, пока ответят все, но не дольше QUESTION_TIME после рассылки
+            try:
+                await asyncio.wait_for(tour.all_in.wait(), QUESTION_TIME)
+            except asyncio.TimeoutError:
+                pass
+        tour.finish()
+        await _edit_board(bot, tour)
+
+        standings = tour.standings()
+        places = {p.id: place for place, p in enumerate(standings, 1)}
+
+        async def send_result(chat_id: int):
+            p = tour.players[chat_id]
+            return await bot.send_message(chat_id, t(p.lang, "tour_result", place=places[chat_id],
+                                                     total=len(standings), score=p.score))
+
+        await fan_out(list(tour.players), send_result, priority=NORMAL)
+        logger.info("Tournament %s finished: players=%d questions=%d", tour.code, len(tour.players), len(tour.questions))
+    except Exception:
+        logger.exception("Tournament %s failed", tour.code)
+    finally:
+        tournaments.close(tour)
+
+
+# ---------- Хендлеры ----------
+
+@router.message(Command("tournament"))
+async def cmd_tournament(message: Message, bot: Bot):
+    ensure_user(message.from_user.id, message.from_user.username or message.from_user.first_name)
+    lang = get_user_lang(message.from_user.id)
+    tour = tournaments.create(message.from_user.id, lang)
+    await send_text(message, t(lang, "tour_created", code=tour.code))
+    board = await send_text(message, board_text(tour), reply_markup=_start_kb(tour))
+    tour.board = (board.chat.id, board.message_id)
+    _spawn(run_board(bot, tour))
+
+
+@router.message(Command("join"))
+async def cmd_join(message: Message, command: CommandObject):
+    user = message.from_user
+    ensure_user(user.id, user.username or user.first_name)
+    lang = get_user_lang(user.id)
+    if not command.args:
+        return await send_text(message, t(lang, "tour_join_usage"))
+    tour, result = tournaments.join(command.args.strip(), user.id, user.first_name or user.username or str(user.id), lang)
+    key = {"ok": "tour_joined", "already": "tour_joined", "unknown": "tour_unknown",
+           "started": "tour_started", "full": "tour_full", "busy": "tour_busy"}[result]
+    await send_text(message, t(lang, key, code=tour.code if tour else ""))
+
+
+@router.callback_query(TournamentStart.filter())
+async def tournament_start(callback: CallbackQuery, callback_data: TournamentStart, bot: Bot):
+    tour = tournaments.get(callback_data.code)
+    lang = get_user_lang(callback.from_user.id)
+    if tour is None or tour.host_id != callback.from_user.id or tour.state != "lobby":
+        return await callback.answer(t(lang, "tour_started"))
+    if not tour.players:
+        return await callback.answer(t(lang, "tour_no_players"), show_alert=True)
+    await callback.answer()
+    bank = await refresh_bank()
+    tour.start(bank, bank.sample(tour.lang, QUESTIONS, Bitset()))
+    _spawn(run_tournament(bot, tour))
+
+
+@router.callback_query(TournamentAnswer.filter())
+async def tournament_answer(callback: CallbackQuery, callback_data: TournamentAnswer):
+    tour = tournaments.get(callback_data.code)
+    user_id = callback.from_user.id
+    player = tour.players.get(user_id) if tour else None
+    lang = player.lang if player else get_user_lang(user_id)
+    q, option = callback_data.q, callback_data.o
+    if player is None or tour.state != "running" or q != tour.current:
+        return await callback.answer(t(lang, "quiz_stale"))
+    view = tour.bank.view(tour.questions[q], lang)
+    if not 0 <= option < len(view.opts):
+        return await callback.answer(t(lang, "quiz_stale"))
+    correct = view.correct[option]
+    # ответ только агрегируется в памяти; участнику — всплывающее уведомление вместо сообщения
+    result = tour.answer(user_id, q, option, correct)
+    if result == "dup":
+        return await callback.answer()
+    if result != "ok":
+        return await callback.answer(t(lang, "quiz_stale"))
+    await callback.answer(t(lang, "tour_right" if correct else "tour_wrong"))
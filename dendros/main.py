@@ -1,13 +1,17 @@
 import asyncio
 import logging
 import os
+from functools import partial
 
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
 from dotenv import load_dotenv
-from keep_alive import keep_alive
-keep_alive()
 
+# Загружаем .env до импорта хендлеров: services.db читает DB_BACKEND при импорте
+load_dotenv()
+
+# Режим получения апдейтов: polling (по умолчанию) или webhook (services/webhook.py)
+BOT_MODE = os.getenv("BOT_MODE", "polling")
 
 # Импорт роутеров
 from handlers.start import router as start_router
@@ -16,10 +20,22 @@ from handlers.info import router as info_router
 from handlers.faq import router as faq_router
 from handlers.profile import router as profile_router
 from handlers.quiz import router as quiz_router
+from handlers.info import IMAGE_BY_INDEX
+from handlers.quiz import TIME_LIMIT as QUIZ_TIME_LIMIT, quiz_timers, on_question_timeout, restore_quiz_timers
 from handlers.lang import router as lang_router
+from handlers.events import router as events_router
+from handlers.tournament import router as tournament_router
+from handlers.admin import router as admin_router
+from handlers.gallery_nav import router as gallery_router
+from middlewares import ApiMetricsMiddleware, ComposerMiddleware, MetricsMiddleware, UserOrderMiddleware
+from services import db
+from services.db import init_storage, close_storage, run_flusher, get_write_stats
+from services.fileio import drain_writes, watch_event_loop
+from services.quiz_stats import run_stats_flusher
+from services import broadcast, messenger
+from services.webhook import run_webhook
+from services import assets, fanout, gallery, health, metrics
 
-# Загружаем токен из .env
-load_dotenv()
 TOKEN = os.getenv("BOT_TOKEN")
 
 if not TOKEN:
@@ -33,19 +49,102 @@ logging.basicConfig(level=logging.INFO)
 bot = Bot(token=TOKEN, default=DefaultBotProperties(parse_mode="HTML"))
 dp = Dispatcher()
 
+# Апдейты одного пользователя — строго по очереди, разных — параллельно
+user_order = UserOrderMiddleware()
+dp.update.outer_middleware(user_order)
+# Число апдейтов и время обработки для /metrics; запросы к Bot API — там же
+dp.update.outer_middleware(MetricsMiddleware())
+# Ответы хендлера на один апдейт склеиваются в минимум запросов (services/messenger.Composer)
+dp.update.outer_middleware(ComposerMiddleware())
+api_metrics = ApiMetricsMiddleware()
+bot.session.middleware(api_metrics)
+
+# /healthz, /readyz и /metrics (services/health.py) — в event loop бота, без отдельного потока
+health.add_check("storage", db.is_storage_ready)
+health.add_check("bot", lambda: api_metrics.connected)
+metrics.register("storage", get_write_stats)
+metrics.register("outbox", messenger.get_stats)
+metrics.register("user_order", user_order.get_stats)
+metrics.register("fanout", fanout.get_stats)
+metrics.register("assets", assets.get_stats)
+metrics.register("gallery", gallery.get_stats)
+
 # Подключение роутеров
 dp.include_router(start_router)
 dp.include_router(menu_router)
 dp.include_router(info_router)
 dp.include_router(faq_router)
 dp.include_router(profile_router)
+# до quiz_router: его роутер ответов забирает тексты во время викторины
+dp.include_router(gallery_router)
 dp.include_router(quiz_router)
 dp.include_router(lang_router)
+dp.include_router(events_router)
+dp.include_router(tournament_router)
+dp.include_router(admin_router)
 
 # Запуск
 async def main():
+    # Бэкенд хранения: journal (по умолчанию), sharded (DB_SHARDS файлов), sqlite (data/bot.db) или json
+    init_storage(os.getenv("DB_BACKEND", "journal"))
+    # Отложенная запись (DB_WRITE_BEHIND=1): сброс пачками в фоне
+    flusher = asyncio.create_task(run_flusher()) if db.WRITE_BEHIND else None
+    # Детектор синхронного I/O в event loop (порог — IO_BLOCK_THRESHOLD)
+    loop_watch = asyncio.create_task(watch_event_loop())
+    # Статистика ответов на вопросы: счётчики в памяти, сброс на диск пачкой (QUIZ_STATS_FLUSH)
+    stats_flusher = asyncio.create_task(run_stats_flusher())
+    # Таймеры вопросов викторины (QUIZ_TIME_LIMIT > 0): одно колесо на всех пользователей
+    timers = None
+    if QUIZ_TIME_LIMIT > 0:
+        logging.info("Restored %d quiz timers", restore_quiz_timers())
+        timers = asyncio.create_task(quiz_timers.run(partial(on_question_timeout, bot)))
+        metrics.register("quiz_timers", quiz_timers.get_stats)
+    # Предзагрузка картинок в служебный чат (ASSETS_WARM_CHAT): file_id готовы до первого запроса
+    warm_chat = os.getenv("ASSETS_WARM_CHAT")
+    warm = asyncio.create_task(assets.prewarm(bot, int(warm_chat), IMAGE_BY_INDEX.values())) if warm_chat else None
+    # Рассылка объявления, прерванная перезапуском, продолжается с сохранённой позиции
+    broadcast.resume(bot)
+    # В режиме вебхука проверки отвечают на том же сервере, что и вебхук
+    health_server = await health.start_server() if BOT_MODE != "webhook" else None
     print("🚀 Бот успешно запущен!")
-    await dp.start_polling(bot)
+    try:
+        if BOT_MODE == "webhook":
+            await run_webhook(dp, bot)
+        else:
+            # сессию бота закрываем сами в конце: очередь отправки досылается после остановки
+            await dp.start_polling(bot, close_bot_session=False)
+    finally:
+        loop_watch.cancel()
+        if health_server:
+            await health_server.cleanup()
+        if warm:
+            warm.cancel()
+        if timers:
+            timers.cancel()
+            logging.info("Quiz timer stats: %s", quiz_timers.get_stats())
+        if flusher:
+            flusher.cancel()
+            try:
+                await flusher
+            except asyncio.CancelledError:
+                pass
+        # при отмене задача сама сбрасывает накопленные счётчики
+        stats_flusher.cancel()
+        try:
+            await stats_flusher
+        except asyncio.CancelledError:
+            pass
+        await broadcast.stop()
+        # недоотправленные ответы уходят до закрытия сессии бота
+        await messenger.close_outbox()
+        logging.info("Outbound scheduler stats: %s", messenger.get_stats())
+        await bot.session.close()
+        await drain_writes()
+        # финальный flush гарантирован внутри close_storage()
+        close_storage()
+        logging.info("Storage write stats: %s", get_write_stats())
+        logging.info("Per-user ordering stats: %s", user_order.get_stats())
+        logging.info("Asset registry stats: %s", assets.get_stats())
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
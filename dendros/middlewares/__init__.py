@@ -0,0 +1,3 @@
+from .composer import ComposerMiddleware
+from .metrics import ApiMetricsMiddleware, MetricsMiddleware
+from .user_order import UserOrderMiddleware
@@ -0,0 +1,32 @@
+# middlewares/composer.py
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from services.messenger import Composer
+
+
+class ComposerMiddleware(BaseMiddleware):
+    """
+    Даёт хендлеру Composer в аргументе response и после хендлера отправляет всё,
+    что тот сложил, — склеенными сообщениями через общий планировщик.
+    Регистрируется как outer middleware на dp.update после UserOrderMiddleware:
+    ответы уходят до того, как начнёт обрабатываться следующий апдейт пользователя.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        chat = data.get("event_chat")
+        if chat is None:
+            return await handler(event, data)
+        response = data["response"] = Composer(data["bot"], chat.id)
+        try:
+            return await handler(event, data)
+        finally:
+            # то, что хендлер успел сложить до ошибки, всё равно отправляется
+            await response.flush()
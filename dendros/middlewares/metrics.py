@@ -0,0 +1,68 @@
+# middlewares/metrics.py
+import time
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware, Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.exceptions import TelegramAPIError, TelegramNetworkError
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+from aiogram.types import TelegramObject, Update
+
+from services import metrics
+
+
+class MetricsMiddleware(BaseMiddleware):
+    """
+    Число апдейтов по типам и время их обработки для /metrics.
+    Регистрируется как outer middleware на dp.update после UserOrderMiddleware —
+    ожидание своей очереди пользователем во время обработки не входит.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        started = time.perf_counter()
+        failed = False
+        try:
+            return await handler(event, data)
+        except Exception:
+            failed = True
+            raise
+        finally:
+            kind = event.event_type if isinstance(event, Update) else type(event).__name__
+            metrics.observe_update(kind, time.perf_counter() - started, failed)
+
+
+class ApiMetricsMiddleware(BaseRequestMiddleware):
+    """
+    Запросы к Bot API по методам и исходам; connected — последний запрос дошёл
+    до Telegram (ответ получен, пусть и с ошибкой API). Для проверки готовности.
+    """
+
+    def __init__(self):
+        self.connected = False
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        name = method.__api_method__
+        try:
+            response = await make_request(bot, method)
+        except TelegramNetworkError:
+            self.connected = False
+            metrics.observe_api(name, "network_error")
+            raise
+        except TelegramAPIError as e:
+            self.connected = True
+            metrics.observe_api(name, type(e).__name__)
+            raise
+        self.connected = True
+        metrics.observe_api(name, "ok")
+        return response
@@ -0,0 +1,97 @@
+# middlewares/user_order.py
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+logger = logging.getLogger(__name__)
+
+
+class _Slot:
+    __slots__ = ("lock", "users")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        # сколько апдейтов этого пользователя сейчас выполняется или ждёт
+        self.users = 0
+
+
+class UserOrderMiddleware(BaseMiddleware):
+    """
+    Строгий порядок апдейтов одного пользователя.
+
+    aiogram обрабатывает апдейты конкурентно, а хендлеры викторины делают
+    read-modify-write состояния пользователя через await. Middleware держит
+    таблицу замков по user_id: апдейты одного пользователя выполняются по
+    очереди (asyncio.Lock отдаёт замок в порядке FIFO), разные пользователи —
+    параллельно. Замок удаляется из таблицы, как только у пользователя не
+    остаётся апдейтов, поэтому таблица не растёт с числом пользователей.
+
+    Регистрируется как outer middleware на dp.update.
+    """
+
+    def __init__(self, slow_wait: float = 1.0):
+        self.slow_wait = slow_wait
+        self._slots: Dict[int, _Slot] = {}
+        self._waiting = 0
+        self.stats = {
+            "updates": 0,
+            "waited": 0,
+            "wait_total": 0.0,
+            "wait_max": 0.0,
+            "max_depth": 0,
+        }
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        user = data.get("event_from_user")
+        if user is None:
+            return await handler(event, data)
+
+        slot = self._slots.get(user.id)
+        if slot is None:
+            slot = self._slots[user.id] = _Slot()
+        slot.users += 1
+        self.stats["updates"] += 1
+        if slot.users > self.stats["max_depth"]:
+            self.stats["max_depth"] = slot.users
+        try:
+            if slot.lock.locked():
+                self._waiting += 1
+                started = time.perf_counter()
+                try:
+                    await slot.lock.acquire()
+                finally:
+                    self._waiting -= 1
+                waited = time.perf_counter() - started
+                self.stats["waited"] += 1
+                self.stats["wait_total"] += waited
+                if waited > self.stats["wait_max"]:
+                    self.stats["wait_max"] = waited
+                if waited > self.slow_wait:
+                    logger.warning("Update of user %s waited %.2fs for the previous one", user.id, waited)
+            else:
+                await slot.lock.acquire()
+            try:
+                return await handler(event, data)
+            finally:
+                slot.lock.release()
+        finally:
+            slot.users -= 1
+            if slot.users == 0:
+                self._slots.pop(user.id, None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Метрики: глубина очередей и время ожидания."""
+        stats = dict(self.stats)
+        stats["queued"] = self._waiting
+        stats["active_users"] = len(self._slots)
+        stats["wait_avg"] = stats["wait_total"] / stats["waited"] if stats["waited"] else 0.0
+        return stats
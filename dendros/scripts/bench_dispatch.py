@@ -0,0 +1,97 @@
+# scripts/bench_dispatch.py
+# Время диспетчеризации апдейта через все роутеры бота (без сети).
+# Запуск из корня проекта: python scripts/bench_dispatch.py [iterations]
+import asyncio
+import importlib
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+# без фоновой задачи write-behind изменения остаются в памяти и не трогают data/
+os.environ.setdefault("DB_WRITE_BEHIND", "1")
+# лимиты Telegram на отправку здесь не нужны: меряется диспетчеризация, а не темп
+os.environ.setdefault("MESSENGER_RATE", "1e9")
+os.environ.setdefault("MESSENGER_CHAT_RATE", "1e9")
+
+from aiogram import Bot, Dispatcher  # noqa: E402
+from aiogram.client.session.base import BaseSession  # noqa: E402
+from aiogram.methods import TelegramMethod  # noqa: E402
+from aiogram.types import Message, Update  # noqa: E402
+
+from middlewares import ComposerMiddleware  # noqa: E402
+from services import db  # noqa: E402
+from services.quiz_bank import get_bank  # noqa: E402
+
+# Порядок роутеров — как в main.py
+ROUTERS = ("start", "menu", "info", "faq", "profile", "gallery_nav", "quiz", "lang", "events", "tournament", "admin")
+
+
+class NullSession(BaseSession):
+    """Сессия, которая ничего не отправляет: sendMessage возвращает пустое сообщение."""
+
+    async def make_request(self, bot, method: TelegramMethod, timeout=None):
+        if method.__returning__ is Message:
+            return Message.model_validate({"message_id": 1, "date": 0, "chat": {"id": 1, "type": "private"}})
+        return True
+
+    async def stream_content(self, *args, **kwargs):
+        yield b""
+
+    async def close(self):
+        pass
+
+
+def make_update(n: int, user_id: int, text: str) -> Update:
+    return Update.model_validate({
+        "update_id": n,
+        "message": {
+            "message_id": n,
+            "date": 0,
+            "chat": {"id": user_id, "type": "private"},
+            "from": {"id": user_id, "is_bot": False, "first_name": "Bench"},
+            "text": text,
+        },
+    })
+
+
+async def run(iterations: int):
+    dp = Dispatcher()
+    dp.update.outer_middleware(ComposerMiddleware())
+    for name in ROUTERS:
+        dp.include_router(importlib.import_module(f"handlers.{name}").router)
+    logging.getLogger().setLevel(logging.WARNING)
+    bot = Bot("42:BENCH", session=NullSession())
+
+    # сессия привязана к раскладке банка: без неё ответ закрыл бы викторину как устаревшую
+    layout = get_bank().layout
+    idle_user, quiz_user = 10_001, 10_002
+    db.ensure_user(idle_user)
+    db.ensure_user(quiz_user)
+    for uid in range(20_000, 30_000):
+        db.ensure_user(uid)
+        if uid % 2:
+            db.start_quiz(uid, layout=layout)
+
+    scenarios = {
+        "unmatched text (no quiz)": (idle_user, "hello there", None),
+        "menu button": (idle_user, "ℹ️ Инфо", None),
+        "quiz answer": (quiz_user, "2", lambda: db.start_quiz(quiz_user, layout=layout)),
+    }
+    print(f"{'scenario':<28} {'us/update':>10}")
+    for name, (uid, text, prepare) in scenarios.items():
+        updates = [make_update(i, uid, text) for i in range(iterations)]
+        total = 0.0
+        for upd in updates:
+            if prepare:
+                prepare()
+            started = time.perf_counter()
+            await dp.feed_update(bot, upd)
+            total += time.perf_counter() - started
+        print(f"{name:<28} {total / iterations * 1e6:>10.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(run(int(sys.argv[1]) if len(sys.argv) > 1 else 2000))
@@ -0,0 +1,70 @@
+# scripts/bench_memory.py
+# Сравнение памяти на пользователя: старые dict-записи против UserRecord.
+# Запуск из корня проекта: python scripts/bench_memory.py [100000 1000000]
+import gc
+import random
+import sys
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from services.usertable import UserRecord  # noqa: E402
+
+LANGS = ("ru", "kz", "en")
+
+
+def make_dict_users(n: int, seed: int = 1):
+    """Так пользователи хранились раньше: {str(id): dict} с вложенным quiz."""
+    rnd = random.Random(seed)
+    users = {}
+    for i in range(n):
+        uid = 100_000_000 + i
+        quiz = None
+        if rnd.random() < 0.3:
+            quiz = {"active": True, "progress": rnd.randint(0, 10), "score": rnd.randint(0, 10)}
+        users[str(uid)] = {
+            "id": uid,
+            "username": f"user{i}",
+            "name": f"Name{i}",
+            # код языка читается из JSON — у каждого пользователя своя копия строки
+            "lang": "".join(rnd.choice(LANGS)),
+            "quiz": quiz,
+        }
+    return users
+
+
+def make_record_users(n: int, seed: int = 1):
+    rnd = random.Random(seed)
+    users = {}
+    for i in range(n):
+        uid = 100_000_000 + i
+        rec = UserRecord(uid, f"user{i}", f"Name{i}", "".join(rnd.choice(LANGS)))
+        if rnd.random() < 0.3:
+            rec.progress, rec.score = rnd.randint(0, 10), rnd.randint(0, 10)
+        users[uid] = rec
+    return users
+
+
+def measure(factory, n: int) -> float:
+    gc.collect()
+    tracemalloc.start()
+    users = factory(n)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del users
+    gc.collect()
+    return current / n
+
+
+def main():
+    sizes = [int(a) for a in sys.argv[1:]] or [100_000, 1_000_000]
+    print(f"{'users':>10} {'dict B/user':>12} {'record B/user':>14} {'saved':>7}")
+    for n in sizes:
+        d = measure(make_dict_users, n)
+        r = measure(make_record_users, n)
+        print(f"{n:>10} {d:>12.0f} {r:>14.0f} {1 - r / d:>6.0%}")
+
+
+if __name__ == "__main__":
+    main()
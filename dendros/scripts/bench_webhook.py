@@ -0,0 +1,154 @@
+# scripts/bench_webhook.py
+# Polling против вебхука на локальной подмене Bot API (scripts/fake_telegram.py):
+# задержка от появления апдейта до входа в диспетчер и пропускная способность
+# одного процесса. Каждый режим — в отдельном процессе с теми же роутерами, что в main.py.
+# Запуск из корня проекта: python scripts/bench_webhook.py [--updates 2000] [--api-latency 0.02]
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+# без фоновой задачи write-behind изменения остаются в памяти и не трогают data/;
+# лимиты Telegram на отправку не нужны: сравниваются способы получения апдейтов
+os.environ.setdefault("DB_WRITE_BEHIND", "1")
+os.environ.setdefault("MESSENGER_RATE", "1e9")
+os.environ.setdefault("MESSENGER_CHAT_RATE", "1e9")
+
+FAKE_PORT = 8181
+WEBHOOK_PORT = 8182
+SECRET = "bench-secret"
+USERS = 500
+TEXT = "ℹ️ Инфо"
+
+
+def percentile(values, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000 if ordered else 0.0
+
+
+async def run_mode(mode: str, updates: int, paced: int, rate: float, api_latency: float) -> dict:
+    import importlib
+    import logging
+
+    from aiogram import Bot, Dispatcher
+    from aiogram.client.session.aiohttp import AiohttpSession
+    from aiogram.client.telegram import TelegramAPIServer
+
+    from bench_dispatch import ROUTERS
+    from fake_telegram import FakeTelegram
+    from middlewares import ComposerMiddleware, UserOrderMiddleware
+    from services.webhook import WebhookServer
+
+    logging.getLogger().setLevel(logging.WARNING)
+    fake = FakeTelegram(port=FAKE_PORT, latency=api_latency)
+    await fake.start()
+    bot = Bot("42:BENCH", session=AiohttpSession(api=TelegramAPIServer.from_base(fake.base_url)))
+    dp = Dispatcher()
+    dp.update.outer_middleware(UserOrderMiddleware())
+    dp.update.outer_middleware(ComposerMiddleware())
+    for name in ROUTERS:
+        dp.include_router(importlib.import_module(f"handlers.{name}").router)
+
+    latencies, state = [], {"done": 0, "target": 0}
+    finished = asyncio.Event()
+
+    @dp.update.outer_middleware()
+    async def probe(handler, event, data):
+        latencies.append(time.perf_counter() - fake.pushed[event.update_id])
+        try:
+            return await handler(event, data)
+        finally:
+            state["done"] += 1
+            if state["done"] >= state["target"]:
+                finished.set()
+
+    async def feed(n: int, pace: float = 0.0) -> float:
+        """Отправить n апдейтов (pace — пауза между ними) и дождаться обработки всех."""
+        finished.clear()
+        state["done"], state["target"] = 0, n
+        latencies.clear()
+        started = time.perf_counter()
+        for i in range(n):
+            fake.push(fake.text_update(100_000 + i % USERS, TEXT))
+            if pace:
+                await asyncio.sleep(pace)
+        await asyncio.wait_for(finished.wait(), 120)
+        return time.perf_counter() - started
+
+    server = None
+    if mode == "polling":
+        poller = asyncio.create_task(dp.start_polling(bot, handle_signals=False, close_bot_session=False))
+    else:
+        server = WebhookServer(dp, bot, secret=SECRET)
+        await server.start("127.0.0.1", WEBHOOK_PORT)
+        await bot.set_webhook(f"http://127.0.0.1:{WEBHOOK_PORT}/webhook", secret_token=SECRET, max_connections=40)
+    await asyncio.sleep(0.5)
+
+    # прогрев: первые апдейты создают пользователей и заполняют кэши
+    await feed(USERS)
+    await feed(paced, 1 / rate)
+    lat = list(latencies)
+    calls_before = fake.calls["sendMessage"]
+    elapsed = await feed(updates)
+    burst_lat = list(latencies)
+    result = {
+        "mode": mode,
+        "paced_p50_ms": percentile(lat, 0.5),
+        "paced_p95_ms": percentile(lat, 0.95),
+        "paced_p99_ms": percentile(lat, 0.99),
+        "burst_p50_ms": percentile(burst_lat, 0.5),
+        "burst_p99_ms": percentile(burst_lat, 0.99),
+        "throughput": updates / elapsed,
+        "replies": fake.calls["sendMessage"] - calls_before,
+    }
+    if mode == "polling":
+        result["api_calls"] = fake.calls["getUpdates"]
+        await dp.stop_polling()
+        await poller
+    else:
+        result["api_calls"] = sum(v for k, v in fake.calls.items() if k.startswith("webhook:"))
+        await server.stop()
+    await bot.session.close()
+    await fake.stop()
+    return result
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Compare long polling and webhook against a fake Bot API")
+    ap.add_argument("--updates", type=int, default=2000, help="updates in the throughput burst")
+    ap.add_argument("--paced", type=int, default=500, help="updates in the paced latency run")
+    ap.add_argument("--rate", type=float, default=100.0, help="updates per second in the paced run")
+    ap.add_argument("--api-latency", type=float, default=0.0, help="artificial delay of every API call, s")
+    ap.add_argument("--mode", choices=("polling", "webhook"), help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.mode:
+        res = asyncio.run(run_mode(args.mode, args.updates, args.paced, args.rate, args.api_latency))
+        print(json.dumps(res))
+        return 0
+
+    rows = []
+    for mode in ("polling", "webhook"):
+        out = subprocess.run([sys.executable, __file__, "--mode", mode, "--updates", str(args.updates),
+                              "--paced", str(args.paced), "--rate", str(args.rate),
+                              "--api-latency", str(args.api_latency)],
+                             capture_output=True, text=True, check=True)
+        rows.append(json.loads(out.stdout.strip().splitlines()[-1]))
+
+    print(f"paced run: {args.paced} updates at {args.rate:g}/s; burst: {args.updates} updates; "
+          f"API latency {args.api_latency * 1000:g} ms")
+    print(f"{'mode':<8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'burst p50':>10} {'burst p99':>10} "
+          f"{'upd/s':>8} {'replies':>8}")
+    for r in rows:
+        print(f"{r['mode']:<8} {r['paced_p50_ms']:>8.2f} {r['paced_p95_ms']:>8.2f} {r['paced_p99_ms']:>8.2f} "
+              f"{r['burst_p50_ms']:>10.1f} {r['burst_p99_ms']:>10.1f} {r['throughput']:>8.0f} {r['replies']:>8}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,253 @@
+# scripts/fake_telegram.py
+# Локальная подмена Bot API для бенчмарков и нагрузочных тестов: апдейты отдаются
+# через getUpdates или доставляются POST-запросами на вебхук, как это делает Telegram;
+# отправка сообщений, фото и альбомов, правка текста и ответы на кнопки возвращают
+# правдоподобные объекты. Задержка ответа и ошибки 429 настраиваются.
+import asyncio
+import json
+import random
+import time
+from collections import Counter, deque
+from typing import Any, Callable, Dict, Optional
+
+import aiohttp
+from aiohttp import web
+
+BOT_INFO = {"id": 42, "is_bot": True, "first_name": "Fake", "username": "fake_dendros_bot"}
+# Методы, которые Telegram ограничивает по частоте: на них и отвечаем 429
+FLOOD_METHODS = frozenset({"sendMessage", "sendPhoto", "sendDocument", "sendMediaGroup", "editMessageText"})
+
+
+class FakeTelegram:
+    """
+    Бот подключается к нему через TelegramAPIServer.from_base(fake.base_url).
+    push() добавляет апдейт; pushed[update_id] — когда это случилось (perf_counter),
+    чтобы бенчмарк мог посчитать задержку до хендлера. latency — искусственная
+    задержка ответа на каждый вызов метода. flood_rate — доля вызовов из
+    FLOOD_METHODS, на которые приходит 429 с retry_after секунд.
+    on_call(метод, параметры, результат) вызывается при каждом успешном вызове
+    в момент его поступления — по нему нагрузочный тест видит ответы бота.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 8081, latency: float = 0.0,
+                 flood_rate: float = 0.0, retry_after: int = 1, seed: Optional[int] = None):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.flood_rate = flood_rate
+        self.retry_after = retry_after
+        self._random = random.Random(seed)
+        self.on_call: Optional[Callable[[str, Dict[str, Any], Any], None]] = None
+        self.calls: Counter = Counter()
+        self.pushed: Dict[int, float] = {}
+        self._updates: deque = deque()
+        self._new = asyncio.Event()
+        self._next_id = 1
+        self._message_id = 0
+        self._file_id = 0
+        # id нажатия кнопки -> пользователь: answerCallbackQuery не содержит chat_id
+        self._callback_users: Dict[str, int] = {}
+        self._webhook: Optional[Dict[str, Any]] = None
+        self._deliver: asyncio.Queue = asyncio.Queue()
+        self._workers: list = []
+        self._client: Optional[aiohttp.ClientSession] = None
+        self._runner: Optional[web.AppRunner] = None
+        # метод -> обработчик(params) -> result; можно дополнять снаружи
+        self.methods: Dict[str, Callable[[Dict[str, Any]], Any]] = {
+            "getMe": lambda p: BOT_INFO,
+            "sendMessage": self._send_message,
+            "sendPhoto": self._send_photo,
+            "sendDocument": self._send_document,
+            "sendMediaGroup": self._send_media_group,
+            "editMessageText": self._edit_message_text,
+            "answerCallbackQuery": lambda p: True,
+            "setWebhook": self._set_webhook,
+            "deleteWebhook": self._delete_webhook,
+        }
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    # ---------- апдейты ----------
+
+    def push(self, update: Dict[str, Any]) -> int:
+        update_id = self._next_id
+        self._next_id += 1
+        update = dict(update, update_id=update_id)
+        self.pushed[update_id] = time.perf_counter()
+        if "callback_query" in update:
+            query = update["callback_query"]
+            self._callback_users[query["id"]] = query["from"]["id"]
+        if self._webhook:
+            self._deliver.put_nowait(update)
+        else:
+            self._updates.append(update)
+            self._new.set()
+        return update_id
+
+    def text_update(self, user_id: int, text: str) -> Dict[str, Any]:
+        return {"message": {
+            "message_id": self._next_id, "date": int(time.time()), "text": text,
+            "chat": {"id": user_id, "type": "private"},
+            "from": {"id": user_id, "is_bot": False, "first_name": f"User{user_id}"},
+        }}
+
+    def callback_update(self, user_id: int, data: str, message_id: int) -> Dict[str, Any]:
+        """Нажатие инлайн-кнопки с callback_data под сообщением бота message_id."""
+        return {"callback_query": {
+            "id": f"cb{self._next_id}", "chat_instance": str(user_id), "data": data,
+            "from": {"id": user_id, "is_bot": False, "first_name": f"User{user_id}"},
+            "message": {"message_id": message_id, "date": int(time.time()), "text": "…",
+                        "chat": {"id": user_id, "type": "private"}, "from": BOT_INFO},
+        }}
+
+    def chat_of(self, method: str, params: Dict[str, Any]) -> Optional[int]:
+        """Чат, которому адресован вызов (для answerCallbackQuery — нажавший кнопку)."""
+        if method == "answerCallbackQuery":
+            return self._callback_users.pop(str(params.get("callback_query_id")), None)
+        chat_id = params.get("chat_id")
+        return int(chat_id) if chat_id is not None else None
+
+    async def _get_updates(self, params: Dict[str, Any]):
+        offset = int(params.get("offset") or 0)
+        limit = int(params.get("limit") or 100)
+        timeout = float(params.get("timeout") or 0)
+        # подтверждённые offset-ом апдейты больше не отдаются
+        while self._updates and self._updates[0]["update_id"] < offset:
+            self._updates.popleft()
+        if not self._updates and timeout:
+            self._new.clear()
+            try:
+                await asyncio.wait_for(self._new.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return [self._updates[i] for i in range(min(limit, len(self._updates)))]
+
+    # ---------- методы ----------
+
+    def _message(self, params: Dict[str, Any], message_id: Optional[int] = None, **fields) -> Dict[str, Any]:
+        if message_id is None:
+            self._message_id += 1
+            message_id = self._message_id
+        return dict({"message_id": message_id, "date": int(time.time()),
+                     "chat": {"id": int(params["chat_id"]), "type": "private"}, "from": BOT_INFO}, **fields)
+
+    def _file(self, value) -> Dict[str, Any]:
+        # строка — уже известный file_id; загруженный файл получает новый
+        if isinstance(value, str) and not value.startswith("attach://"):
+            file_id = value
+        else:
+            self._file_id += 1
+            file_id = f"FAKE{self._file_id}"
+        return {"file_id": file_id, "file_unique_id": file_id}
+
+    def _send_message(self, params: Dict[str, Any]):
+        return self._message(params, text=params.get("text", ""))
+
+    def _send_photo(self, params: Dict[str, Any]):
+        photo = dict(self._file(params.get("photo")), width=1280, height=960)
+        return self._message(params, photo=[photo], caption=params.get("caption"))
+
+    def _send_document(self, params: Dict[str, Any]):
+        return self._message(params, document=self._file(params.get("document")), caption=params.get("caption"))
+
+    def _send_media_group(self, params: Dict[str, Any]):
+        group = f"G{self._message_id + 1}"
+        return [self._message(params, media_group_id=group,
+                              photo=[dict(self._file(item.get("media")), width=1280, height=960)])
+                for item in params.get("media") or []]
+
+    def _edit_message_text(self, params: Dict[str, Any]):
+        # правка не создаёт нового сообщения
+        return self._message(params, int(params.get("message_id") or 0),
+                             text=params.get("text", ""), edit_date=int(time.time()))
+
+    def _set_webhook(self, params: Dict[str, Any]):
+        self._webhook = {
+            "url": params["url"],
+            "secret": params.get("secret_token"),
+            "max_connections": int(params.get("max_connections") or 40),
+        }
+        # недоставленные апдейты уходят на вебхук
+        while self._updates:
+            self._deliver.put_nowait(self._updates.popleft())
+        for _ in range(self._webhook["max_connections"] - len(self._workers)):
+            self._workers.append(asyncio.create_task(self._webhook_worker()))
+        return True
+
+    def _delete_webhook(self, params: Dict[str, Any]):
+        self._webhook = None
+        for w in self._workers:
+            w.cancel()
+        self._workers.clear()
+        return True
+
+    async def _webhook_worker(self):
+        # одно соединение Telegram: следующий апдейт — только после ответа на предыдущий
+        while True:
+            update = await self._deliver.get()
+            hook = self._webhook
+            headers = {"X-Telegram-Bot-Api-Secret-Token": hook["secret"]} if hook["secret"] else {}
+            try:
+                async with self._client.post(hook["url"], json=update, headers=headers) as resp:
+                    await resp.read()
+                    self.calls[f"webhook:{resp.status}"] += 1
+            except aiohttp.ClientError:
+                self.calls["webhook:error"] += 1
+
+    # ---------- HTTP ----------
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        self.calls[method] += 1
+        params: Dict[str, Any] = {}
+        if request.can_read_body:
+            if request.content_type == "application/json":
+                params = await request.json()
+            else:
+                form = await request.post()
+                params = {k: v for k, v in form.items()}
+        for key, value in list(params.items()):
+            # сложные поля aiogram присылает JSON-строкой
+            if isinstance(value, str) and value[:1] in "[{":
+                try:
+                    params[key] = json.loads(value)
+                except ValueError:
+                    pass
+        if method == "getUpdates":
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            return web.json_response({"ok": True, "result": await self._get_updates(params)})
+        if method in FLOOD_METHODS and self.flood_rate and self._random.random() < self.flood_rate:
+            self.calls["429"] += 1
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            return web.json_response({
+                "ok": False, "error_code": 429,
+                "description": f"Too Many Requests: retry after {self.retry_after}",
+                "parameters": {"retry_after": self.retry_after},
+            }, status=429)
+        result = self.methods[method](params) if method in self.methods else True
+        if isinstance(result, web.Response):
+            return result
+        if self.on_call:
+            self.on_call(method, params, result)
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return web.json_response({"ok": True, "result": result})
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post("/bot{token}/{method}", self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        self._client = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=0))
+
+    async def stop(self):
+        self._delete_webhook({})
+        if self._client:
+            await self._client.close()
+        if self._runner:
+            await self._runner.cleanup()
@@ -0,0 +1,276 @@
+# scripts/load_test.py
+# Сквозной нагрузочный тест: виртуальные пользователи проходят /start, выбор языка,
+# «Инфо», достопримечательности и полную викторину против локальной подмены
+# Bot API (scripts/fake_telegram.py). Бот — те же роутеры и middleware, что в main.py.
+# Меряются апдейты в секунду, задержка от апдейта до первого ответа бота и число
+# запросов к API на одно действие пользователя.
+# С --flood-rate подменный API отвечает 429 на часть отправок и правок: каждое
+# действие всё равно должно получить ответ (планировщик повторяет запрос). Код
+# выхода 1 — апдейт не обработан, действие осталось без ответа или отправка не прошла.
+# Запуск из корня проекта: python scripts/load_test.py [--users 1000] [--concurrency 250]
+import argparse
+import asyncio
+import importlib
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+# без фоновой задачи write-behind изменения остаются в памяти и не трогают data/;
+# лимиты Telegram на отправку по умолчанию сняты — меряется сам бот
+# (MESSENGER_RATE=25 MESSENGER_CHAT_RATE=1 вернут боевые)
+os.environ.setdefault("DB_WRITE_BEHIND", "1")
+os.environ.setdefault("MESSENGER_RATE", "1e9")
+os.environ.setdefault("MESSENGER_CHAT_RATE", "1e9")
+
+FAKE_PORT = 8183
+WEBHOOK_PORT = 8184
+SECRET = "load-secret"
+FIRST_USER = 200_000
+# Страховка от бесконечной викторины, если бот перестал её завершать
+MAX_ANSWERS = 50
+
+LANG_BUTTONS = {"ru": "🇷🇺 Русский", "kz": "🇰🇿 Қазақша", "en": "🇬🇧 English"}
+INFO_BUTTONS = {"ru": "ℹ️ Инфо", "kz": "ℹ️ Ақпарат", "en": "ℹ️ Info"}
+SIGHTS_BUTTONS = {"ru": "🌿 Красивые места", "kz": "🌿 Көрікті жерлер", "en": "🌿 Sights"}
+ACTIONS = ("start", "language", "info", "sights", "sight", "quiz_start", "quiz_answer")
+
+
+def percentile(values, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000 if ordered else 0.0
+
+
+class VirtualUser:
+    __slots__ = ("uid", "lang", "sent_at", "replied", "calls", "markup", "markup_message")
+
+    def __init__(self, uid: int, lang: str):
+        self.uid = uid
+        self.lang = lang
+        self.sent_at = 0.0
+        self.replied: Optional[float] = None
+        self.calls: Counter = Counter()
+        # последняя клавиатура от бота и сообщение, к которому она прикреплена
+        self.markup: Optional[Dict[str, Any]] = None
+        self.markup_message = 0
+
+
+class LoadTest:
+    def __init__(self, args):
+        self.args = args
+        self.users: Dict[int, VirtualUser] = {}
+        self.done: Dict[int, asyncio.Future] = {}
+        self.latency = defaultdict(list)
+        self.calls = defaultdict(Counter)
+        self.count = Counter()
+        self.timeouts = Counter()
+        self.no_reply = Counter()
+        self.updates = 0
+
+    # ---------- наблюдение за ботом ----------
+
+    def on_call(self, method: str, params: Dict[str, Any], result: Any):
+        user = self.users.get(self.fake.chat_of(method, params))
+        if user is None:
+            return
+        if user.replied is None:
+            user.replied = time.perf_counter()
+        user.calls[method] += 1
+        markup = params.get("reply_markup")
+        if isinstance(markup, dict) and ("keyboard" in markup or "inline_keyboard" in markup):
+            user.markup = markup
+            user.markup_message = result.get("message_id", 0) if isinstance(result, dict) else 0
+
+    async def probe(self, handler, event, data):
+        # самый внешний middleware: апдейт завершён, когда завершены все его запросы
+        try:
+            return await handler(event, data)
+        finally:
+            self.updates += 1
+            waiter = self.done.pop(event.update_id, None)
+            if waiter and not waiter.done():
+                waiter.set_result(None)
+
+    # ---------- действия пользователя ----------
+
+    async def act(self, user: VirtualUser, action: str, update: Dict[str, Any]):
+        user.replied, user.calls = None, Counter()
+        user.sent_at = time.perf_counter()
+        update_id = self.fake.push(update)
+        waiter = self.done[update_id] = asyncio.get_running_loop().create_future()
+        try:
+            await asyncio.wait_for(waiter, self.args.timeout)
+        except asyncio.TimeoutError:
+            self.done.pop(update_id, None)
+            self.timeouts[action] += 1
+        self.count[action] += 1
+        self.calls[action].update(user.calls)
+        if user.replied is None:
+            self.no_reply[action] += 1
+        else:
+            self.latency[action].append(user.replied - user.sent_at)
+        if self.args.think:
+            await asyncio.sleep(self.rng.uniform(0, 2 * self.args.think))
+
+    async def say(self, user: VirtualUser, action: str, text: str):
+        await self.act(user, action, self.fake.text_update(user.uid, text))
+
+    def quiz_reply(self, user: VirtualUser):
+        """Случайный вариант ответа с последней клавиатуры вопроса (без кнопки выхода)."""
+        markup = user.markup or {}
+        if "inline_keyboard" in markup:
+            buttons = [b["callback_data"] for row in markup["inline_keyboard"] for b in row
+                       if b.get("callback_data") and self.QuizAnswer.unpack(b["callback_data"]).o != self.EXIT_OPTION]
+            if buttons:
+                return self.fake.callback_update(user.uid, self.rng.choice(buttons), user.markup_message)
+        buttons = [b["text"] for row in markup.get("keyboard", []) for b in row if b["text"] != self.EXIT_BTN]
+        return self.fake.text_update(user.uid, self.rng.choice(buttons) if buttons else "1")
+
+    async def session(self, uid: int):
+        user = self.users[uid] = VirtualUser(uid, self.rng.choice(tuple(LANG_BUTTONS)))
+        lang = user.lang
+        await self.say(user, "start", "/start")
+        await self.say(user, "language", LANG_BUTTONS[lang])
+        await self.say(user, "info", INFO_BUTTONS[lang])
+        await self.say(user, "sights", SIGHTS_BUTTONS[lang])
+        await self.say(user, "sight", self.rng.choice(self.sight_buttons[lang]))
+        await self.say(user, "quiz_start", self.quiz_buttons[lang])
+        for _ in range(MAX_ANSWERS):
+            if not self.db.is_quiz_active(uid):
+                break
+            await self.act(user, "quiz_answer", self.quiz_reply(user))
+        del self.users[uid]
+
+    # ---------- запуск ----------
+
+    async def run(self) -> float:
+        from aiogram import Bot, Dispatcher
+        from aiogram.client.session.aiohttp import AiohttpSession
+        from aiogram.client.telegram import TelegramAPIServer
+
+        from bench_dispatch import ROUTERS
+        from fake_telegram import FakeTelegram
+        from handlers.quiz import START_TEXTS
+        from keyboards.main_kb import sights_kb
+        from middlewares import ComposerMiddleware, UserOrderMiddleware
+        from services import assets, db, messenger
+        from services.quiz_bank import EXIT_BTN, EXIT_OPTION, QuizAnswer
+        from services.webhook import WebhookServer
+
+        args = self.args
+        # file_id подменного API не должны попасть в настоящий реестр data/file_ids.json
+        assets.ASSETS_FILE = os.path.join(tempfile.mkdtemp(prefix="dendros-load-"), "file_ids.json")
+        assets._registry.clear()
+        self.db, self.messenger = db, messenger
+        self.QuizAnswer, self.EXIT_OPTION, self.EXIT_BTN = QuizAnswer, EXIT_OPTION, EXIT_BTN
+        self.rng = random.Random(args.seed)
+        self.sight_buttons = {lang: [row[0].text for row in sights_kb(lang).keyboard[:-1]] for lang in LANG_BUTTONS}
+        self.quiz_buttons = START_TEXTS
+
+        self.fake = FakeTelegram(port=FAKE_PORT, latency=args.api_latency, flood_rate=args.flood_rate,
+                                 retry_after=args.retry_after, seed=args.seed)
+        self.fake.on_call = self.on_call
+        await self.fake.start()
+        bot = Bot("42:LOAD", session=AiohttpSession(api=TelegramAPIServer.from_base(self.fake.base_url)))
+        dp = Dispatcher()
+        dp.update.outer_middleware(self.probe)
+        dp.update.outer_middleware(UserOrderMiddleware())
+        dp.update.outer_middleware(ComposerMiddleware())
+        for name in ROUTERS:
+            dp.include_router(importlib.import_module(f"handlers.{name}").router)
+        # хендлеры при импорте включают INFO; 429 и прочие сбои всё равно видны в отчёте
+        logging.getLogger().setLevel(logging.ERROR)
+
+        server = poller = None
+        if args.mode == "polling":
+            poller = asyncio.create_task(dp.start_polling(bot, handle_signals=False, close_bot_session=False))
+        else:
+            server = WebhookServer(dp, bot, secret=SECRET)
+            await server.start("127.0.0.1", WEBHOOK_PORT)
+            await bot.set_webhook(f"http://127.0.0.1:{WEBHOOK_PORT}/webhook", secret_token=SECRET,
+                                  max_connections=40)
+        await asyncio.sleep(0.5)
+
+        slots = asyncio.Semaphore(args.concurrency)
+
+        async def one(uid: int):
+            async with slots:
+                await self.session(uid)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(FIRST_USER + i) for i in range(args.users)))
+        elapsed = time.perf_counter() - started
+
+        if poller:
+            await dp.stop_polling()
+            await poller
+        else:
+            await server.stop()
+        await messenger.close_outbox()
+        await bot.session.close()
+        await self.fake.stop()
+        return elapsed
+
+    def report(self, elapsed: float):
+        args = self.args
+        print(f"{args.users} users ({args.concurrency} at a time), {args.mode}, quiz {os.getenv('QUIZ_MODE', 'reply')}, "
+              f"API latency {args.api_latency * 1000:g} ms, 429 rate {args.flood_rate:.1%}")
+        print(f"updates: {self.updates} in {elapsed:.1f} s -> {self.updates / elapsed:.0f} upd/s; "
+              f"timeouts: {sum(self.timeouts.values())}")
+        print(f"{'action':<12} {'count':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'calls/act':>10}  calls by method")
+        everything, total_calls = [], 0
+        for action in ACTIONS:
+            n = self.count[action]
+            if not n:
+                continue
+            lat = self.latency[action]
+            everything.extend(lat)
+            calls = sum(self.calls[action].values())
+            total_calls += calls
+            methods = ", ".join(f"{m}={c / n:.2f}" for m, c in self.calls[action].most_common())
+            print(f"{action:<12} {n:>7} {percentile(lat, 0.5):>8.1f} {percentile(lat, 0.95):>8.1f} "
+                  f"{percentile(lat, 0.99):>8.1f} {calls / n:>10.2f}  {methods}")
+        n = sum(self.count.values())
+        print(f"{'all':<12} {n:>7} {percentile(everything, 0.5):>8.1f} {percentile(everything, 0.95):>8.1f} "
+              f"{percentile(everything, 0.99):>8.1f} {total_calls / max(n, 1):>10.2f}")
+        if sum(self.no_reply.values()):
+            print("actions without a reply:", dict(self.no_reply))
+        out = self.messenger.get_stats()
+        print(f"API: {dict(self.fake.calls.most_common())}")
+        print(f"outbox: 429 retries {out['retry_after']}, failed {out['failed']}, "
+              f"calls saved by composing {out['calls_saved']}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="End-to-end load test of the bot against a fake Bot API")
+    ap.add_argument("--users", type=int, default=1000, help="virtual users, each walks the whole scenario once")
+    ap.add_argument("--concurrency", type=int, default=250, help="users active at the same time")
+    ap.add_argument("--think", type=float, default=0.05, help="mean pause between a user's actions, s")
+    ap.add_argument("--api-latency", type=float, default=0.0, help="artificial delay of every API call, s")
+    ap.add_argument("--flood-rate", type=float, default=0.0, help="share of send calls answered with 429")
+    ap.add_argument("--retry-after", type=int, default=1, help="retry_after of injected 429s, s")
+    ap.add_argument("--quiz-mode", choices=("reply", "inline"), help="QUIZ_MODE of the bot")
+    ap.add_argument("--mode", choices=("polling", "webhook"), default="polling")
+    ap.add_argument("--timeout", type=float, default=30.0, help="give up waiting for one update after, s")
+    ap.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args()
+    if args.quiz_mode:
+        # handlers.quiz читает QUIZ_MODE при импорте
+        os.environ["QUIZ_MODE"] = args.quiz_mode
+
+    test = LoadTest(args)
+    elapsed = asyncio.run(test.run())
+    test.report(elapsed)
+    lost = sum(test.timeouts.values()) + sum(test.no_reply.values()) + test.messenger.get_stats()["failed"]
+    return 1 if lost else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,211 @@
+# scripts/prepare_images.py
+# Подготовка картинок достопримечательностей для Telegram: проверка, очистка
+# метаданных, перекодирование в прогрессивный JPEG с лимитом размера и превью.
+# Результат — images/prepared/, images/thumbs/ и images/manifest.json.
+# Запуск из корня проекта: python scripts/prepare_images.py [--workers 4] [--force]
+import argparse
+import hashlib
+import io
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from PIL import Image, ImageCms, ImageOps, UnidentifiedImageError  # noqa: E402
+
+from services.images import IMAGES_DIR, MANIFEST_VERSION, read_manifest, scan_sources  # noqa: E402
+from services.storage import write_json_atomic  # noqa: E402
+
+# Telegram сам пережимает фото до 1280 px по длинной стороне — больше слать незачем
+MAX_SIDE = 1280
+MAX_BYTES = 512 * 1024
+QUALITY = 85
+MIN_QUALITY = 60
+THUMB_SIDE = 320
+# Telegram не принимает фото с соотношением сторон больше 20
+MAX_ASPECT = 20
+
+
+def file_sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def to_srgb(im: Image.Image) -> Image.Image:
+    """RGB без альфа-канала; цветовой профиль переводится в sRGB, чтобы цвета не поплыли без него."""
+    if im.mode in ("RGBA", "LA") or (im.mode == "P" and "transparency" in im.info):
+        rgba = im.convert("RGBA")
+        bg = Image.new("RGB", rgba.size, (255, 255, 255))
+        bg.paste(rgba, mask=rgba.getchannel("A"))
+        return bg
+    icc = im.info.get("icc_profile")
+    if icc:
+        try:
+            return ImageCms.profileToProfile(im, ImageCms.ImageCmsProfile(io.BytesIO(icc)),
+                                             ImageCms.createProfile("sRGB"), outputMode="RGB")
+        except Exception:
+            pass
+    return im.convert("RGB")
+
+
+def encode_jpeg(im: Image.Image, max_bytes: int, quality: int, min_quality: int):
+    """
+    Прогрессивный JPEG не больше max_bytes: сначала снижаем качество шагами
+    по 5 до min_quality, затем уменьшаем картинку. Возвращает (байты, качество, картинку).
+    """
+    while True:
+        for q in range(quality, min_quality - 1, -5):
+            buf = io.BytesIO()
+            # метаданные не передаются: без exif/icc_profile в save они не пишутся
+            im.save(buf, "JPEG", quality=q, optimize=True, progressive=True)
+            if buf.tell() <= max_bytes or max(im.size) <= THUMB_SIDE:
+                return buf.getvalue(), q, im
+        im = im.resize((max(1, im.width * 85 // 100), max(1, im.height * 85 // 100)), Image.LANCZOS)
+
+
+def write_atomic(path: Path, data: bytes):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def prepare_one(job: dict) -> dict:
+    """Обработать один исходник (выполняется в процессе пула)."""
+    src = Path(job["src"])
+    key = job["key"]
+    try:
+        # verify() ловит битые файлы, но после него картинку надо открыть заново
+        with Image.open(src) as im:
+            im.verify()
+        with Image.open(src) as im:
+            im.load()
+            original = {"format": im.format, "width": im.width, "height": im.height, "bytes": src.stat().st_size}
+            img = to_srgb(ImageOps.exif_transpose(im))
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError, SyntaxError) as e:
+        return {"key": key, "error": f"{type(e).__name__}: {e}"}
+
+    if max(img.size) / max(1, min(img.size)) > MAX_ASPECT:
+        return {"key": key, "error": f"aspect ratio {img.width}x{img.height} is not accepted by Telegram"}
+
+    img.thumbnail((job["max_side"], job["max_side"]), Image.LANCZOS)
+    data, quality, img = encode_jpeg(img, job["max_bytes"], job["quality"], job["min_quality"])
+    write_atomic(Path(job["out"]), data)
+
+    thumb = img.copy()
+    thumb.thumbnail((job["thumb_side"], job["thumb_side"]), Image.LANCZOS)
+    buf = io.BytesIO()
+    thumb.save(buf, "JPEG", quality=80, optimize=True, progressive=True)
+    write_atomic(Path(job["thumb"]), buf.getvalue())
+
+    return {
+        "key": key,
+        "width": img.width,
+        "height": img.height,
+        "bytes": len(data),
+        "quality": quality,
+        "original": original,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Validate and re-encode sight images for Telegram")
+    ap.add_argument("--dir", default=str(IMAGES_DIR), help="images directory")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="worker processes")
+    ap.add_argument("--max-side", type=int, default=MAX_SIDE, help="longest side of the prepared image, px")
+    ap.add_argument("--max-bytes", type=int, default=MAX_BYTES, help="size cap of the prepared image")
+    ap.add_argument("--quality", type=int, default=QUALITY, help="starting JPEG quality")
+    ap.add_argument("--thumb-side", type=int, default=THUMB_SIDE, help="longest side of the thumbnail, px")
+    ap.add_argument("--force", action="store_true", help="re-encode even unchanged images")
+    args = ap.parse_args()
+
+    directory = Path(args.dir).resolve()
+    manifest_path = directory / "manifest.json"
+    settings = {"max_side": args.max_side, "max_bytes": args.max_bytes, "quality": args.quality,
+                "min_quality": MIN_QUALITY, "thumb_side": args.thumb_side}
+    old = read_manifest(manifest_path) or {}
+    old_images = old.get("images", {})
+    # при других настройках прежние результаты не годятся
+    same_settings = old.get("settings") == settings and not args.force
+
+    sources = scan_sources(directory)
+    print(f"Found {len(sources)} source images in {directory}")
+
+    entries, jobs = {}, []
+    for key, src in sorted(sources.items(), key=lambda kv: int(kv[0])):
+        st = src.stat()
+        rel = src.relative_to(directory).as_posix()
+        prev = old_images.get(key) or {}
+        # хеш исходника пересчитывается, только если изменились mtime или размер
+        if prev.get("source") == rel and prev.get("source_mtime_ns") == st.st_mtime_ns and prev.get("source_size") == st.st_size:
+            digest = prev["source_sha256"]
+        else:
+            digest = file_sha256(src)
+        entry = {
+            "source": rel,
+            "source_sha256": digest,
+            "source_mtime_ns": st.st_mtime_ns,
+            "source_size": st.st_size,
+            "file": f"prepared/{key}.jpg",
+            "thumb": f"thumbs/{key}.jpg",
+        }
+        up_to_date = (same_settings and prev.get("source_sha256") == digest
+                      and all((directory / prev.get(k, "")).is_file() for k in ("file", "thumb")))
+        if up_to_date:
+            entries[key] = {**prev, **entry}
+            continue
+        entries[key] = entry
+        jobs.append({"key": key, "src": str(src), "out": str(directory / entry["file"]),
+                     "thumb": str(directory / entry["thumb"]), **settings})
+
+    started = time.perf_counter()
+    if len(jobs) > 1 and args.workers > 1:
+        with ProcessPoolExecutor(max_workers=min(args.workers, len(jobs))) as pool:
+            results = list(pool.map(prepare_one, jobs))
+    else:
+        results = [prepare_one(job) for job in jobs]
+    elapsed = time.perf_counter() - started
+
+    failed = 0
+    for res in results:
+        key = res.pop("key")
+        if "error" in res:
+            failed += 1
+            print(f"[INVALID] {entries[key]['source']}: {res['error']}")
+            del entries[key]
+            continue
+        entries[key].update(res)
+        orig = res["original"]
+        print(f"[OK] {entries[key]['source']}: {orig['width']}x{orig['height']} {orig['bytes']} B -> "
+              f"{res['width']}x{res['height']} {res['bytes']} B (q={res['quality']})")
+
+    # результаты для исходников, которых больше нет (или которые стали битыми)
+    for key, prev in old_images.items():
+        if key in entries:
+            continue
+        for name in (prev.get("file"), prev.get("thumb")):
+            if name and (directory / name).is_file():
+                (directory / name).unlink()
+        print(f"[REMOVED] {key}")
+
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "settings": settings,
+        "images": dict(sorted(entries.items(), key=lambda kv: int(kv[0]))),
+    }
+    write_json_atomic(str(manifest_path), manifest, indent=2)
+    before = sum(e["original"]["bytes"] for e in entries.values() if "original" in e)
+    after = sum(e.get("bytes", 0) for e in entries.values())
+    print(f"Done in {elapsed:.2f}s: encoded={len(jobs) - failed} skipped={len(sources) - len(jobs)} "
+          f"invalid={failed}; {before} B -> {after} B")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
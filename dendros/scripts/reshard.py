@@ -0,0 +1,66 @@
+# scripts/reshard.py
+# Офлайн-смена числа шардов пользователей (бот должен быть остановлен).
+# Запуск из корня проекта: python scripts/reshard.py --shards 16
+import argparse
+import os
+import shutil
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from services.sharded_store import SHARDS_DIR, load_shards, read_meta, write_shards  # noqa: E402
+from services.storage import USERS_FILE, read_json  # noqa: E402
+
+
+def load_all(directory: str, from_json: bool) -> dict:
+    meta = read_meta(directory)
+    if meta is None or from_json:
+        print(f"Reading {USERS_FILE}")
+        data = read_json(USERS_FILE, {})
+        return data if isinstance(data, dict) else {}
+    print(f"Reading {meta['shards']} shards from {directory}")
+    users = {}
+    for part in load_shards(directory, meta["shards"]):
+        users.update(part)
+    return users
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Change the number of user shard files without data loss")
+    ap.add_argument("--shards", type=int, required=True, help="new number of shards")
+    ap.add_argument("--dir", default=SHARDS_DIR, help="shards directory")
+    ap.add_argument("--from-json", action="store_true", help="build shards from data/users.json")
+    args = ap.parse_args()
+    if args.shards < 1:
+        ap.error("--shards must be >= 1")
+
+    directory = os.path.abspath(args.dir)
+    users = load_all(directory, args.from_json)
+    print(f"Loaded {len(users)} users")
+
+    new_dir = directory + ".new"
+    shutil.rmtree(new_dir, ignore_errors=True)
+    write_shards(new_dir, users, args.shards)
+
+    # проверяем, что новые шарды содержат ровно тех же пользователей
+    check = {}
+    for part in load_shards(new_dir, args.shards):
+        check.update(part)
+    if check != users:
+        shutil.rmtree(new_dir, ignore_errors=True)
+        print("Verification failed, nothing changed")
+        return 1
+
+    if os.path.exists(directory):
+        backup = f"{directory}.bak-{time.strftime('%Y%m%d-%H%M%S')}"
+        os.replace(directory, backup)
+        print(f"Old shards kept in {backup}")
+    os.replace(new_dir, directory)
+    print(f"Done: {len(users)} users in {args.shards} shards")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
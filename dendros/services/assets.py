@@ -0,0 +1,196 @@
+# services/assets.py
+import hashlib
+import logging
+import os
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramAPIError, TelegramBadRequest
+from aiogram.types import FSInputFile, InputMediaPhoto, Message
+
+from services.fileio import run_io, submit_write
+from services.storage import DATA_DIR, read_json, write_json_atomic
+
+ASSETS_FILE = os.path.join(DATA_DIR, "file_ids.json")
+
+logger = logging.getLogger(__name__)
+
+# sha256 содержимого -> {"photo": file_id, "document": file_id}.
+# Ключ — хеш, а не путь: заменённая картинка получает новый ключ и загружается заново.
+_registry: Dict[str, Dict[str, str]] = {}
+# путь -> (mtime_ns, размер, sha256): файл перечитывается только если изменился
+_digests: Dict[str, Tuple[int, int, str]] = {}
+stats = {"hits": 0, "uploads": 0, "stale": 0}
+
+
+def _load():
+    data = read_json(ASSETS_FILE, {})
+    if isinstance(data, dict):
+        _registry.update({k: v for k, v in data.items() if isinstance(v, dict)})
+    logger.info("Asset registry: %d files", len(_registry))
+
+
+def _digest_sync(path: str) -> Optional[str]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    cached = _digests.get(path)
+    if cached and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+        return cached[2]
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            h.update(chunk)
+    digest = h.hexdigest()
+    _digests[path] = (st.st_mtime_ns, st.st_size, digest)
+    return digest
+
+
+async def file_digest(path) -> Optional[str]:
+    """sha256 файла (None — файла нет); stat и чтение — в пуле ввода-вывода."""
+    return await run_io(_digest_sync, str(path))
+
+
+def _save():
+    submit_write("assets", write_json_atomic, ASSETS_FILE, {k: dict(v) for k, v in _registry.items()})
+
+
+def remember(digest: str, kind: str, file_id: str):
+    if _registry.get(digest, {}).get(kind) == file_id:
+        return
+    _registry.setdefault(digest, {})[kind] = file_id
+    _save()
+
+
+def forget(digest: str, kind: str):
+    entry = _registry.get(digest)
+    if entry and entry.pop(kind, None) is not None:
+        if not entry:
+            del _registry[digest]
+        _save()
+
+
+def _file_id_of(msg: Any, kind: str) -> Optional[str]:
+    if not isinstance(msg, Message):
+        return None
+    if kind == "photo" and msg.photo:
+        return msg.photo[-1].file_id
+    if kind == "document" and msg.document:
+        return msg.document.file_id
+    return None
+
+
+async def _send(kind: str, send: Callable[..., Awaitable[Any]], path, **kwargs) -> Optional[Any]:
+    """
+    Отправить файл: по file_id из реестра, если он есть, иначе загрузить и
+    запомнить file_id из ответа. None — файла нет на диске.
+    """
+    digest = await file_digest(path)
+    if digest is None:
+        return None
+    file_id = _registry.get(digest, {}).get(kind)
+    if file_id:
+        try:
+            msg = await send(file_id, **kwargs)
+            stats["hits"] += 1
+            return msg
+        except TelegramBadRequest as e:
+            # file_id протух (другой бот, удалён на стороне Telegram) — загружаем заново
+            logger.warning("Cached file_id for %s rejected: %s", path, e)
+            stats["stale"] += 1
+            forget(digest, kind)
+    msg = await send(FSInputFile(str(path)), **kwargs)
+    stats["uploads"] += 1
+    file_id = _file_id_of(msg, kind)
+    if file_id:
+        remember(digest, kind, file_id)
+    return msg
+
+
+async def send_photo(message: Message, path, **kwargs) -> Optional[Message]:
+    return await _send("photo", lambda photo, **kw: message.answer_photo(photo=photo, **kw), path, **kwargs)
+
+
+async def send_document(message: Message, path, **kwargs) -> Optional[Message]:
+    return await _send("document", lambda doc, **kw: message.answer_document(document=doc, **kw), path, **kwargs)
+
+
+async def send_media_group(message: Message, paths: Iterable, **kwargs) -> Optional[List[Message]]:
+    """
+    Отправить картинки одним альбомом (sendMediaGroup, до 10 штук): уже известные
+    file_id берутся из реестра, остальные файлы загружаются, и их file_id
+    запоминаются из вернувшихся сообщений. Один файл уходит обычным фото.
+    None — ни одного файла нет на диске.
+    """
+    pairs = []
+    for path in paths:
+        digest = await file_digest(path)
+        if digest is not None:
+            pairs.append((path, digest))
+    if not pairs:
+        return None
+    if len(pairs) == 1:
+        msg = await send_photo(message, pairs[0][0], **kwargs)
+        return [msg] if msg else None
+    for attempt in range(2):
+        # при повторе всё загружается заново: по ошибке не понять, какой file_id протух
+        cached = [] if attempt else [d for _, d in pairs if _registry.get(d, {}).get("photo")]
+        media = [InputMediaPhoto(media=_registry[d]["photo"] if d in cached else FSInputFile(str(p)))
+                 for p, d in pairs]
+        try:
+            msgs = await message.answer_media_group(media=media, **kwargs)
+        except TelegramBadRequest as e:
+            if not cached:
+                raise
+            logger.warning("Cached file_ids for an album of %d rejected: %s", len(pairs), e)
+            stats["stale"] += len(cached)
+            for d in cached:
+                forget(d, "photo")
+            continue
+        stats["hits"] += len(cached)
+        stats["uploads"] += len(pairs) - len(cached)
+        changed = False
+        for (_, digest), msg in zip(pairs, msgs):
+            file_id = _file_id_of(msg, "photo")
+            if file_id and _registry.get(digest, {}).get("photo") != file_id:
+                _registry.setdefault(digest, {})["photo"] = file_id
+                changed = True
+        # реестр пишется на диск один раз на альбом, а не на каждый файл
+        if changed:
+            _save()
+        return msgs
+
+
+async def prewarm(bot: Bot, chat_id: int, paths: Iterable) -> int:
+    """
+    Загрузить в служебный чат картинки, для которых ещё нет file_id, — чтобы
+    первый пользователь не ждал загрузки. Возвращает число загруженных файлов.
+    """
+    uploaded = 0
+    for path in paths:
+        if not path:
+            continue
+        digest = await file_digest(path)
+        if digest is None or _registry.get(digest, {}).get("photo"):
+            continue
+        try:
+            msg = await bot.send_photo(chat_id, FSInputFile(str(path)), disable_notification=True)
+        except TelegramAPIError as e:
+            logger.warning("Pre-warm upload of %s failed: %s", path, e)
+            continue
+        file_id = _file_id_of(msg, "photo")
+        if file_id:
+            remember(digest, "photo", file_id)
+            uploaded += 1
+    logger.info("Pre-warmed %d images into chat %s", uploaded, chat_id)
+    return uploaded
+
+
+def get_stats() -> Dict[str, int]:
+    s = dict(stats)
+    s["registered"] = len(_registry)
+    return s
+
+
+_load()
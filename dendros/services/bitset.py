@@ -0,0 +1,46 @@
+# services/bitset.py
+import base64
+import binascii
+
+
+class Bitset:
+    """
+    Компактное множество неотрицательных чисел: бит на число в bytearray.
+    Проверка и добавление — O(1); в хранилище пишется строкой base64
+    (тысяча вопросов — около 170 символов на пользователя).
+    """
+
+    __slots__ = ("_b",)
+
+    def __init__(self, data: bytes = b""):
+        self._b = bytearray(data)
+
+    def __contains__(self, i: int) -> bool:
+        j = i >> 3
+        return j < len(self._b) and bool(self._b[j] >> (i & 7) & 1)
+
+    def add(self, i: int):
+        j = i >> 3
+        if j >= len(self._b):
+            self._b.extend(bytes(j + 1 - len(self._b)))
+        self._b[j] |= 1 << (i & 7)
+
+    def discard(self, i: int):
+        j = i >> 3
+        if j < len(self._b):
+            self._b[j] &= ~(1 << (i & 7)) & 0xFF
+
+    def __len__(self) -> int:
+        return sum(bin(b).count("1") for b in self._b)
+
+    def to_str(self) -> str:
+        return base64.b64encode(bytes(self._b).rstrip(b"\0")).decode("ascii")
+
+    @classmethod
+    def from_str(cls, s) -> "Bitset":
+        if not s or not isinstance(s, str):
+            return cls()
+        try:
+            return cls(base64.b64decode(s, validate=True))
+        except (binascii.Error, ValueError):
+            return cls()
@@ -0,0 +1,215 @@
+# services/broadcast.py
+import asyncio
+import html
+import logging
+import os
+import re
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError
+
+from services import db, messenger
+from services.fanout import fan_out
+from services.fileio import submit_write
+from services.i18n import t
+from services.storage import DATA_DIR, read_json, write_json_atomic
+
+BROADCAST_FILE = os.path.join(DATA_DIR, "broadcast.json")
+# Пачка получателей: после каждой позиция сохраняется, при рестарте повторится не больше пачки
+CHUNK = int(os.getenv("BROADCAST_CHUNK", "200"))
+# Как часто обновлять сообщение о ходе рассылки у админа
+REPORT_INTERVAL = float(os.getenv("BROADCAST_REPORT_INTERVAL", "5"))
+
+# Строка "[ru]" / "[kz]" / "[en]" начинает вариант объявления на этом языке
+_LANG_MARK = re.compile(r"^\[(ru|kz|en)\][ \t]*$", re.M)
+
+logger = logging.getLogger(__name__)
+
+# Текущая (или последняя) рассылка; сохраняется в data/broadcast.json
+_job: Optional[Dict[str, Any]] = None
+_task: Optional[asyncio.Task] = None
+
+
+def split_variants(text: str) -> Dict[str, str]:
+    """
+    "[ru]\\nПривет\\n[en]\\nHello" -> {"ru": "Привет", "en": "Hello"}.
+    Без меток — один вариант для всех языков: {"": text}.
+    """
+    parts = _LANG_MARK.split(text)
+    if len(parts) < 3:
+        return {"": text.strip()}
+    variants = {}
+    for i in range(1, len(parts) - 1, 2):
+        body = parts[i + 1].strip()
+        if body:
+            variants[parts[i]] = body
+    return variants or {"": text.strip()}
+
+
+def render(job: Dict[str, Any], lang: str) -> str:
+    """Текст для пользователя с языком lang: его вариант, иначе общий или русский, иначе любой."""
+    variants = job["variants"]
+    body = variants.get(lang) or variants.get("") or variants.get("ru") or next(iter(variants.values()))
+    return t(lang, "broadcast_message", text=html.escape(body))
+
+
+def _checkpoint():
+    submit_write("broadcast", write_json_atomic, BROADCAST_FILE, dict(_job))
+
+
+def _load():
+    global _job
+    data = read_json(BROADCAST_FILE, None)
+    if isinstance(data, dict) and isinstance(data.get("variants"), dict):
+        _job = data
+
+
+def current() -> Optional[Dict[str, Any]]:
+    return _job
+
+
+def is_running() -> bool:
+    return _task is not None and not _task.done()
+
+
+def create(admin_id: int, event: Dict[str, Any]) -> Dict[str, Any]:
+    """Новая рассылка объявления event всем, кто не заблокировал бота."""
+    global _job
+    _job = {
+        "event_id": event.get("id"),
+        "variants": split_variants(str(event.get("title", ""))),
+        "admin_id": admin_id,
+        "report": None,  # (chat_id, message_id) сообщения о ходе рассылки
+        "state": "running",  # running -> paused / done
+        "cursor": 0,  # последний обработанный id пользователя
+        "total": db.count_recipients(),
+        "sent": 0,
+        "blocked": 0,
+        "failed": 0,
+        "created": int(time.time()),
+    }
+    _checkpoint()
+    return _job
+
+
+def pause():
+    if _job and _job["state"] == "running":
+        _job["state"] = "paused"
+        _checkpoint()
+
+
+def progress_text(job: Dict[str, Any], rate: float = 0.0) -> str:
+    done = job["sent"] + job["blocked"] + job["failed"]
+    total = max(job["total"], done)
+    state = {"running": "идёт", "paused": "на паузе", "done": "завершена"}[job["state"]]
+    lines = [
+        f"📣 Рассылка объявления #{job['event_id']}: {state}",
+        f"Обработано: {done} из {total} ({done / total:.0%})" if total else "Получателей нет",
+        f"✅ Доставлено: {job['sent']}  🚫 Заблокировали бота: {job['blocked']}  ⚠️ Ошибок: {job['failed']}",
+    ]
+    if job["state"] == "running" and rate > 0:
+        eta = int(max(0, total - done) / rate)
+        lines.append(f"Скорость: {rate:.1f} сообщ./с, осталось ≈ {eta // 60}:{eta % 60:02d}")
+    return "\n".join(lines)
+
+
+async def _report(bot: Bot, rate: float):
+    if not _job or not _job.get("report"):
+        return
+    chat_id, message_id = _job["report"]
+    text = progress_text(_job, rate)
+    try:
+        await messenger.send(chat_id, lambda: bot.edit_message_text(text, chat_id=chat_id, message_id=message_id),
+                             messenger.NORMAL)
+    except TelegramBadRequest as e:
+        # «message is not modified» — цифры не изменились
+        logger.debug("Broadcast report skipped: %s", e)
+
+
+async def _run(bot: Bot):
+    job = _job
+    # текст собирается один раз на язык, а не на каждого получателя
+    texts = {lang: render(job, lang) for lang in ("ru", "kz", "en")}
+    started, processed = time.monotonic(), 0
+    last_report = 0.0
+
+    def rate() -> float:
+        elapsed = time.monotonic() - started
+        return processed / elapsed if elapsed > 0 else 0.0
+
+    def sender(langs: Dict[int, str], blocked: list) -> Callable[[int], Awaitable[Any]]:
+        async def send(chat_id: int):
+            try:
+                return await bot.send_message(chat_id, texts.get(langs[chat_id]) or texts["ru"])
+            except (TelegramForbiddenError, TelegramBadRequest) as e:
+                # заблокировал бота, удалён или чата больше нет — больше ему не пишем
+                if isinstance(e, TelegramForbiddenError) or "chat not found" in str(e).lower():
+                    db.set_user_blocked(chat_id)
+                    blocked.append(chat_id)
+                raise
+        return send
+
+    logger.info("Broadcast of event %s started at user %s", job["event_id"], job["cursor"])
+    try:
+        for last_id, chunk in db.iter_user_chunks(after=job["cursor"], size=CHUNK):
+            if job["state"] != "running":
+                break
+            langs, blocked = dict(chunk), []
+            results = await fan_out(list(langs), sender(langs, blocked), priority=messenger.BULK)
+            delivered = sum(1 for r in results.values() if r is not None)
+            job["sent"] += delivered
+            job["blocked"] += len(blocked)
+            # прочие сбои (исчерпаны повторы после RetryAfter, сеть, неверный текст) — ошибки
+            job["failed"] += len(results) - delivered - len(blocked)
+            processed += len(results)
+            job["cursor"] = last_id
+            _checkpoint()
+            if time.monotonic() - last_report >= REPORT_INTERVAL:
+                last_report = time.monotonic()
+                await _report(bot, rate())
+        else:
+            job["state"] = "done"
+            _checkpoint()
+        await _report(bot, rate())
+        logger.info("Broadcast of event %s %s: sent=%d blocked=%d failed=%d", job["event_id"], job["state"],
+                    job["sent"], job["blocked"], job["failed"])
+    except asyncio.CancelledError:
+        # остановка бота: позиция уже сохранена после последней пачки
+        _checkpoint()
+        raise
+    except Exception:
+        logger.exception("Broadcast of event %s failed", job["event_id"])
+        job["state"] = "paused"
+        _checkpoint()
+
+
+def start(bot: Bot) -> asyncio.Task:
+    """Запустить (или продолжить с сохранённой позиции) текущую рассылку в фоне."""
+    global _task
+    _job["state"] = "running"
+    _checkpoint()
+    _task = asyncio.create_task(_run(bot))
+    return _task
+
+
+def resume(bot: Bot) -> Optional[asyncio.Task]:
+    """При старте бота: продолжить рассылку, прерванную перезапуском."""
+    if _job and _job["state"] == "running" and not is_running():
+        logger.info("Resuming broadcast of event %s after user %s", _job["event_id"], _job["cursor"])
+        return start(bot)
+    return None
+
+
+async def stop():
+    """Остановка бота: прервать задачу; состояние running сохраняется, чтобы продолжить после рестарта."""
+    if is_running():
+        _task.cancel()
+        try:
+            await _task
+        except asyncio.CancelledError:
+            pass
+
+
+_load()
@@ -1,71 +1,248 @@
 # services/db.py
-import json
+import asyncio
+import logging
 import os
-from typing import Dict, Any, Optional
+import time
+from bisect import bisect_right
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+
+from services.bitset import Bitset
+from services.events_index import EventsIndex
+from services.fileio import drain_writes, run_serial, submit_write
+from services.ranking import ScoreIndex
+from services.storage import open_store
+from services.usertable import UserRecord, intern_lang
 
 DB_FILE = os.path.join(os.path.dirname(__file__), "..", "data", "users.json")
-_EVENTS_FILE = os.path.join(os.path.dirname(__file__), "..", "data", "events.json")
 
-# В памяти
-_users: Dict[str, Dict[str, Any]] = {}
+logger = logging.getLogger(__name__)
+
+# В памяти: компактные записи (services/usertable.py), ключ — числовой id
+_users: Dict[int, UserRecord] = {}
+# Хранилище (см. services/storage.py): journal по умолчанию, sqlite или json — по DB_BACKEND
+_store = None
+# Пользователи с активной викториной — проверка за O(1) для роутинга
+_active_quiz: set = set()
+# Упорядоченный индекс очков для лидерборда (обновляется при каждом изменении квиза)
+_scores = ScoreIndex()
+# Кэш событий, отсортированный по дате (перечитывается только при правках извне)
+_events = EventsIndex()
+
+# Write-behind: мутации только помечают пользователя грязным, а фоновая задача
+# (run_flusher) сбрасывает накопленное пачкой. Выключено — запись сразу.
+WRITE_BEHIND = os.getenv("DB_WRITE_BEHIND", "0") == "1"
+FLUSH_INTERVAL = float(os.getenv("DB_FLUSH_INTERVAL", "2.0"))
+FLUSH_MAX_DIRTY = int(os.getenv("DB_FLUSH_MAX_DIRTY", "500"))
+
+_dirty: set = set()
+_dirty_event: Optional[asyncio.Event] = None
+_write_stats = {"mutations": 0, "records_written": 0, "flushes": 0}
+
+# Все записи в стор идут через services.fileio с этим ключом: строго по порядку, вне event loop
+_WRITE_KEY = "storage"
 
 def _ensure_data_dir():
     os.makedirs(os.path.dirname(DB_FILE), exist_ok=True)
 
-def _load():
-    global _users
+def _key(user_id: int) -> int:
+    return int(user_id)
+
+def _reindex(k: int):
+    u = _users[k]
+    _scores.update(k, u.id, u.quiz_score)
+
+def _dump_users(keys=None) -> Dict[str, Dict[str, Any]]:
+    """
+    Пользователи в формате хранения — для снапшотов стора (может звать поток записи).
+    keys — только эти ключи хранения (например, один шард), иначе все.
+    """
+    if keys is not None:
+        out = {}
+        for k in list(keys):
+            rec = _users.get(int(k))
+            if rec is not None:
+                out[str(k)] = rec.to_dict()
+        return out
+    # list() копирует словарь атомарно, даже если цикл сейчас добавляет пользователей
+    return {str(k): rec.to_dict() for k, rec in list(_users.items())}
+
+def init_storage(backend: Optional[str] = None):
+    """
+    Выбрать бэкенд хранения и загрузить пользователей.
+    Повторный вызов с тем же бэкендом ничего не делает.
+    """
+    global _users, _store
+    backend = backend or os.getenv("DB_BACKEND", "journal")
+    if _store is not None and _store.name == backend:
+        return
+    close_storage()
+    _ensure_data_dir()
+    _store = open_store(backend)
+    _store.snapshot_source = _dump_users
     try:
-        _ensure_data_dir()
-        with open(DB_FILE, "r", encoding="utf-8") as f:
-            _users = json.load(f)
+        raw = _store.load()
     except Exception:
-        _users = {}
+        logger.exception("Failed to load users with backend %s", backend)
+        raw = {}
+    # сырые dict'ы из стора сразу превращаются в компактные записи и отпускаются
+    _users = {}
+    for k in list(raw):
+        _users[int(k)] = UserRecord.from_dict(k, raw.pop(k))
+    _scores.rebuild((k, u.id, u.quiz_score) for k, u in _users.items())
+    _active_quiz.clear()
+    _active_quiz.update(k for k, u in _users.items() if u.progress is not None)
+    # чтения событий — в очереди записей стора: соединение SQLite одно на все потоки
+    _events.bind(_store, io=lambda func: run_serial(_WRITE_KEY, func))
+    logger.info("User storage: backend=%s users=%d", backend, len(_users))
+
+def is_storage_ready() -> bool:
+    """Хранилище открыто и пользователи загружены (для проверки готовности)."""
+    return _store is not None
+
+def close_storage():
+    """
+    Сбросить все изменения на диск и закрыть хранилище.
+    Из асинхронного кода перед этим нужно дождаться drain_writes().
+    """
+    global _store
+    if _store is not None:
+        flush()
+        try:
+            _store.close()
+        except Exception:
+            logger.exception("Failed to close user storage")
+        _store = None
+
+def _save(k: int):
+    """Сохранить изменения одного пользователя (или отложить, если включён write-behind)."""
+    _write_stats["mutations"] += 1
+    if WRITE_BEHIND:
+        _dirty.add(k)
+        if _dirty_event is not None and len(_dirty) >= FLUSH_MAX_DIRTY:
+            _dirty_event.set()
+        return
+    # сама запись — в пуле ввода-вывода, чтобы не блокировать event loop
+    submit_write(_WRITE_KEY, _store.put_many, [(str(k), _users[k].to_dict())])
+    _write_stats["records_written"] += 1
+    _write_stats["flushes"] += 1
+    _compact_if_needed()
+
+def _compact_if_needed():
+    """
+    Журнал разросся (стор выставил wants_compaction): снапшот собирается здесь, в
+    цикле, где меняются записи, и уходит в compact() той же очередью, что и пачки flush() —
+    поток записи не читает живые записи посреди их изменения.
+    """
+    if getattr(_store, "wants_compaction", False):
+        _store.wants_compaction = False
+        submit_write(_WRITE_KEY, _store.compact, _dump_users())
+
+def _take_dirty() -> list:
+    keys = list(_dirty)
+    _dirty.clear()
+    # to_dict() — копия: цикл может менять запись, пока поток пишет
+    return [(str(k), _users[k].to_dict()) for k in keys if k in _users]
 
-def _save():
+def _put_batch(items: list):
     try:
-        _ensure_data_dir()
-        with open(DB_FILE, "w", encoding="utf-8") as f:
-            json.dump(_users, f, ensure_ascii=False, indent=2)
+        _store.put_many(items)
     except Exception:
-        pass
+        # вернём ключи, чтобы попробовать в следующий раз
+        _dirty.update(int(k) for k, _ in items)
+        logger.exception("Write-behind flush failed for %d users", len(items))
+        return
+    _write_stats["records_written"] += len(items)
+    _write_stats["flushes"] += 1
 
-# Инициализация при импорте
-_load()
+def flush() -> int:
+    """Синхронно записать всех грязных пользователей одной пачкой. Возвращает число записей."""
+    if not _dirty or _store is None:
+        return 0
+    items = _take_dirty()
+    if items:
+        _put_batch(items)
+    return len(items)
 
-def _key(user_id: int) -> str:
-    return str(user_id)
+async def flush_async() -> int:
+    """То же, что flush(), но запись выполняется в пуле ввода-вывода."""
+    if not _dirty or _store is None:
+        return 0
+    items = _take_dirty()
+    if items:
+        await submit_write(_WRITE_KEY, _put_batch, items)
+        _compact_if_needed()
+    return len(items)
 
-def ensure_user(user_id: int, username: str = "", name: str = "") -> Dict[str, Any]:
-    """Создаёт запись пользователя если её нет и возвращает её."""
+async def run_flusher(interval: Optional[float] = None, max_dirty: Optional[int] = None):
+    """
+    Фоновая задача write-behind: сбрасывает изменения не чаще раза в interval
+    секунд, либо раньше — когда грязных записей набралось max_dirty.
+    Запускается из main.py при DB_WRITE_BEHIND=1; при отмене делает финальный flush.
+    """
+    global _dirty_event, FLUSH_INTERVAL, FLUSH_MAX_DIRTY
+    if interval is not None:
+        FLUSH_INTERVAL = interval
+    if max_dirty is not None:
+        FLUSH_MAX_DIRTY = max_dirty
+    _dirty_event = asyncio.Event()
+    try:
+        while True:
+            try:
+                await asyncio.wait_for(_dirty_event.wait(), timeout=FLUSH_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            _dirty_event.clear()
+            await flush_async()
+    finally:
+        await drain_writes()
+        flush()
+        _dirty_event = None
+
+def get_write_stats() -> Dict[str, int]:
+    """Счётчики записи: сколько мутаций было и сколько записей реально ушло на диск."""
+    stats = dict(_write_stats)
+    stats["pending"] = len(_dirty)
+    stats["writes_saved"] = max(0, stats["mutations"] - stats["records_written"] - stats["pending"])
+    return stats
+
+# Инициализация при импорте
+init_storage()
+
+def ensure_user(user_id: int, username: str = "", name: str = "") -> UserRecord:
+    """
+    Создаёт запись пользователя если её нет и возвращает её.
+    Запись читается как старый dict: u.get("lang"), u["quiz"].
+    """
     k = _key(user_id)
-    if k not in _users:
-        _users[k] = {
-            "id": user_id,
-            "username": username or "",
-            "name": name or "",
-            "lang": "ru",   # язык по умолчанию
-            "quiz": None    # структура: {"active": True, "progress": int, "score": int}
-        }
-        _save()
-    return _users[k]
-
-def get_user(user_id: int) -> Optional[Dict[str, Any]]:
+    u = _users.get(k)
+    if u is None:
+        # язык по умолчанию — ru, викторины нет
+        u = _users[k] = UserRecord(user_id, username or "", name or "", "ru")
+        _reindex(k)
+        _save(k)
+    elif u.extra and "blocked" in u.extra:
+        # пользователь снова пишет боту — значит, разблокировал его
+        u.set_extra("blocked", None)
+        _save(k)
+    return u
+
+def get_user(user_id: int) -> Optional[UserRecord]:
     return _users.get(_key(user_id))
 
 def set_user_lang(user_id: int, lang: str):
     """Установить язык пользователя (kz/ru/en)."""
-    ensure_user(user_id)
+    u = ensure_user(user_id)
     if lang not in ("kz", "ru", "en"):
         lang = "ru"
-    _users[_key(user_id)]["lang"] = lang
-    _save()
+    u.lang = intern_lang(lang)
+    _save(_key(user_id))
 
 def get_user_lang(user_id: int) -> str:
     """Получить язык пользователя. По умолчанию 'ru'."""
-    u = get_user(user_id)
+    u = _users.get(_key(user_id))
     if not u:
         return "ru"
-    return u.get("lang", "ru")
+    return u.lang or "ru"
 
 # backward compatibility alias
 def get_lang(user_id: int) -> str:
@@ -73,120 +250,215 @@ def get_lang(user_id: int) -> str:
 
 # ----------------- quiz state helpers -----------------
 
-def start_quiz(user_id: int):
-    """Запустить викторину для пользователя (инициализирует состояние)."""
-    ensure_user(user_id)
-    _users[_key(user_id)]["quiz"] = {"active": True, "progress": 0, "score": 0}
-    _save()
+def _set_deadline(u: UserRecord, deadline: Optional[float]):
+    """Дедлайн вопроса, на котором теперь стоит пользователь (None — без лимита или вопросов больше нет)."""
+    order = u.order
+    if deadline is None or (order is not None and u.progress >= len(order)):
+        u.set_extra("q_deadline", None)
+        return
+    question = order[u.progress] if order is not None else u.progress
+    u.set_extra("q_deadline", [round(deadline, 2), question])
+
+def start_quiz(user_id: int, order: Optional[List[int]] = None, seen: Optional[Bitset] = None,
+               deadline: Optional[float] = None, layout: Optional[str] = None):
+    """
+    Запустить викторину для пользователя (инициализирует состояние).
+    order — номера вопросов сессии в банке, seen — обновлённые метки просмотренных
+    вопросов, deadline — дедлайн первого вопроса, layout — раскладка банка (QuizBank.layout),
+    к которой относятся номера в order и seen; сохраняются одной записью вместе с состоянием.
+    """
+    u = ensure_user(user_id)
+    u.start_quiz(order)
+    if seen is not None:
+        u.set_extra("seen", seen.to_str() or None)
+    u.set_extra("bank_v", layout)
+    _set_deadline(u, deadline)
+    k = _key(user_id)
+    _active_quiz.add(k)
+    _reindex(k)
+    _save(k)
 
 def stop_quiz(user_id: int):
     """Остановить викторину (обнулить состояние)."""
-    ensure_user(user_id)
-    _users[_key(user_id)]["quiz"] = None
-    _save()
+    u = ensure_user(user_id)
+    u.stop_quiz()
+    u.set_extra("q_deadline", None)
+    k = _key(user_id)
+    _active_quiz.discard(k)
+    _reindex(k)
+    _save(k)
 
 def is_quiz_active(user_id: int) -> bool:
-    u = get_user(user_id)
-    return bool(u and u.get("quiz") and u["quiz"].get("active"))
+    return user_id in _active_quiz
 
-def get_quiz_state(user_id: int) -> Dict[str, int]:
+def get_quiz_state(user_id: int) -> Dict[str, Any]:
     """Вернуть прогресс и score — безопасно, даже если квиз не активен."""
-    u = get_user(user_id)
-    if not u or not u.get("quiz"):
-        return {"progress": 0, "score": 0}
-    q = u["quiz"]
-    return {"progress": q.get("progress", 0), "score": q.get("score", 0)}
-
-def advance_quiz(user_id: int, correct: bool):
-    """Продвинуть прогресс на 1; увеличить score если correct==True."""
-    u = get_user(user_id)
-    if not u:
+    u = _users.get(_key(user_id))
+    if not u or u.progress is None:
+        return {"progress": 0, "score": 0, "order": None, "layout": None}
+    return {"progress": u.progress, "score": u.score, "order": u.order, "layout": u.get("bank_v")}
+
+def get_quiz_deadline(user_id: int) -> Optional[Tuple[float, int]]:
+    """(дедлайн, номер вопроса), сохранённые start_quiz/advance_quiz, или None."""
+    u = _users.get(_key(user_id))
+    d = u.get("q_deadline") if u and u.progress is not None else None
+    if isinstance(d, list) and len(d) == 2:
+        return float(d[0]), int(d[1])
+    return None
+
+def list_quiz_deadlines() -> List[tuple]:
+    """[(user_id, deadline, номер вопроса)] для активных викторин с дедлайном."""
+    out = []
+    for k in _active_quiz:
+        d = _users[k].get("q_deadline")
+        if isinstance(d, list) and len(d) == 2:
+            out.append((k, float(d[0]), int(d[1])))
+    return out
+
+def get_seen(user_id: int, layout: Optional[str]) -> Bitset:
+    """
+    Недавно показанные пользователю вопросы (битовое множество из записи).
+    Метки записаны для раскладки банка из start_quiz: если с тех пор вопросы
+    переставлены или добавлены, номера указывают на другие вопросы — история сбрасывается.
+    """
+    u = _users.get(_key(user_id))
+    if not u or u.get("bank_v") != layout:
+        return Bitset()
+    return Bitset.from_str(u.get("seen"))
+
+def get_gallery_page(user_id: int) -> int:
+    """Страница галереи, на которой пользователь остановился (курсор /gallery_next)."""
+    u = _users.get(_key(user_id))
+    page = u.get("gallery") if u else None
+    return page if isinstance(page, int) else -1
+
+def set_gallery_page(user_id: int, page: int):
+    u = _users.get(_key(user_id))
+    if u is None or u.get("gallery") == page:
         return
-    q = u.get("quiz")
-    if not q:
+    u.set_extra("gallery", page)
+    _save(_key(user_id))
+
+def advance_quiz(user_id: int, correct: bool, deadline: Optional[float] = None):
+    """
+    Продвинуть прогресс на 1; увеличить score если correct==True.
+    deadline — дедлайн следующего вопроса: пишется той же записью, что и прогресс.
+    """
+    k = _key(user_id)
+    u = _users.get(k)
+    if not u or u.progress is None:
         return
     if correct:
-        q["score"] = q.get("score", 0) + 1
-    q["progress"] = q.get("progress", 0) + 1
-    u["quiz"] = q
-    _save()
+        u.score += 1
+    u.progress += 1
+    _set_deadline(u, deadline)
+    if correct:
+        _reindex(k)
+    _save(k)
 
 # ----------------- events helpers -----------------
 
-def _load_events() -> dict:
+def _write_event(event: dict, events: list, next_id: int):
+    _store.add_event(event, events, next_id)
+    _events.mark_written()
+
+async def add_event(event) -> dict:
+    """
+    Добавить событие. event — словарь с произвольными полями (например: title, date, desc)
+    или просто текст объявления. Возвращает сохранённое событие с полем id.
+    """
+    if not isinstance(event, dict):
+        event = {"title": str(event)}
+    # сначала подтянуть правки файла извне, иначе id может совпасть с чужим
+    await _events.refresh()
+    event_copy, events, next_id = _events.add(event)
+    submit_write(_WRITE_KEY, _write_event, event_copy, events, next_id)
+    return event_copy
+
+async def get_events() -> list:
+    """Вернуть список всех событий (список словарей), отсортированный по дате."""
     try:
-        os.makedirs(os.path.dirname(_EVENTS_FILE), exist_ok=True)
-        with open(_EVENTS_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
+        await _events.refresh()
+        return _events.all()
     except Exception:
-        return {"events": []}
+        logger.exception("Failed to load events")
+        return []
 
-def _save_events(data: dict):
+async def get_events_between(start=None, end=None) -> list:
+    """События с датой в диапазоне [start, end] ('YYYY-MM-DD'; None — без границы)."""
     try:
-        os.makedirs(os.path.dirname(_EVENTS_FILE), exist_ok=True)
-        with open(_EVENTS_FILE, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        await _events.refresh()
+        return _events.between(start, end)
     except Exception:
-        pass
+        logger.exception("Failed to load events")
+        return []
+
+def list_users() -> list:
+    """Вернуть список всех пользователей (записи читаются как словари)."""
+    return list(_users.values())
+
+def set_user_blocked(user_id: int):
+    """Пометить, что пользователь заблокировал бота или удалён — рассылки его пропускают."""
+    u = _users.get(_key(user_id))
+    if u is None or u.get("blocked"):
+        return
+    u.set_extra("blocked", int(time.time()))
+    _save(_key(user_id))
 
-def add_event(event: dict) -> dict:
+def iter_user_chunks(after: int = 0, size: int = 500) -> Iterator[Tuple[int, List[Tuple[int, str]]]]:
     """
-    Добавить событие. event — словарь с произвольными полями (например: title, date, desc).
-    Возвращает сохранённое событие с полем id.
+    Получатели рассылки по возрастанию id, пачками по size: (последний id пачки,
+    [(id, lang)]). after — id, на котором остановились в прошлый раз. Заблокировавшие
+    бота пропускаются; язык читается в момент выдачи пачки.
     """
-    data = _load_events()
-    events = data.get("events", [])
-    next_id = 1
-    if events:
-        try:
-            next_id = max([e.get("id", 0) for e in events]) + 1
-        except Exception:
-            next_id = len(events) + 1
-    event_copy = dict(event)
-    event_copy["id"] = next_id
-    events.append(event_copy)
-    data["events"] = events
-    _save_events(data)
-    return event_copy
+    ids = sorted(_users)
+    i = bisect_right(ids, after)
+    while i < len(ids):
+        part = ids[i:i + size]
+        i += size
+        chunk = []
+        for k in part:
+            u = _users.get(k)
+            if u is not None and not u.get("blocked"):
+                chunk.append((k, u.lang or "ru"))
+        yield part[-1], chunk
 
-def get_events() -> list:
-    """Вернуть список всех событий (список словарей)."""
-    data = _load_events()
-    return data.get("events", [])
-
-def list_users() -> list:
-    """Вернуть список всех пользователей (список словарей)."""
-    return list(_users.values())
+def count_recipients(after: int = 0) -> int:
+    """Сколько пользователей с id больше after получат рассылку."""
+    return sum(1 for k, u in list(_users.items()) if k > after and not u.get("blocked"))
 
 # ----------------- дополнительные утилиты -----------------
 
 def reset_db_file():
     """Утилита для разработки: очищает файл пользователей (не вызывай в проде)."""
-    global _users
-    _users = {}
-    _save()
+    _dirty.clear()
+    _scores.clear()
+    _active_quiz.clear()
+    _users.clear()
+    # в той же очереди, что и put_many: записи, поставленные раньше, не воскресят удалённых;
+    # вне event loop (скрипт) стор очищается сразу
+    submit_write(_WRITE_KEY, _store.reset)
 
 def get_leaderboard(limit: int = 10) -> list:
     """
     Вернуть топ пользователей по полю quiz.score.
     Возвращает список словарей вида: {"id": id, "username": username, "name": name, "score": score}
-    Сортирует по убыванию score и по возрастанию id при равных значениях.
+    Порядок — score по убыванию, id по возрастанию при равных значениях;
+    берётся из готового индекса, без сортировки всех пользователей.
     """
     items = []
-    for u in _users.values():
-        q = u.get("quiz")
-        score = 0
-        if q and isinstance(q, dict):
-            # если прогресс может превышать длину викторины, используем явное поле score
-            score = q.get("score", 0)
+    for k, score in _scores.top(limit):
+        u = _users[k]
         items.append({
-            "id": u.get("id"),
-            "username": u.get("username", ""),
-            "name": u.get("name", ""),
+            "id": u.id,
+            "username": u.username,
+            "name": u.name,
             "score": score
         })
-    # сортируем по score desc, затем id asc
-    items.sort(key=lambda x: (-int(x.get("score", 0)), int(x.get("id", 0) or 0)))
-    return items[:limit]
+    return items
+
+def get_user_rank(user_id: int) -> Optional[int]:
+    """Место пользователя в лидерборде (с 1) или None, если его нет."""
+    return _scores.rank(_key(user_id))
 
 # Поддержка тестов или внешнего импорта: если нужно — можно обновить или расширить API.
\ No newline at end of file
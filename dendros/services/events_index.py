@@ -0,0 +1,153 @@
+# services/events_index.py
+import asyncio
+import logging
+import re
+import time
+from bisect import bisect_left, bisect_right
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+from services.fileio import run_io
+
+logger = logging.getLogger(__name__)
+
+# События без распознаваемой даты идут в конец списка
+_NO_DATE = "9999-99-99"
+_DATE_RE = re.compile(r"^(\d{4})-(\d{2})-(\d{2})")
+_DMY_RE = re.compile(r"^(\d{1,2})\.(\d{1,2})\.(\d{4})")
+
+
+def date_key(value) -> str:
+    """Ключ сортировки по дате: 'YYYY-MM-DD' (понимает и 'DD.MM.YYYY')."""
+    s = str(value or "").strip()
+    m = _DATE_RE.match(s)
+    if m:
+        return "-".join(m.groups())
+    m = _DMY_RE.match(s)
+    if m:
+        d, mo, y = m.groups()
+        return f"{y}-{int(mo):02d}-{int(d):02d}"
+    return _NO_DATE
+
+
+class EventsIndex:
+    """
+    Кэш событий в памяти, отсортированный по дате.
+
+    Загружается из стора один раз; свои записи сразу попадают в индекс, а
+    правки файла извне замечаются по версии стора (mtime / PRAGMA data_version),
+    которая проверяется в refresh() не чаще раза в recheck секунд — проверка и
+    перечитывание идут в пуле ввода-вывода, выборки только читают память. Счётчик id хранится
+    вместе с событиями, поэтому новый id не требует max() по всему списку.
+    Выборки по диапазону дат — бинарный поиск по отсортированным ключам.
+    """
+
+    def __init__(self, recheck: float = 5.0):
+        self.recheck = recheck
+        self._store = None
+        self._io = run_io
+        self._entries: List[Tuple[str, int, Dict[str, Any]]] = []
+        self._keys: List[Tuple[str, int]] = []
+        # тот же набор в порядке id — так события хранятся на диске
+        self._by_id: List[Dict[str, Any]] = []
+        self._next_id = 1
+        self._version = None
+        self._checked_at = 0.0
+        self._loaded = False
+        # растёт с каждым add(): перечитывание, начатое раньше, не затрёт новое событие
+        self._generation = 0
+        # одновременные refresh() ждут уже идущий, а не пропускают его
+        self._refreshing = asyncio.Lock()
+
+    def bind(self, store, io: Callable[..., Awaitable[Any]] = run_io):
+        """
+        Привязать индекс к стору и сразу загрузить события (при старте).
+        io(func) выполняет чтение стора вне event loop — по умолчанию в пуле.
+        """
+        self._store = store
+        self._io = io
+        self._loaded = False
+        try:
+            self._load()
+        except Exception:
+            logger.exception("Failed to load events")
+
+    def _read(self):
+        events, next_id = self._store.load_events()
+        return events, next_id, self._store.events_version()
+
+    def _load(self):
+        self._apply(*self._read())
+
+    def _apply(self, events: list, next_id: int, version):
+        entries = sorted(
+            ((date_key(e.get("date")), int(e.get("id", 0) or 0), e) for e in events),
+            key=lambda x: (x[0], x[1]),
+        )
+        self._entries = entries
+        self._keys = [(k, i) for k, i, _ in entries]
+        self._by_id = list(events)
+        self._next_id = next_id
+        self._version = version
+        self._checked_at = time.monotonic()
+        self._loaded = True
+        logger.info("Events index loaded: %d events, next_id=%d", len(entries), next_id)
+
+    async def refresh(self):
+        """Подтянуть правки файла извне; stat версии и чтение — в пуле, не в event loop."""
+        async with self._refreshing:
+            await self._refresh()
+
+    async def _refresh(self):
+        generation = self._generation
+        if self._loaded:
+            now = time.monotonic()
+            if now - self._checked_at < self.recheck:
+                return
+            self._checked_at = now
+            try:
+                version = await self._io(self._store.events_version)
+            except Exception:
+                logger.exception("Failed to check events version")
+                return
+            if version == self._version:
+                return
+            logger.info("Events changed on disk, reloading")
+        data = await self._io(self._read)
+        if generation != self._generation:
+            # пока файл читался, добавили событие — перечитаем при следующей проверке
+            self._checked_at = 0.0
+            return
+        self._apply(*data)
+
+    def all(self) -> List[Dict[str, Any]]:
+        return [e for _, _, e in self._entries]
+
+    def between(self, start=None, end=None) -> List[Dict[str, Any]]:
+        """События с датой в [start, end] (границы включительно, None — без границы)."""
+        lo = bisect_left(self._keys, (date_key(start), -1)) if start else 0
+        hi = bisect_right(self._keys, (date_key(end), float("inf"))) if end else len(self._keys)
+        return [e for _, _, e in self._entries[lo:hi]]
+
+    def add(self, event: Dict[str, Any]) -> Tuple[Dict[str, Any], list, int]:
+        """
+        Добавить событие в индекс, выдав ему id.
+        Возвращает (событие, полный список для записи, следующий id).
+        """
+        self._generation += 1
+        event_copy = dict(event)
+        event_copy["id"] = self._next_id
+        self._next_id += 1
+        entry = (date_key(event_copy.get("date")), event_copy["id"], event_copy)
+        i = bisect_right(self._keys, entry[:2])
+        self._keys.insert(i, entry[:2])
+        self._entries.insert(i, entry)
+        self._by_id.append(event_copy)
+        # копия: запись идёт в пуле, а цикл может добавить следующее событие
+        return event_copy, list(self._by_id), self._next_id
+
+    def mark_written(self):
+        """Вызывается после своей записи: новая версия файла — не повод перечитывать."""
+        try:
+            self._version = self._store.events_version()
+        except Exception:
+            pass
@@ -0,0 +1,49 @@
+# services/fanout.py
+import asyncio
+import logging
+import os
+from typing import Any, Awaitable, Callable, Dict, Iterable
+
+from aiogram.exceptions import TelegramAPIError
+
+from services import messenger
+
+# Сколько отправок одной рассылки одновременно стоят в очереди планировщика
+FANOUT_CONCURRENCY = int(os.getenv("FANOUT_CONCURRENCY", "16"))
+
+logger = logging.getLogger(__name__)
+
+stats = {"sent": 0, "failed": 0}
+
+
+async def fan_out(chat_ids: Iterable[int], send: Callable[[int], Awaitable[Any]],
+                  concurrency: int = FANOUT_CONCURRENCY, priority: int = messenger.BULK) -> Dict[int, Any]:
+    """
+    Вызвать send(chat_id) для каждого чата через общий планировщик отправки
+    (services/messenger.py): он держит темп в пределах лимитов Telegram и сам
+    повторяет запрос после RetryAfter. Возвращает {chat_id: результат send или
+    None, если отправить не удалось}.
+
+    Заблокировавшие бота и прочие ошибки API пропускаются — рассылка из-за них
+    не останавливается.
+    """
+    sem = asyncio.Semaphore(concurrency)
+    results: Dict[int, Any] = {}
+
+    async def one(chat_id: int):
+        async with sem:
+            try:
+                results[chat_id] = await messenger.send(chat_id, lambda: send(chat_id), priority)
+                stats["sent"] += 1
+                return
+            except TelegramAPIError as e:
+                logger.info("Fan-out to %s skipped: %s", chat_id, e)
+            stats["failed"] += 1
+            results[chat_id] = None
+
+    await asyncio.gather(*(one(c) for c in chat_ids))
+    return results
+
+
+def get_stats() -> Dict[str, Any]:
+    return dict(stats)
@@ -0,0 +1,146 @@
+# services/fileio.py
+import asyncio
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+from services.storage import read_json as _read_json_sync
+
+logger = logging.getLogger(__name__)
+
+# Ограниченный пул потоков для всей блокирующей работы с диском
+IO_WORKERS = int(os.getenv("IO_WORKERS", "4"))
+_executor = ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix="io")
+
+# Хвост очереди записей по каждому ключу (обычно — путь к файлу)
+_write_tails: Dict[str, asyncio.Future] = {}
+
+# Последняя измеренная и наибольшая задержка event loop (секунды), см. watch_event_loop
+loop_lag = 0.0
+loop_lag_max = 0.0
+
+
+async def run_io(func: Callable, *args) -> Any:
+    """Выполнить блокирующую функцию в пуле ввода-вывода."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, func, *args)
+
+
+def submit_write(key: str, func: Callable, *args) -> Optional[asyncio.Future]:
+    """
+    Поставить запись в очередь для ключа key, не дожидаясь её.
+    Записи с одним ключом выполняются строго по порядку и никогда не
+    пересекаются; разные ключи пишутся параллельно в общем пуле.
+    Вне event loop (скрипты, тесты) запись выполняется сразу.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        func(*args)
+        return None
+    return _chain(key, True, func, *args)
+
+
+def run_serial(key: str, func: Callable, *args) -> Awaitable[Any]:
+    """
+    Выполнить func в очереди записей key: после уже поставленных записей и не
+    пересекаясь с ними (например, чтение из того же соединения SQLite).
+    В отличие от submit_write, результат и исключение достаются вызывающему.
+    """
+    return _chain(key, False, func, *args)
+
+
+def _chain(key: str, log_errors: bool, func: Callable, *args) -> asyncio.Task:
+    loop = asyncio.get_running_loop()
+    prev = _write_tails.get(key)
+
+    async def _job():
+        if prev is not None:
+            try:
+                await prev
+            except Exception:
+                pass
+        try:
+            return await loop.run_in_executor(_executor, func, *args)
+        except Exception:
+            if not log_errors:
+                raise
+            logger.exception("Background write failed for %s", key)
+
+    task = loop.create_task(_job())
+    _write_tails[key] = task
+
+    def _done(t):
+        if _write_tails.get(key) is t:
+            del _write_tails[key]
+
+    task.add_done_callback(_done)
+    return task
+
+
+async def drain_writes():
+    """Дождаться всех поставленных в очередь записей."""
+    while _write_tails:
+        await asyncio.gather(*list(_write_tails.values()), return_exceptions=True)
+
+
+async def read_json(path, default=None):
+    return await run_io(_read_json_sync, str(path), default)
+
+
+async def read_text(path, encoding: str = "utf-8") -> str:
+    def _read():
+        with open(path, "r", encoding=encoding) as f:
+            return f.read()
+    return await run_io(_read)
+
+
+async def list_dir(path, suffixes: Iterable[str] = ()) -> List[str]:
+    """Отсортированный список имён файлов каталога (с фильтром по расширению)."""
+    suffixes = tuple(s.lower() for s in suffixes)
+
+    def _list():
+        try:
+            names = [e.name for e in os.scandir(path) if e.is_file()]
+        except FileNotFoundError:
+            return []
+        if suffixes:
+            names = [n for n in names if n.lower().endswith(suffixes)]
+        return sorted(names)
+    return await run_io(_list)
+
+
+async def file_size(path) -> Optional[int]:
+    """Размер файла или None, если его нет."""
+    def _size():
+        try:
+            return os.stat(path).st_size
+        except OSError:
+            return None
+    return await run_io(_size)
+
+
+async def watch_event_loop(interval: float = 0.5, threshold: Optional[float] = None):
+    """
+    Детектор блокировок event loop: просыпается каждые interval секунд и
+    измеряет, насколько опоздал. Опоздание больше threshold значит, что кто-то
+    выполнял синхронную работу (обычно I/O) прямо в цикле — пишем warning.
+    При IO_BLOCK_DEBUG=1 включается отладочный режим asyncio, который
+    называет конкретный медленный callback.
+    """
+    global loop_lag, loop_lag_max
+    if threshold is None:
+        threshold = float(os.getenv("IO_BLOCK_THRESHOLD", "0.1"))
+    loop = asyncio.get_running_loop()
+    if os.getenv("IO_BLOCK_DEBUG", "0") == "1":
+        loop.set_debug(True)
+        loop.slow_callback_duration = threshold
+    while True:
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        loop_lag = max(0.0, time.perf_counter() - started - interval)
+        loop_lag_max = max(loop_lag_max, loop_lag)
+        if loop_lag > threshold:
+            logger.warning("Event loop was blocked for %.0f ms", loop_lag * 1000)
@@ -0,0 +1,81 @@
+# services/gallery.py
+# Индекс картинок галереи: строится один раз и перестраивается, только когда
+# изменилась папка images/ или манифест, — а не при каждом листании.
+import logging
+import os
+import time
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from services.fileio import run_io
+from services.images import IMAGES_DIR, MANIFEST_FILE, PREPARED_DIR, SOURCE_SUFFIXES, image_key, image_paths
+
+# Telegram принимает в одном альбоме (sendMediaGroup) от 2 до 10 файлов
+PAGE_SIZE = max(1, min(10, int(os.getenv("GALLERY_PAGE_SIZE", "10"))))
+# Как часто (секунды) сверять папку с индексом
+RECHECK_INTERVAL = float(os.getenv("GALLERY_RECHECK", "5"))
+
+logger = logging.getLogger(__name__)
+
+_paths: List[Path] = []
+_signature: Optional[Tuple[int, ...]] = None
+_checked = 0.0
+stats = {"rebuilds": 0}
+
+
+def _mtime(path: Path) -> int:
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return 0
+
+
+def _signature_sync() -> Tuple[int, ...]:
+    # добавление/удаление файла меняет mtime папки; манифест переписывается целиком
+    return (_mtime(IMAGES_DIR), _mtime(MANIFEST_FILE), _mtime(PREPARED_DIR))
+
+
+def _build_sync() -> List[Path]:
+    """Сначала достопримечательности по номерам (подготовленные версии), затем прочие снимки по имени."""
+    numbered = image_paths()
+    paths = [numbered[k] for k in sorted(numbered, key=int)]
+    if IMAGES_DIR.exists():
+        paths.extend(sorted(
+            (p for p in IMAGES_DIR.iterdir()
+             if p.is_file() and p.suffix.lower() in SOURCE_SUFFIXES and image_key(p.name) is None),
+            key=lambda p: p.name))
+    return paths
+
+
+async def index() -> List[Path]:
+    """Актуальный список картинок; папка сверяется не чаще раза в RECHECK_INTERVAL секунд."""
+    global _paths, _signature, _checked
+    now = time.monotonic()
+    if _signature is not None and now - _checked < RECHECK_INTERVAL:
+        return _paths
+    _checked = now
+    signature = await run_io(_signature_sync)
+    if signature != _signature:
+        _paths = await run_io(_build_sync)
+        _signature = signature
+        stats["rebuilds"] += 1
+        logger.info("Gallery index: %d images", len(_paths))
+    return _paths
+
+
+def page_count(total: int) -> int:
+    return (total + PAGE_SIZE - 1) // PAGE_SIZE
+
+
+async def page(number: int) -> Tuple[int, int, List[Path]]:
+    """(номер страницы, всего страниц, картинки); номер приводится к допустимому по кругу."""
+    paths = await index()
+    pages = page_count(len(paths))
+    if not pages:
+        return 0, 0, []
+    number %= pages
+    return number, pages, paths[number * PAGE_SIZE:(number + 1) * PAGE_SIZE]
+
+
+def get_stats() -> dict:
+    return {"images": len(_paths), "pages": page_count(len(_paths)), "rebuilds": stats["rebuilds"]}
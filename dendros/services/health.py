@@ -0,0 +1,90 @@
+# services/health.py
+# Проверки живости/готовности и /metrics — aiohttp в event loop бота, без отдельного потока.
+import logging
+import os
+import time
+from typing import Callable, Dict, Optional
+
+from aiohttp import web
+
+from services import fileio, metrics
+
+HOST = os.getenv("HEALTH_HOST", "0.0.0.0")
+PORT = int(os.getenv("PORT", "8080"))
+# Если цикл недавно простаивал дольше этого (секунды), /healthz отвечает 503
+MAX_LOOP_LAG = float(os.getenv("HEALTH_MAX_LOOP_LAG", "5"))
+
+logger = logging.getLogger(__name__)
+
+_started = time.monotonic()
+# имя -> функция без аргументов: True — эта часть готова обслуживать пользователей
+_checks: Dict[str, Callable[[], bool]] = {}
+
+
+def add_check(name: str, check: Callable[[], bool]):
+    _checks[name] = check
+
+
+def _run_checks() -> Dict[str, bool]:
+    results = {}
+    for name, check in _checks.items():
+        try:
+            results[name] = bool(check())
+        except Exception:
+            logger.exception("Readiness check %s failed", name)
+            results[name] = False
+    return results
+
+
+async def handle_root(request: web.Request) -> web.Response:
+    # внешние «пингеры» аптайма ждут здесь просто OK
+    return web.Response(text="OK")
+
+
+async def handle_live(request: web.Request) -> web.Response:
+    """Живость: цикл отвечает и не блокировался надолго."""
+    ok = fileio.loop_lag < MAX_LOOP_LAG
+    return web.json_response({
+        "status": "ok" if ok else "stalled",
+        "uptime": round(time.monotonic() - _started, 1),
+        "loop_lag_ms": round(fileio.loop_lag * 1000, 1),
+        "loop_lag_max_ms": round(fileio.loop_lag_max * 1000, 1),
+    }, status=200 if ok else 503)
+
+
+async def handle_ready(request: web.Request) -> web.Response:
+    """Готовность: все зарегистрированные проверки (хранилище, связь с Telegram) проходят."""
+    checks = _run_checks()
+    ok = all(checks.values())
+    return web.json_response({"status": "ready" if ok else "not_ready", "checks": checks},
+                             status=200 if ok else 503)
+
+
+async def handle_metrics(request: web.Request) -> web.Response:
+    return web.Response(body=metrics.render().encode(),
+                        headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"})
+
+
+def add_routes(app: web.Application):
+    """Подключить /, /healthz, /readyz и /metrics к приложению (в том числе к вебхуку)."""
+    app.router.add_get("/", handle_root)
+    app.router.add_get("/healthz", handle_live)
+    app.router.add_get("/readyz", handle_ready)
+    app.router.add_get("/metrics", handle_metrics)
+
+
+async def start_server(host: str = HOST, port: int = PORT) -> Optional[web.AppRunner]:
+    """Отдельный сервер проверок для режима polling; остановка — runner.cleanup()."""
+    app = web.Application()
+    add_routes(app)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    try:
+        await web.TCPSite(runner, host, port).start()
+    except OSError as e:
+        # порт занят — бот работает и без проверок
+        logger.warning("Health server not started on %s:%s: %s", host, port, e)
+        await runner.cleanup()
+        return None
+    logger.info("Health server listening on %s:%s", host, port)
+    return runner
@@ -23,6 +23,11 @@ STRINGS: Dict[str, Dict[str, str]] = {
         "kz": "Викторина аяқталды. Сіздің ұпайыңыз: {score}/{total}.",
         "en": "Quiz finished. Your score: {score}/{total}."
     },
+    "quiz_outdated": {
+        "ru": "Вопросы викторины обновились, эта сессия закрыта. Ваш счёт: {score}. Начните викторину заново.",
+        "kz": "Викторина сұрақтары жаңартылды, бұл сессия жабылды. Сіздің ұпайыңыз: {score}. Викторинаны қайта бастаңыз.",
+        "en": "The quiz questions were updated, so this session is closed. Your score: {score}. Start the quiz again."
+    },
     "quiz_exit_confirm": {
         "ru": "Викторина остановлена.",
         "kz": "Викторина тоқтатылды.",
@@ -42,6 +47,121 @@ STRINGS: Dict[str, Dict[str, str]] = {
         "ru": "Пожалуйста, выберите вариант кнопкой.",
         "kz": "Түймешені пайдаланып жауап таңдаңыз.",
         "en": "Please pick an option using the buttons."
+    },
+    "quiz_stale": {
+        "ru": "Этот вопрос уже неактуален.",
+        "kz": "Бұл сұрақ енді өзекті емес.",
+        "en": "This question is no longer active."
+    },
+    "quiz_timeout": {
+        "ru": "⏰ Время вышло!",
+        "kz": "⏰ Уақыт бітті!",
+        "en": "⏰ Time's up!"
+    },
+    "tour_created": {
+        "ru": "🏆 Турнир создан! Код: {code}\nУчастники присоединяются командой /join {code}",
+        "kz": "🏆 Турнир құрылды! Коды: {code}\nҚатысушылар /join {code} командасымен қосылады",
+        "en": "🏆 Tournament created! Code: {code}\nPlayers join with /join {code}"
+    },
+    "tour_start_btn": {
+        "ru": "▶️ Начать",
+        "kz": "▶️ Бастау",
+        "en": "▶️ Start"
+    },
+    "tour_joined": {
+        "ru": "✅ Вы в турнире {code}. Ждите начала!",
+        "kz": "✅ Сіз {code} турнирдесіз. Басталуын күтіңіз!",
+        "en": "✅ You joined tournament {code}. Wait for the start!"
+    },
+    "tour_join_usage": {
+        "ru": "Укажите код турнира: /join КОД",
+        "kz": "Турнир кодын көрсетіңіз: /join КОД",
+        "en": "Send the tournament code: /join CODE"
+    },
+    "tour_unknown": {
+        "ru": "Турнир с таким кодом не найден.",
+        "kz": "Мұндай кодпен турнир табылмады.",
+        "en": "No tournament with this code."
+    },
+    "tour_started": {
+        "ru": "Турнир уже начался.",
+        "kz": "Турнир басталып кетті.",
+        "en": "The tournament has already started."
+    },
+    "tour_full": {
+        "ru": "В турнире больше нет мест.",
+        "kz": "Турнирде орын қалмады.",
+        "en": "The tournament is full."
+    },
+    "tour_busy": {
+        "ru": "Вы уже участвуете в другом турнире.",
+        "kz": "Сіз басқа турнирге қатысып жатырсыз.",
+        "en": "You are already in another tournament."
+    },
+    "tour_no_players": {
+        "ru": "Пока никто не присоединился.",
+        "kz": "Әзірге ешкім қосылған жоқ.",
+        "en": "Nobody has joined yet."
+    },
+    "tour_question": {
+        "ru": "🏆 Вопрос {n}/{total}",
+        "kz": "🏆 Сұрақ {n}/{total}",
+        "en": "🏆 Question {n}/{total}"
+    },
+    "tour_right": {
+        "ru": "✅ Верно!",
+        "kz": "✅ Дұрыс!",
+        "en": "✅ Correct!"
+    },
+    "tour_wrong": {
+        "ru": "❌ Неверно",
+        "kz": "❌ Қате",
+        "en": "❌ Wrong"
+    },
+    "tour_board_lobby": {
+        "ru": "🏆 Турнир {code}: ждём участников — {players}",
+        "kz": "🏆 {code} турнирі: қатысушыларды күтудеміз — {players}",
+        "en": "🏆 Tournament {code}: waiting for players — {players}"
+    },
+    "tour_board_question": {
+        "ru": "🏆 Турнир {code} — вопрос {n}/{total}, ответили {answered}/{players}",
+        "kz": "🏆 {code} турнирі — сұрақ {n}/{total}, жауап бергендер {answered}/{players}",
+        "en": "🏆 Tournament {code} — question {n}/{total}, answered {answered}/{players}"
+    },
+    "tour_board_final": {
+        "ru": "🏁 Турнир {code} завершён. Итоги:",
+        "kz": "🏁 {code} турнирі аяқталды. Қорытынды:",
+        "en": "🏁 Tournament {code} is over. Results:"
+    },
+    "tour_result": {
+        "ru": "🏁 Турнир окончен! Ваше место: {place} из {total}, очков: {score}.",
+        "kz": "🏁 Турнир аяқталды! Сіздің орныңыз: {place} / {total}, ұпай: {score}.",
+        "en": "🏁 The tournament is over! Your place: {place} of {total}, points: {score}."
+    },
+    "broadcast_message": {
+        "ru": "📢 Объявление\n\n{text}",
+        "kz": "📢 Хабарландыру\n\n{text}",
+        "en": "📢 Announcement\n\n{text}"
+    },
+    "gallery_page": {
+        "ru": "📷 Галерея: страница {page} из {pages}",
+        "kz": "📷 Галерея: {pages} беттің {page}-беті",
+        "en": "📷 Gallery: page {page} of {pages}"
+    },
+    "gallery_empty": {
+        "ru": "В галерее пока нет фотографий.",
+        "kz": "Галереяда әзірге фотосурет жоқ.",
+        "en": "There are no photos in the gallery yet."
+    },
+    "gallery_prev": {
+        "ru": "◀️ Назад",
+        "kz": "◀️ Артқа",
+        "en": "◀️ Back"
+    },
+    "gallery_next": {
+        "ru": "Далее ▶️",
+        "kz": "Келесі ▶️",
+        "en": "Next ▶️"
     }
 }
 
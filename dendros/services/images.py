@@ -0,0 +1,80 @@
+# services/images.py
+# Манифест подготовленных картинок (его пишет scripts/prepare_images.py).
+import logging
+import re
+from pathlib import Path
+from typing import Dict, Optional
+
+from services.storage import read_json
+
+IMAGES_DIR = (Path(__file__).resolve().parent.parent / "images").resolve()
+MANIFEST_FILE = IMAGES_DIR / "manifest.json"
+PREPARED_DIR = IMAGES_DIR / "prepared"
+THUMBS_DIR = IMAGES_DIR / "thumbs"
+MANIFEST_VERSION = 1
+
+SOURCE_SUFFIXES = (".jpg", ".jpeg", ".png", ".webp", ".bmp")
+
+logger = logging.getLogger(__name__)
+
+
+def image_key(name: str) -> Optional[str]:
+    """Номер достопримечательности по имени файла: "1.jpg", "1_fixed.jpg", "1-portrait.png" -> "1"."""
+    m = re.match(r"\d+", name)
+    return str(int(m.group())) if m else None
+
+
+def source_rank(name: str) -> tuple:
+    """
+    Порядок выбора, если у номера несколько исходников: сначала {n}_fixed.jpg,
+    затем {n}.<расширение> в порядке SOURCE_SUFFIXES, затем прочие — по имени.
+    """
+    p = Path(name)
+    key = image_key(name)
+    if p.name == f"{key}_fixed.jpg":
+        return (0, 0, name)
+    if p.stem == key and p.suffix.lower() in SOURCE_SUFFIXES:
+        return (1, SOURCE_SUFFIXES.index(p.suffix.lower()), name)
+    return (2, 0, name)
+
+
+def scan_sources(directory: Path = IMAGES_DIR) -> Dict[str, Path]:
+    """Исходники в корне images/: номер -> лучший файл для него."""
+    found: Dict[str, Path] = {}
+    if not directory.exists():
+        return found
+    for p in sorted(directory.iterdir(), key=lambda p: source_rank(p.name)):
+        if not p.is_file() or p.suffix.lower() not in SOURCE_SUFFIXES:
+            continue
+        key = image_key(p.name)
+        if key is not None and key not in found:
+            found[key] = p
+    return found
+
+
+def read_manifest(path: Path = MANIFEST_FILE) -> Optional[dict]:
+    data = read_json(str(path), None)
+    if not isinstance(data, dict) or data.get("version") != MANIFEST_VERSION:
+        return None
+    return data
+
+
+def image_paths(kind: str = "file") -> Dict[str, Path]:
+    """
+    Номер -> путь к картинке из манифеста (kind="file" — подготовленная,
+    kind="thumb" — превью). Если подготовленного файла нет на диске, берётся
+    исходник. Без манифеста — исходники из images/, как раньше.
+    """
+    manifest = read_manifest()
+    if manifest is None:
+        logger.warning("No image manifest at %s, using raw images (run scripts/prepare_images.py)", MANIFEST_FILE)
+        return scan_sources()
+    paths: Dict[str, Path] = {}
+    for key, entry in manifest.get("images", {}).items():
+        for name in (entry.get(kind), entry.get("source")):
+            if name and (IMAGES_DIR / name).is_file():
+                paths[key] = IMAGES_DIR / name
+                break
+        else:
+            logger.warning("Image %s from manifest is missing on disk", key)
+    return paths
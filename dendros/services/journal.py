@@ -0,0 +1,149 @@
+# services/journal.py
+import json
+import logging
+import os
+from typing import Dict, Any, Optional
+
+from services.storage import USERS_FILE, FileEventsMixin, read_json, write_json_atomic
+
+JOURNAL_FILE = os.path.join(os.path.dirname(USERS_FILE), "users.journal")
+
+logger = logging.getLogger(__name__)
+
+
+class JournalStore(FileEventsMixin):
+    """
+    Журналируемое хранилище пользователей.
+
+    users.json — снапшот, users.journal — лог изменений (JSON lines).
+    Каждая мутация дописывает в лог одну маленькую запись с актуальной версией
+    пользователя, а не переписывает весь файл. При старте снапшот читается и
+    поверх него проигрывается журнал. Когда журнал разрастается, он сворачивается
+    (compaction) в новый снапшот и обнуляется.
+
+    Записи журнала:
+        {"op": "put", "k": "<user_id>", "v": {...}}
+        {"op": "reset"}
+    Проигрывание идемпотентно, поэтому падение между записью снапшота и
+    обнулением журнала безопасно.
+
+    Запись идёт из потока ввода-вывода, а записи пользователей меняет event loop,
+    поэтому сам стор снапшот не собирает: разросшийся журнал выставляет
+    wants_compaction, владелец (db.py) собирает снапшот в своём потоке и
+    передаёт его в compact(users) через ту же очередь записей.
+    """
+
+    name = "journal"
+
+    def __init__(self, snapshot_path: str = USERS_FILE, journal_path: str = JOURNAL_FILE,
+                 compact_every: int = 5000, fsync: bool = False):
+        self.snapshot_path = snapshot_path
+        self.journal_path = journal_path
+        self.compact_every = compact_every
+        self.fsync = fsync
+        # функция, возвращающая всех пользователей в формате хранения (задаёт db.py)
+        self.snapshot_source = None
+        self._fh = None
+        self._entries = 0
+        self.wants_compaction = False
+
+    # ----------------- загрузка -----------------
+
+    def load(self) -> Dict[str, Dict[str, Any]]:
+        data = read_json(self.snapshot_path, {})
+        users = data if isinstance(data, dict) else {}
+        self._entries = self._replay(users)
+        logger.info("Journal store loaded: users=%d replayed=%d", len(users), self._entries)
+        if self._entries >= self.compact_every:
+            self.compact(users)
+        return users
+
+    def _replay(self, users: Dict[str, Dict[str, Any]]) -> int:
+        applied = 0
+        try:
+            f = open(self.journal_path, "r", encoding="utf-8")
+        except FileNotFoundError:
+            return 0
+        with f:
+            for lineno, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    # оборванная последняя строка после падения процесса
+                    logger.warning("Skipping corrupt journal line %d in %s", lineno, self.journal_path)
+                    continue
+                op = rec.get("op")
+                if op == "put":
+                    users[rec["k"]] = rec["v"]
+                elif op == "reset":
+                    users.clear()
+                applied += 1
+        return applied
+
+    # ----------------- запись -----------------
+
+    def _append(self, *recs: Dict[str, Any]):
+        try:
+            if self._fh is None:
+                os.makedirs(os.path.dirname(self.journal_path), exist_ok=True)
+                self._fh = open(self.journal_path, "a", encoding="utf-8")
+            self._fh.write("".join(
+                json.dumps(rec, ensure_ascii=False, separators=(",", ":")) + "\n" for rec in recs
+            ))
+            self._fh.flush()
+            if self.fsync:
+                os.fsync(self._fh.fileno())
+        except Exception:
+            logger.exception("Failed to append to journal %s", self.journal_path)
+            return
+        self._entries += len(recs)
+        if self._entries >= self.compact_every:
+            self.wants_compaction = True
+
+    def put(self, key: str, record: Dict[str, Any]):
+        self._append({"op": "put", "k": key, "v": record})
+
+    def put_many(self, items):
+        # одна запись в файл (и один fsync) на всю пачку
+        if items:
+            self._append(*({"op": "put", "k": k, "v": v} for k, v in items))
+
+    def reset(self):
+        self._append({"op": "reset"})
+
+    def compact(self, users: Optional[Dict[str, Dict[str, Any]]] = None):
+        """
+        Записать снапшот и обнулить журнал. Без users снапшот берётся у
+        snapshot_source() — только из потока, который меняет записи (close()).
+        """
+        if users is None:
+            users = self.snapshot_source()
+        try:
+            write_json_atomic(self.snapshot_path, users)
+        except Exception:
+            logger.exception("Journal compaction failed, keeping journal")
+            return
+        self._close_fh()
+        try:
+            open(self.journal_path, "w", encoding="utf-8").close()
+        except Exception:
+            logger.exception("Failed to truncate journal %s", self.journal_path)
+        logger.info("Journal compacted: users=%d entries=%d", len(users), self._entries)
+        self._entries = 0
+        self.wants_compaction = False
+
+    def close(self):
+        if self._entries:
+            self.compact()
+        self._close_fh()
+
+    def _close_fh(self):
+        if self._fh is not None:
+            try:
+                self._fh.close()
+            except Exception:
+                pass
+            self._fh = None
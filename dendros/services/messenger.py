@@ -1,17 +1,392 @@
 # services/messenger.py
+import asyncio
 import logging
-from typing import Optional
-from aiogram.types import Message
+import os
+import time
+from collections import OrderedDict, deque
+from functools import partial
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
 
-async def send_text(message: Message, text: Optional[str], reply_markup=None):
+from aiogram import Bot
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.types import InlineKeyboardMarkup, Message
+
+from services.ratelimit import TokenBucket
+
+# Общий лимит Telegram — около 30 сообщений в секунду на бота; держим запас
+RATE = float(os.getenv("MESSENGER_RATE", "25"))
+# В один чат — около сообщения в секунду; короткий всплеск (ответ + меню) допустим
+CHAT_RATE = float(os.getenv("MESSENGER_CHAT_RATE", "1"))
+CHAT_BURST = float(os.getenv("MESSENGER_CHAT_BURST", "3"))
+CONCURRENCY = int(os.getenv("MESSENGER_CONCURRENCY", "16"))
+# Рассылкам — не больше этой доли общего темпа: остаток всегда свободен для ответов
+BULK_RATE = float(os.getenv("MESSENGER_BULK_RATE", str(RATE * 0.8)))
+MAX_RETRIES = 3
+# Telegram не сообщает, чей лимит исчерпан. 429 в одном чате — его лимит; если за
+# FLOOD_WINDOW секунд 429 пришёл из FLOOD_CHATS разных чатов, лимит общий для бота
+FLOOD_WINDOW = float(os.getenv("MESSENGER_FLOOD_WINDOW", "1"))
+FLOOD_CHATS = int(os.getenv("MESSENGER_FLOOD_CHATS", "3"))
+
+# Классы приоритета: меньше — раньше
+INTERACTIVE = 0  # ответ на действие пользователя
+NORMAL = 1       # живые игры: вопросы турнира, табло
+BULK = 2         # рассылки
+PRIORITIES = (INTERACTIVE, NORMAL, BULK)
+PRIORITY_NAMES = ("interactive", "normal", "bulk")
+
+# Как часто выбрасывать вёдра чатов, в которые давно ничего не отправлялось
+PRUNE_INTERVAL = 60.0
+LATENCY_WINDOW = 1024
+
+# Предел длины текста одного сообщения Telegram
+MAX_TEXT = 4096
+# Склеенные ответы разделяются пустой строкой
+JOINER = "\n\n"
+
+logger = logging.getLogger(__name__)
+
+
+class _Job:
+    __slots__ = ("chat_id", "call", "priority", "future", "enqueued", "attempts", "throttled")
+
+    def __init__(self, chat_id: int, call: Callable[[], Awaitable[Any]], priority: int):
+        self.chat_id = chat_id
+        self.call = call
+        self.priority = priority
+        self.future = asyncio.get_running_loop().create_future()
+        self.enqueued = time.monotonic()
+        self.attempts = 0
+        # уже учтено в stats["throttled"]: ждало лимита своего чата
+        self.throttled = False
+
+
+class Outbox:
+    """
+    Планировщик исходящих запросов к Bot API.
+
+    Очередь на каждый класс приоритета, внутри — по очереди на чат (чаты
+    обслуживаются по кругу). Отправка идёт, когда есть токен и в общем ведре, и в
+    ведре чата; задание, чей чат сейчас исчерпал лимит, не задерживает другие чаты.
+    В один чат одновременно летит не больше одного запроса — порядок сообщений
+    сохраняется. Рассылки (BULK) дополнительно ограничены своим ведром bulk_rate,
+    чтобы во время рассылки ответам пользователям оставался запас. RetryAfter ставит на паузу ведро своего чата, а общее — только
+    когда 429 приходят сразу из нескольких чатов; задание возвращается в начало
+    своей очереди.
+    """
+
+    def __init__(self, rate: float = RATE, chat_rate: float = CHAT_RATE, chat_burst: float = CHAT_BURST,
+                 concurrency: int = CONCURRENCY, bulk_rate: float = BULK_RATE):
+        self.bucket = TokenBucket(rate)
+        self.bulk = TokenBucket(min(rate, bulk_rate))
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self._chats: Dict[int, TokenBucket] = {}
+        # приоритет -> {chat_id: очередь заданий}
+        self._queues = [OrderedDict() for _ in PRIORITIES]
+        self._queued = 0
+        self._busy: set = set()
+        self._sem = asyncio.Semaphore(concurrency)
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._sending: set = set()
+        self._pruned = time.monotonic()
+        # chat_id -> когда из него пришёл последний 429
+        self._floods: Dict[int, float] = {}
+        self._waits: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self._latencies: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self.stats = {
+            "sent": 0, "failed": 0, "retry_after": 0, "retry_wait": 0.0, "global_pauses": 0,
+            "throttled": 0, "max_depth": 0,
+        }
+        self.sent_by_priority = [0 for _ in PRIORITIES]
+
+    # ---------- Постановка в очередь ----------
+
+    async def submit(self, chat_id: int, call: Callable[[], Awaitable[Any]], priority: int = INTERACTIVE) -> Any:
+        """Поставить call() в очередь и дождаться его результата (или исключения)."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        job = _Job(chat_id, call, priority)
+        self._enqueue(job)
+        return await job.future
+
+    def _enqueue(self, job: _Job, front: bool = False):
+        queue = self._queues[job.priority]
+        jobs = queue.get(job.chat_id)
+        if jobs is None:
+            jobs = queue[job.chat_id] = deque()
+        if front:
+            jobs.appendleft(job)
+            queue.move_to_end(job.chat_id, last=False)
+        else:
+            jobs.append(job)
+        self._queued += 1
+        self.stats["max_depth"] = max(self.stats["max_depth"], self._queued)
+        self._wakeup.set()
+
+    # ---------- Диспетчер ----------
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        b = self._chats.get(chat_id)
+        if b is None:
+            b = self._chats[chat_id] = TokenBucket(self.chat_rate, self.chat_burst)
+        return b
+
+    def _pick(self, now: float):
+        """Следующее задание, готовое к отправке, или (None, через сколько секунд проверить снова)."""
+        while self._queued:
+            delay = self.bucket.wait_time(now)
+            if delay > 0:
+                return None, delay
+            job, soonest = self._pop_ready(now)
+            if job is None:
+                return None, soonest
+            if not job.future.done():
+                return job, 0
+            # ожидавший отменён — токены не тратим, берём следующее
+        return None, None
+
+    def _pop_ready(self, now: float):
+        soonest = None
+        for priority, queue in enumerate(self._queues):
+            if priority == BULK and queue:
+                wait = self.bulk.wait_time(now)
+                if wait > 0:
+                    soonest = wait if soonest is None else min(soonest, wait)
+                    continue
+            for chat_id, jobs in queue.items():
+                if chat_id in self._busy:
+                    continue
+                wait = self._chat_bucket(chat_id).wait_time(now)
+                if wait > 0:
+                    if not jobs[0].throttled:
+                        jobs[0].throttled = True
+                        self.stats["throttled"] += 1
+                    soonest = wait if soonest is None else min(soonest, wait)
+                    continue
+                job = jobs.popleft()
+                if jobs:
+                    # чат уходит в конец круга, чтобы один чат не занимал весь класс
+                    queue.move_to_end(chat_id)
+                else:
+                    del queue[chat_id]
+                self._queued -= 1
+                return job, None
+        # готовых нет: все чаты с заданиями ждут своего ведра или ответа на прошлый запрос
+        return None, soonest
+
+    async def _run(self):
+        while True:
+            # сначала слот отправки, потом выбор: токены берутся прямо перед запросом
+            await self._sem.acquire()
+            now = time.monotonic()
+            if now - self._pruned > PRUNE_INTERVAL:
+                self._prune(now)
+            job, delay = self._pick(now)
+            if job is None:
+                self._sem.release()
+                self._wakeup.clear()
+                try:
+                    # новое задание или освободившийся чат будят раньше срока
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            self.bucket.take()
+            if job.priority == BULK:
+                self.bulk.take()
+            self._chat_bucket(job.chat_id).take()
+            self._busy.add(job.chat_id)
+            task = asyncio.create_task(self._send(job))
+            self._sending.add(task)
+            task.add_done_callback(self._sending.discard)
+
+    async def _send(self, job: _Job):
+        started = time.monotonic()
+        if job.attempts == 0:
+            self._waits.append(started - job.enqueued)
+        try:
+            result = await job.call()
+        except TelegramRetryAfter as e:
+            self.stats["retry_after"] += 1
+            self.stats["retry_wait"] += e.retry_after
+            self._chat_bucket(job.chat_id).pause(e.retry_after)
+            if self._is_global_flood(job.chat_id, time.monotonic()):
+                self.stats["global_pauses"] += 1
+                logger.warning("Flood limit across chats: pausing all sends for %ss", e.retry_after)
+                self.bucket.pause(e.retry_after)
+            else:
+                logger.warning("Flood limit in chat %s: pausing it for %ss", job.chat_id, e.retry_after)
+            job.attempts += 1
+            if job.attempts < MAX_RETRIES and not job.future.done():
+                self._enqueue(job, front=True)
+            else:
+                self._fail(job, e)
+        except Exception as e:
+            self._fail(job, e)
+        else:
+            self._latencies.append(time.monotonic() - started)
+            self.stats["sent"] += 1
+            self.sent_by_priority[job.priority] += 1
+            if not job.future.done():
+                job.future.set_result(result)
+        finally:
+            self._busy.discard(job.chat_id)
+            self._sem.release()
+            self._wakeup.set()
+
+    def _is_global_flood(self, chat_id: int, now: float) -> bool:
+        """Запомнить 429 из чата; True, если за FLOOD_WINDOW их было из FLOOD_CHATS разных чатов."""
+        self._floods[chat_id] = now
+        for c in [c for c, t in self._floods.items() if now - t > FLOOD_WINDOW]:
+            del self._floods[c]
+        return len(self._floods) >= FLOOD_CHATS
+
+    def _fail(self, job: _Job, exc: BaseException):
+        self.stats["failed"] += 1
+        if not job.future.done():
+            job.future.set_exception(exc)
+
+    def _prune(self, now: float):
+        self._pruned = now
+        active = self._busy.union(*(q.keys() for q in self._queues))
+        for chat_id in [c for c, b in self._chats.items() if c not in active and b.is_idle(now)]:
+            del self._chats[chat_id]
+
+    async def close(self, timeout: float = 10.0):
+        """Дождаться отправки очереди (не дольше timeout) и остановить диспетчер."""
+        deadline = time.monotonic() + timeout
+        while (self._queued or self._sending) and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        for queue in self._queues:
+            for jobs in queue.values():
+                for job in jobs:
+                    job.future.cancel()
+            queue.clear()
+        self._queued = 0
+
+    # ---------- Метрики ----------
+
+    def get_stats(self) -> Dict[str, Any]:
+        s = dict(self.stats)
+        s["depth"] = self._queued
+        s["depth_by_priority"] = {PRIORITY_NAMES[p]: sum(len(j) for j in q.values())
+                                  for p, q in enumerate(self._queues)}
+        s["sent_by_priority"] = dict(zip(PRIORITY_NAMES, self.sent_by_priority))
+        s["in_flight"] = len(self._sending)
+        s["chats"] = len(self._chats)
+        s["queue_wait_ms"] = _percentiles(self._waits)
+        s["send_latency_ms"] = _percentiles(self._latencies)
+        return s
+
+
+def _percentiles(values) -> Dict[str, float]:
+    if not values:
+        return {}
+    ordered = sorted(values)
+    pick = lambda q: round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 1)  # noqa: E731
+    return {"p50": pick(0.5), "p95": pick(0.95), "max": round(ordered[-1] * 1000, 1)}
+
+
+# Один планировщик на процесс: все отправители делят общий лимит бота
+outbox = Outbox()
+
+
+async def send(chat_id: int, call: Callable[[], Awaitable[Any]], priority: int = INTERACTIVE) -> Any:
+    """Выполнить запрос call() к Bot API, адресованный чату chat_id, через общий планировщик."""
+    return await outbox.submit(chat_id, call, priority)
+
+
+async def send_text(message: Message, text: Optional[str], reply_markup=None, priority: int = INTERACTIVE, **kwargs):
     """
     Safe send helper: prevents sending empty messages.
     If text is empty, logs an error and sends a fallback notice.
+    Отправка идёт через планировщик с учётом лимитов Telegram (общего и на чат);
+    прочие параметры (parse_mode...) передаются в message.answer как есть.
     """
     text = (text or "").strip()
     if not text:
         logging.error("Attempt to send empty message to user %s", getattr(message.from_user, "id", "unknown"))
-        fallback = "Временно недоступно. Попробуйте позже."
-        await message.answer(fallback, reply_markup=reply_markup)
-        return
-    await message.answer(text, reply_markup=reply_markup)
\ No newline at end of file
+        text = "Временно недоступно. Попробуйте позже."
+    return await send(message.chat.id, lambda: message.answer(text, reply_markup=reply_markup, **kwargs), priority)
+
+
+# сколько ответов хендлеры сложили в Composer и сколько запросов на них ушло
+_stats = {"requested": 0, "calls": 0}
+
+
+def _can_join(markup, next_markup) -> bool:
+    """
+    Можно ли дописать следующий текст к сообщению: инлайн-кнопки относятся к своему
+    сообщению и не переносятся на другое; обычная клавиатура чата заменяется
+    последней присланной, поэтому промежуточные можно опустить.
+    """
+    if isinstance(markup, InlineKeyboardMarkup):
+        return False
+    return markup is None or next_markup is None or not isinstance(next_markup, InlineKeyboardMarkup)
+
+
+class Composer:
+    """
+    Ответы на один апдейт. Хендлер складывает сюда всё, что хочет отправить,
+    а flush() (его вызывает ComposerMiddleware после хендлера) отправляет это
+    минимальным числом запросов: идущие подряд тексты склеиваются в одно
+    сообщение до MAX_TEXT символов с последней клавиатурой, порядок сохраняется.
+    """
+
+    def __init__(self, bot: Bot, chat_id: int, priority: int = INTERACTIVE):
+        self.bot = bot
+        self.chat_id = chat_id
+        self.priority = priority
+        # элементы по порядку: [тексты, клавиатура, прочие параметры] или готовый вызов
+        self._items: List[Any] = []
+
+    def text(self, text: Optional[str], reply_markup=None, **kwargs):
+        text = (text or "").strip()
+        if not text:
+            logging.error("Attempt to compose empty message to chat %s", self.chat_id)
+            return
+        _stats["requested"] += 1
+        last = self._items[-1] if self._items else None
+        if (isinstance(last, list) and last[2] == kwargs and _can_join(last[1], reply_markup)
+                and sum(map(len, last[0])) + len(JOINER) * len(last[0]) + len(text) <= MAX_TEXT):
+            last[0].append(text)
+            if reply_markup is not None:
+                last[1] = reply_markup
+            return
+        self._items.append([[text], reply_markup, kwargs])
+
+    def call(self, call: Callable[[], Awaitable[Any]]):
+        """Любой другой запрос (фото, документ) — в общем порядке, без склейки."""
+        _stats["requested"] += 1
+        self._items.append(call)
+
+    async def flush(self) -> List[Any]:
+        """Отправить накопленное по порядку; возвращает результаты запросов."""
+        items, self._items = self._items, []
+        results = []
+        for item in items:
+            if isinstance(item, list):
+                texts, markup, kwargs = item
+                item = partial(self.bot.send_message, self.chat_id, JOINER.join(texts),
+                               reply_markup=markup, **kwargs)
+            _stats["calls"] += 1
+            results.append(await send(self.chat_id, item, self.priority))
+        return results
+
+
+async def close_outbox():
+    await outbox.close()
+
+
+def get_stats() -> Dict[str, Any]:
+    s = outbox.get_stats()
+    s["composed"] = _stats["requested"]
+    s["calls_saved"] = _stats["requested"] - _stats["calls"]
+    return s
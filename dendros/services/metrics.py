@@ -0,0 +1,112 @@
+# services/metrics.py
+# Счётчики для страницы /metrics (формат Prometheus). Всё в памяти процесса.
+import bisect
+from collections import Counter
+from typing import Any, Callable, Dict, List, Tuple
+
+PREFIX = "dendros"
+# Границы корзин времени обработки апдейта, секунды
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Гистограмма с фиксированными корзинами: наблюдение — O(log корзин), без хранения значений."""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+_updates: Counter = Counter()
+_update_errors: Counter = Counter()
+_api_calls: Counter = Counter()
+handler_latency = Histogram()
+# имя -> функция, возвращающая словарь чисел (get_stats() сервисов)
+_collectors: Dict[str, Callable[[], Dict[str, Any]]] = {}
+
+
+def observe_update(kind: str, seconds: float, failed: bool = False):
+    _updates[kind] += 1
+    if failed:
+        _update_errors[kind] += 1
+    handler_latency.observe(seconds)
+
+
+def observe_api(method: str, outcome: str):
+    _api_calls[(method, outcome)] += 1
+
+
+def register(name: str, collect: Callable[[], Dict[str, Any]]):
+    """Показывать на /metrics числа из collect() как dendros_<name>_<ключ>."""
+    _collectors[name] = collect
+
+
+def _fmt(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(int(value))
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def _collected(name: str, stats: Dict[str, Any], out: List[str]):
+    for key, value in stats.items():
+        metric = f"{PREFIX}_{name}_{key}"
+        if isinstance(value, bool):
+            value = int(value)
+        if isinstance(value, (int, float)):
+            out.append(f"# TYPE {metric} gauge")
+            out.append(f"{metric} {_fmt(value)}")
+        elif isinstance(value, dict) and value and all(isinstance(v, (int, float)) for v in value.values()):
+            # вложенные словари (глубина по приоритетам, перцентили) — метка key
+            out.append(f"# TYPE {metric} gauge")
+            for k, v in value.items():
+                out.append(f"{metric}{_labels(key=k)} {_fmt(v)}")
+
+
+def render() -> str:
+    out: List[str] = []
+    out.append(f"# HELP {PREFIX}_updates_total Updates processed, by update type")
+    out.append(f"# TYPE {PREFIX}_updates_total counter")
+    for kind, n in sorted(_updates.items()):
+        out.append(f"{PREFIX}_updates_total{_labels(type=kind)} {n}")
+    out.append(f"# HELP {PREFIX}_update_errors_total Updates whose handler raised")
+    out.append(f"# TYPE {PREFIX}_update_errors_total counter")
+    for kind, n in sorted(_update_errors.items()):
+        out.append(f"{PREFIX}_update_errors_total{_labels(type=kind)} {n}")
+
+    h = handler_latency
+    out.append(f"# HELP {PREFIX}_handler_seconds Time from dispatch to handler completion")
+    out.append(f"# TYPE {PREFIX}_handler_seconds histogram")
+    cumulative = 0
+    for le, n in zip(h.buckets, h.counts):
+        cumulative += n
+        out.append(f"{PREFIX}_handler_seconds_bucket{_labels(le=le)} {cumulative}")
+    out.append(f'{PREFIX}_handler_seconds_bucket{{le="+Inf"}} {h.count}')
+    out.append(f"{PREFIX}_handler_seconds_sum {_fmt(h.sum)}")
+    out.append(f"{PREFIX}_handler_seconds_count {h.count}")
+
+    out.append(f"# HELP {PREFIX}_api_requests_total Bot API requests, by method and outcome")
+    out.append(f"# TYPE {PREFIX}_api_requests_total counter")
+    for (method, outcome), n in sorted(_api_calls.items()):
+        out.append(f"{PREFIX}_api_requests_total{_labels(method=method, outcome=outcome)} {n}")
+
+    for name, collect in list(_collectors.items()):
+        try:
+            _collected(name, collect(), out)
+        except Exception as e:
+            out.append(f"# {name}: collector failed: {type(e).__name__}")
+    return "\n".join(out) + "\n"
@@ -0,0 +1,276 @@
+# services/quiz_bank.py
+import hashlib
+import json
+import logging
+import os
+import random
+import time
+from typing import Dict, List, Optional, Tuple
+
+from aiogram.filters.callback_data import CallbackData
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup, KeyboardButton, ReplyKeyboardMarkup
+
+from services.bitset import Bitset
+from services.fileio import run_io
+from services.i18n import t
+
+QUIZ_FILE = os.path.join(os.path.dirname(__file__), "..", "data", "quiz_data.json")
+LANGS = ("ru", "kz", "en")
+DEFAULT_CATEGORY = "general"
+EXIT_BTN = "❌ Выйти"
+
+logger = logging.getLogger(__name__)
+
+
+def normalize(s: str):
+    return (s or "").strip().lower().replace(".", "").replace("  ", " ")
+
+
+def build_answers_kb(opts):
+    return ReplyKeyboardMarkup(
+        resize_keyboard=True,
+        keyboard=[[KeyboardButton(text=o)] for o in opts] + [[KeyboardButton(text=EXIT_BTN)]]
+    )
+
+
+class QuizAnswer(CallbackData, prefix="qa"):
+    """
+    callback_data инлайн-кнопки ответа: "qa:<ключ вопроса>:<вариант>", вариант -1 —
+    выход. Ключ (QuizBank.key) позволяет отбросить нажатие на кнопку старого
+    сообщения и, в отличие от номера в файле, не меняется при перезагрузке банка.
+    """
+    k: str
+    o: int
+
+
+EXIT_OPTION = -1
+
+
+def build_inline_kb(key: str, opts):
+    rows = [[InlineKeyboardButton(text=o, callback_data=QuizAnswer(k=key, o=i).pack())]
+            for i, o in enumerate(opts)]
+    rows.append([InlineKeyboardButton(text=EXIT_BTN, callback_data=QuizAnswer(k=key, o=EXIT_OPTION).pack())])
+    return InlineKeyboardMarkup(inline_keyboard=rows)
+
+
+def _pick(block, lang):
+    """Значение для языка с откатом на ru — так же, как раньше делал хендлер."""
+    if isinstance(block, dict):
+        return block.get(lang) or block.get("ru")
+    return block
+
+
+class QuestionView:
+    """Вопрос, полностью подготовленный для одного языка."""
+
+    __slots__ = ("text", "opts", "keyboard", "inline_keyboard", "option_index", "correct",
+                 "answer", "correct_text", "wrong_text")
+
+    def __init__(self, q: dict, lang: str, key: str = ""):
+        q_text_block = q.get("q", {})
+        q_text_str = _pick(q_text_block, lang) or str(q_text_block)
+        opts = _pick(q.get("opts", {}), lang) or []
+        if not isinstance(opts, list):
+            opts = list(opts)
+        answer = _pick(q.get("a", {}), lang)
+        explanation = q.get("explanation", {}).get(lang) if isinstance(q.get("explanation"), dict) else q.get("explanation", "")
+
+        text = f"❓ {q_text_str}\n\n"
+        for i, o in enumerate(opts, 1):
+            text += f"{i}) {o}\n"
+        self.text = text
+        self.opts: List[str] = opts
+        self.keyboard = build_answers_kb(opts)
+        self.inline_keyboard = build_inline_kb(key, opts)
+        # нормализованный текст варианта -> его индекс (первое совпадение)
+        self.option_index: Dict[str, int] = {}
+        for i, o in enumerate(opts):
+            self.option_index.setdefault(normalize(o), i)
+        answer_norm = normalize(answer) if answer is not None else None
+        self.correct: Tuple[bool, ...] = tuple(normalize(o) == answer_norm for o in opts)
+        self.answer = answer
+        self.correct_text = t(lang, "answer_correct")
+        self.wrong_text = t(lang, "answer_wrong", answer=answer or "", ex=explanation or "")
+
+    def match(self, text: str) -> Optional[int]:
+        """Индекс выбранного варианта по номеру или по тексту (text уже нормализован)."""
+        if text.isdigit():
+            idx = int(text) - 1
+            if 0 <= idx < len(self.opts):
+                return idx
+        return self.option_index.get(text)
+
+
+def _category(q: dict) -> str:
+    return str(q.get("category") or DEFAULT_CATEGORY)
+
+
+def _has_lang(q: dict, lang: str) -> bool:
+    """Есть ли у вопроса собственный текст на языке (строка — общая для всех языков)."""
+    block = q.get("q")
+    return not isinstance(block, dict) or bool(block.get(lang))
+
+
+class QuizBank:
+    """
+    Скомпилированная викторина одной версии файла.
+
+    Вопрос идентифицируется номером в файле. Номера, сохранённые вне банка
+    (порядок сессии, метки seen), действительны только для той же
+    раскладки: layout меняется, когда вопросы добавлены, удалены или
+    переставлены. Индексы by_lang и by_category — кортежи номеров; пул для пары (язык, категория) собирается один раз и
+    кэшируется. QuestionView компилируется при первом обращении, так что банк
+    на тысячи вопросов не собирает клавиатуры для вопросов, которые никто не видел.
+    """
+
+    def __init__(self, questions: list, version=None):
+        self.version = version
+        self.raw = [q for q in questions if isinstance(q, dict)]
+        self._views: Dict[Tuple[int, str], QuestionView] = {}
+        self.by_lang: Dict[str, Tuple[int, ...]] = {
+            lang: tuple(i for i, q in enumerate(self.raw) if _has_lang(q, lang)) for lang in LANGS
+        }
+        by_category: Dict[str, List[int]] = {}
+        for i, q in enumerate(self.raw):
+            by_category.setdefault(_category(q), []).append(i)
+        self.by_category: Dict[str, Tuple[int, ...]] = {c: tuple(v) for c, v in by_category.items()}
+        self._pools: Dict[Tuple[str, Optional[str]], Tuple[int, ...]] = {}
+        self._keys: List[Optional[str]] = [None] * len(self.raw)
+        self._by_key: Optional[Dict[str, int]] = None
+        # отпечаток порядка ключей: правка ответов и пояснений его не меняет
+        self.layout = hashlib.sha1(",".join(map(self.key, range(len(self.raw)))).encode("ascii")).hexdigest()[:12]
+
+    def __len__(self) -> int:
+        return len(self.raw)
+
+    def view(self, idx: int, lang: str) -> QuestionView:
+        lang = lang if lang in LANGS else "ru"
+        v = self._views.get((idx, lang))
+        if v is None:
+            v = self._views[(idx, lang)] = QuestionView(self.raw[idx], lang, self.key(idx))
+        return v
+
+    def key(self, idx: int) -> str:
+        """Устойчивый ключ вопроса (хеш текста) — не меняется при перестановке вопросов в файле."""
+        k = self._keys[idx]
+        if k is None:
+            q = json.dumps(self.raw[idx].get("q"), ensure_ascii=False, sort_keys=True)
+            k = self._keys[idx] = hashlib.sha1(q.encode("utf-8")).hexdigest()[:12]
+        return k
+
+    def find(self, key: str) -> Optional[int]:
+        """Номер вопроса по ключу (обратный индекс строится при первом вызове)."""
+        if self._by_key is None:
+            self._by_key = {self.key(i): i for i in range(len(self.raw))}
+        return self._by_key.get(key)
+
+    def categories(self) -> List[str]:
+        return sorted(self.by_category)
+
+    def pool(self, lang: str, category: Optional[str] = None) -> Tuple[int, ...]:
+        """Номера вопросов для языка (с откатом на ru, если своих нет) и категории."""
+        pool = self._pools.get((lang, category))
+        if pool is None:
+            pool = self.by_lang.get(lang) or self.by_lang["ru"]
+            if category is not None:
+                allowed = set(self.by_category.get(category, ()))
+                pool = tuple(i for i in pool if i in allowed)
+            self._pools[(lang, category)] = pool
+        return pool
+
+    def sample(self, lang: str, k: int, seen: Bitset, category: Optional[str] = None) -> List[int]:
+        """
+        k разных вопросов пула в случайном порядке, по возможности не из seen;
+        выбранные добавляются в seen.
+
+        Случайные пробы с отбраковкой повторов и просмотренных: O(k) в ожидании,
+        весь пул не перемешивается. Если непросмотренных не хватает (проб
+        набралось больше 4k + 16), метки пула сбрасываются — начинается новый
+        круг, и добор идёт уже без учёта seen. Пул не больше 2k обрабатывается
+        целиком (это тоже O(k)), и в новый круг первыми идут непросмотренные.
+        """
+        pool = self.pool(lang, category)
+        m = len(pool)
+        if m <= 2 * k:
+            want = min(k, m)
+            fresh = [i for i in pool if i not in seen]
+            if len(fresh) >= want:
+                order = random.sample(fresh, want)
+            else:
+                # новый круг: сначала оставшиеся непросмотренные, затем добор из остальных
+                for i in pool:
+                    seen.discard(i)
+                taken = set(fresh)
+                order = fresh + random.sample([i for i in pool if i not in taken], want - len(fresh))
+                random.shuffle(order)
+        else:
+            order, chosen = [], set()
+            attempts, limit = 0, 4 * k + 16
+            while len(order) < k:
+                i = pool[random.randrange(m)]
+                attempts += 1
+                if i in chosen:
+                    continue
+                if i in seen:
+                    if attempts < limit:
+                        continue
+                    # почти весь пул просмотрен — новый круг
+                    for j in pool:
+                        if j not in chosen:
+                            seen.discard(j)
+                    limit = 0
+                chosen.add(i)
+                order.append(i)
+        for i in order:
+            seen.add(i)
+        return order
+
+
+def _file_version(path: str):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def _compile(path: str) -> QuizBank:
+    version = _file_version(path)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if not isinstance(data, list):
+            logger.error("Quiz file must contain a list of questions")
+            data = []
+    except Exception as e:
+        logger.exception("Failed to load quiz file: %s", e)
+        data = []
+    bank = QuizBank(data, version)
+    logger.info("Compiled quiz bank: %d questions, version=%s", len(bank), version)
+    return bank
+
+
+# Текущий банк; заменяется целиком одним присваиванием
+_bank: QuizBank = _compile(QUIZ_FILE)
+_checked_at = time.monotonic()
+RECHECK_INTERVAL = float(os.getenv("QUIZ_RECHECK", "2.0"))
+
+
+def get_bank() -> QuizBank:
+    return _bank
+
+
+async def refresh_bank(force: bool = False) -> QuizBank:
+    """
+    Перекомпилировать банк, если файл изменился (по mtime).
+    mtime проверяется не чаще раза в RECHECK_INTERVAL секунд; stat и компиляция
+    идут в пуле ввода-вывода, а новый банк подменяет старый атомарно.
+    """
+    global _bank, _checked_at
+    now = time.monotonic()
+    if not force and now - _checked_at < RECHECK_INTERVAL:
+        return _bank
+    _checked_at = now
+    version = await run_io(_file_version, QUIZ_FILE)
+    if force or version != _bank.version:
+        _bank = await run_io(_compile, QUIZ_FILE)
+    return _bank
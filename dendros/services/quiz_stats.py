@@ -0,0 +1,181 @@
+# services/quiz_stats.py
+import asyncio
+import bisect
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from services.fileio import submit_write
+from services.storage import DATA_DIR, read_json, write_json_atomic
+
+STATS_FILE = os.path.join(DATA_DIR, "quiz_stats.json")
+FLUSH_INTERVAL = float(os.getenv("QUIZ_STATS_FLUSH", "30"))
+# Верхние границы корзин гистограммы времени ответа, секунд; последняя корзина — дольше 60 с
+LATENCY_BOUNDS = (2, 5, 10, 20, 30, 60)
+
+logger = logging.getLogger(__name__)
+
+
+class QuestionStats:
+    """Счётчики одного вопроса на одном языке."""
+
+    __slots__ = ("shown", "correct", "wrong", "timeouts", "picks", "latency")
+
+    def __init__(self):
+        self.shown = 0
+        self.correct = 0
+        self.wrong = 0
+        self.timeouts = 0
+        self.picks: List[int] = []
+        self.latency: List[int] = [0] * (len(LATENCY_BOUNDS) + 1)
+
+    @property
+    def answered(self) -> int:
+        return self.correct + self.wrong
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"shown": self.shown, "correct": self.correct, "wrong": self.wrong,
+                "timeouts": self.timeouts, "picks": self.picks, "latency": self.latency}
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "QuestionStats":
+        s = cls()
+        for field in ("shown", "correct", "wrong", "timeouts"):
+            setattr(s, field, int(d.get(field, 0) or 0))
+        s.picks = [int(x) for x in d.get("picks", [])]
+        latency = [int(x) for x in d.get("latency", [])]
+        if len(latency) == len(s.latency):
+            s.latency = latency
+        return s
+
+
+# (ключ вопроса, язык) -> счётчики; ключ вопроса — QuizBank.key(), не зависит от порядка в файле
+_stats: Dict[Tuple[str, str], QuestionStats] = {}
+# когда пользователю показан вопрос: user_id -> (ключ вопроса, time.monotonic())
+_shown_at: Dict[int, Tuple[str, float]] = {}
+_dirty = False
+
+
+def _get(qkey: str, lang: str) -> QuestionStats:
+    s = _stats.get((qkey, lang))
+    if s is None:
+        s = _stats[(qkey, lang)] = QuestionStats()
+    return s
+
+
+def record_shown(user_id: int, qkey: str, lang: str):
+    global _dirty
+    _get(qkey, lang).shown += 1
+    _shown_at[user_id] = (qkey, time.monotonic())
+    _dirty = True
+
+
+def record_answer(user_id: int, qkey: str, lang: str, option: Optional[int], correct: bool):
+    """Ответ (option=None — время вышло). Только инкременты в памяти, O(1)."""
+    global _dirty
+    s = _get(qkey, lang)
+    if correct:
+        s.correct += 1
+    else:
+        s.wrong += 1
+    if option is None:
+        s.timeouts += 1
+    else:
+        if option >= len(s.picks):
+            s.picks.extend([0] * (option + 1 - len(s.picks)))
+        s.picks[option] += 1
+    shown = _shown_at.pop(user_id, None)
+    if shown is not None and shown[0] == qkey:
+        s.latency[bisect.bisect_left(LATENCY_BOUNDS, time.monotonic() - shown[1])] += 1
+    _dirty = True
+
+
+def _snapshot() -> Dict[str, Dict[str, Any]]:
+    data: Dict[str, Dict[str, Any]] = {}
+    for (qkey, lang), s in _stats.items():
+        data.setdefault(qkey, {})[lang] = s.to_dict()
+    return data
+
+
+def load_stats():
+    data = read_json(STATS_FILE, {})
+    if not isinstance(data, dict):
+        return
+    for qkey, langs in data.items():
+        if isinstance(langs, dict):
+            for lang, d in langs.items():
+                if isinstance(d, dict):
+                    _stats[(qkey, lang)] = QuestionStats.from_dict(d)
+    logger.info("Loaded quiz stats for %d questions", len(data))
+
+
+def flush_stats():
+    """Записать счётчики, если они менялись с прошлого сброса (в фоне через services.fileio)."""
+    global _dirty
+    if not _dirty:
+        return
+    _dirty = False
+    submit_write("quiz_stats", write_json_atomic, STATS_FILE, _snapshot())
+
+
+async def run_stats_flusher():
+    """Фоновая задача: сброс счётчиков раз в FLUSH_INTERVAL секунд одной записью."""
+    try:
+        while True:
+            await asyncio.sleep(FLUSH_INTERVAL)
+            flush_stats()
+    finally:
+        flush_stats()
+
+
+def hardest(limit: int = 10, min_answers: int = 5) -> List[Dict[str, Any]]:
+    """
+    Вопросы с наибольшей долей неверных ответов (по всем языкам вместе);
+    вопросы, на которые ответили меньше min_answers раз, не учитываются.
+    """
+    total: Dict[str, QuestionStats] = {}
+    for (qkey, _lang), s in _stats.items():
+        t = total.get(qkey)
+        if t is None:
+            t = total[qkey] = QuestionStats()
+        t.shown += s.shown
+        t.correct += s.correct
+        t.wrong += s.wrong
+        t.timeouts += s.timeouts
+        if len(s.picks) > len(t.picks):
+            t.picks.extend([0] * (len(s.picks) - len(t.picks)))
+        for i, n in enumerate(s.picks):
+            t.picks[i] += n
+        for i, n in enumerate(s.latency):
+            t.latency[i] += n
+    rows = []
+    for qkey, s in total.items():
+        if s.answered < min_answers:
+            continue
+        rows.append({
+            "key": qkey,
+            "answered": s.answered,
+            "wrong_rate": s.wrong / s.answered,
+            "timeouts": s.timeouts,
+            "picks": s.picks,
+            "median_latency": _median_bucket(s.latency),
+        })
+    rows.sort(key=lambda r: (-r["wrong_rate"], -r["answered"]))
+    return rows[:limit]
+
+
+def _median_bucket(latency: List[int]) -> Optional[int]:
+    """Верхняя граница корзины с медианой времени ответа (None — данных нет или дольше 60 с)."""
+    n = sum(latency)
+    if not n:
+        return None
+    acc = 0
+    for i, c in enumerate(latency):
+        acc += c
+        if acc * 2 >= n:
+            return LATENCY_BOUNDS[i] if i < len(LATENCY_BOUNDS) else None
+    return None
+
+
+load_stats()
@@ -0,0 +1,64 @@
+# services/ranking.py
+from bisect import bisect_left, insort
+from typing import Dict, Hashable, List, Optional, Tuple
+
+# Ключ сортировки: (-score, id, key) — score по убыванию, id по возрастанию
+_Entry = Tuple[int, int, Hashable]
+
+
+class ScoreIndex:
+    """
+    Упорядоченный индекс очков для лидерборда.
+
+    Держит отсортированный список ключей и поддерживается инкрементально при
+    каждом изменении очков, поэтому чтение топа не требует сортировки:
+    top(k) — O(k), rank() — O(log n) (bisect). Обновление — поиск O(log n)
+    плюс сдвиг элементов списка (memmove на C, дешёво даже для сотен тысяч).
+    """
+
+    def __init__(self):
+        self._entries: List[_Entry] = []
+        self._by_key: Dict[Hashable, _Entry] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self):
+        self._entries.clear()
+        self._by_key.clear()
+
+    def rebuild(self, items):
+        """Построить индекс заново из троек (key, id, score)."""
+        self._by_key = {k: (-int(score or 0), int(uid or 0), k) for k, uid, score in items}
+        self._entries = sorted(self._by_key.values())
+
+    def update(self, key: Hashable, uid, score: int):
+        entry = (-int(score or 0), int(uid or 0), key)
+        old = self._by_key.get(key)
+        if old == entry:
+            return
+        if old is not None:
+            self._remove_entry(old)
+        self._by_key[key] = entry
+        insort(self._entries, entry)
+
+    def remove(self, key: Hashable):
+        old = self._by_key.pop(key, None)
+        if old is not None:
+            self._remove_entry(old)
+
+    def _remove_entry(self, entry: _Entry):
+        i = bisect_left(self._entries, entry)
+        if i < len(self._entries) and self._entries[i] == entry:
+            del self._entries[i]
+
+    def top(self, limit: int) -> List[Tuple[Hashable, int]]:
+        """Первые limit записей как пары (key, score)."""
+        return [(k, -neg) for neg, _, k in self._entries[:max(0, limit)]]
+
+    def rank(self, key: Hashable) -> Optional[int]:
+        """Место в рейтинге (с 1) или None, если ключа нет."""
+        entry = self._by_key.get(key)
+        if entry is None:
+            return None
+        return bisect_left(self._entries, entry) + 1
@@ -0,0 +1,54 @@
+# services/ratelimit.py
+import asyncio
+import time
+from typing import Optional
+
+
+class TokenBucket:
+    """
+    Ведро токенов: rate запросов в секунду, всплеск до burst (по умолчанию 1 —
+    равномерный темп, так что ни в одну секунду лимит не превышается). pause() —
+    общая пауза после RetryAfter: её ждут все отправители, а не только получивший 429.
+
+    acquire() ждёт токен сам; wait_time()/take() — для планировщика, который
+    выбирает, кого из ожидающих пропустить первым (services/messenger.py).
+    """
+
+    def __init__(self, rate: float, burst: float = 1.0):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def pause(self, seconds: float):
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self._tokens = 0.0
+
+    def _refill(self, now: float):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, now: Optional[float] = None) -> float:
+        """Через сколько секунд будет доступен токен (0 — уже есть)."""
+        now = time.monotonic() if now is None else now
+        if now < self._paused_until:
+            return self._paused_until - now
+        self._refill(now)
+        return 0.0 if self._tokens >= 1 else (1 - self._tokens) / self.rate
+
+    def take(self):
+        """Забрать токен, наличие которого только что подтвердил wait_time()."""
+        self._tokens -= 1
+
+    def is_idle(self, now: float) -> bool:
+        """Ведро полное и без паузы — его можно выбросить и создать заново без потерь."""
+        return now >= self._paused_until and self._tokens + (now - self._updated) * self.rate >= self.burst
+
+    async def acquire(self):
+        # замок выстраивает ожидающих в очередь FIFO и не даёт им делить один токен
+        async with self._lock:
+            while (delay := self.wait_time()) > 0:
+                await asyncio.sleep(delay)
+            self.take()
@@ -0,0 +1,114 @@
+# services/sharded_store.py
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Set
+
+from services.storage import DATA_DIR, USERS_FILE, FileEventsMixin, read_json, write_json_atomic
+
+SHARDS_DIR = os.path.join(DATA_DIR, "users_shards")
+META_NAME = "meta.json"
+
+logger = logging.getLogger(__name__)
+
+
+def shard_of(key, n: int) -> int:
+    """Номер шарда для пользователя: id по модулю числа шардов."""
+    return int(key) % n
+
+
+def shard_path(directory: str, i: int) -> str:
+    return os.path.join(directory, f"users.{i:03d}.json")
+
+
+def read_meta(directory: str) -> Optional[Dict[str, Any]]:
+    meta = read_json(os.path.join(directory, META_NAME), None)
+    return meta if isinstance(meta, dict) and meta.get("shards") else None
+
+
+def load_shards(directory: str, n: int, workers: int = 8) -> List[Dict[str, Dict[str, Any]]]:
+    """Прочитать все шарды параллельно (json.load отпускает GIL на чтении файла)."""
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, n))) as pool:
+        parts = list(pool.map(lambda i: read_json(shard_path(directory, i), {}), range(n)))
+    return [p if isinstance(p, dict) else {} for p in parts]
+
+
+def write_shards(directory: str, users: Dict[str, Dict[str, Any]], n: int):
+    """Разложить пользователей по n шардам и записать их вместе с meta.json."""
+    parts: List[Dict[str, Dict[str, Any]]] = [{} for _ in range(n)]
+    for k, v in users.items():
+        parts[shard_of(k, n)][k] = v
+    for i, part in enumerate(parts):
+        write_json_atomic(shard_path(directory, i), part)
+    write_json_atomic(os.path.join(directory, META_NAME), {"shards": n})
+
+
+class ShardedStore(FileEventsMixin):
+    """
+    Пользователи разложены по N файлам-шардам (data/users_shards/users.NNN.json)
+    по id. Изменение пользователя перезаписывает только его шард, а при старте
+    шарды читаются параллельно. Число шардов хранится в meta.json; сменить его
+    без потери данных можно через scripts/reshard.py.
+    """
+
+    name = "sharded"
+
+    def __init__(self, directory: str = SHARDS_DIR, shards: Optional[int] = None):
+        self.directory = directory
+        self.shards = shards or int(os.getenv("DB_SHARDS", "8"))
+        # функция, возвращающая пользователей в формате хранения (задаёт db.py);
+        # с аргументом keys — только этих пользователей
+        self.snapshot_source = None
+        self._members: List[Set[str]] = []
+
+    def load(self) -> Dict[str, Dict[str, Any]]:
+        meta = read_meta(self.directory)
+        if meta is None:
+            return self._migrate_from_json()
+        if meta["shards"] != self.shards:
+            logger.warning("DB_SHARDS=%d, but data has %d shards; using %d (see scripts/reshard.py)",
+                           self.shards, meta["shards"], meta["shards"])
+            self.shards = meta["shards"]
+        parts = load_shards(self.directory, self.shards)
+        self._members = [set(p) for p in parts]
+        users: Dict[str, Dict[str, Any]] = {}
+        for p in parts:
+            users.update(p)
+        logger.info("Sharded store loaded: users=%d shards=%d", len(users), self.shards)
+        return users
+
+    def _migrate_from_json(self) -> Dict[str, Dict[str, Any]]:
+        """Первый запуск: разложить существующий users.json по шардам."""
+        data = read_json(USERS_FILE, {})
+        users = data if isinstance(data, dict) else {}
+        write_shards(self.directory, users, self.shards)
+        self._members = [set() for _ in range(self.shards)]
+        for k in users:
+            self._members[shard_of(k, self.shards)].add(k)
+        logger.info("Migrated %d users from %s into %d shards", len(users), USERS_FILE, self.shards)
+        return users
+
+    def _write_shard(self, i: int):
+        write_json_atomic(shard_path(self.directory, i), self.snapshot_source(self._members[i]))
+
+    def put(self, key: str, record: Dict[str, Any]):
+        self.put_many([(key, record)])
+
+    def put_many(self, items):
+        """Перезаписать только шарды, в которые попали изменённые пользователи."""
+        dirty = set()
+        for key, _ in items:
+            i = shard_of(key, self.shards)
+            self._members[i].add(key)
+            dirty.add(i)
+        for i in sorted(dirty):
+            self._write_shard(i)
+
+    def reset(self):
+        for members in self._members:
+            members.clear()
+        for i in range(self.shards):
+            write_json_atomic(shard_path(self.directory, i), {})
+
+    def close(self):
+        pass
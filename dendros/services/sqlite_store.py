@@ -0,0 +1,231 @@
+# services/sqlite_store.py
+import json
+import logging
+import os
+import sqlite3
+from typing import Dict, Any, Optional
+
+from services.storage import DATA_DIR
+
+SQLITE_FILE = os.path.join(DATA_DIR, "bot.db")
+
+logger = logging.getLogger(__name__)
+
+# Колонки, которые раскладываются по таблицам; всё остальное уходит в users.extra (JSON)
+_USER_FIELDS = ("id", "username", "name", "lang", "quiz")
+
+# Схема совпадает с уже существующим data/bot.db; extra-колонки добавляются миграцией
+_SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY,
+        username TEXT,
+        first_name TEXT,
+        lang TEXT DEFAULT 'kk',
+        quiz_score INTEGER DEFAULT 0
+    )""",
+    """CREATE TABLE IF NOT EXISTS quiz_progress (
+        user_id INTEGER PRIMARY KEY,
+        idx INTEGER DEFAULT 0,
+        score INTEGER DEFAULT 0
+    )""",
+    """CREATE TABLE IF NOT EXISTS events (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        title TEXT,
+        desc TEXT,
+        date TEXT
+    )""",
+    """CREATE TABLE IF NOT EXISTS achievements (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER,
+        name TEXT,
+        date TEXT
+    )""",
+    """CREATE TABLE IF NOT EXISTS leaderboard (
+        user_id INTEGER PRIMARY KEY,
+        score INTEGER DEFAULT 0
+    )""",
+    """CREATE TABLE IF NOT EXISTS favorites (
+        user_id INTEGER,
+        item_type TEXT,
+        item_id TEXT
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_leaderboard_score ON leaderboard(score DESC, user_id)",
+    "CREATE INDEX IF NOT EXISTS idx_events_date ON events(date)",
+    "CREATE INDEX IF NOT EXISTS idx_achievements_user ON achievements(user_id)",
+    "CREATE INDEX IF NOT EXISTS idx_favorites_user ON favorites(user_id, item_type)",
+)
+
+# Запросы — константы: sqlite3 кэширует подготовленные выражения по тексту SQL
+_UPSERT_USER = (
+    "INSERT INTO users (id, username, first_name, lang, quiz_score, extra) VALUES (?, ?, ?, ?, ?, ?) "
+    "ON CONFLICT(id) DO UPDATE SET username=excluded.username, first_name=excluded.first_name, "
+    "lang=excluded.lang, quiz_score=excluded.quiz_score, extra=excluded.extra"
+)
+_UPSERT_PROGRESS = (
+    "INSERT INTO quiz_progress (user_id, idx, score, question_order) VALUES (?, ?, ?, ?) "
+    "ON CONFLICT(user_id) DO UPDATE SET idx=excluded.idx, score=excluded.score, "
+    "question_order=excluded.question_order"
+)
+_DELETE_PROGRESS = "DELETE FROM quiz_progress WHERE user_id = ?"
+_UPSERT_LEADERBOARD = (
+    "INSERT INTO leaderboard (user_id, score) VALUES (?, ?) "
+    "ON CONFLICT(user_id) DO UPDATE SET score=excluded.score"
+)
+_INSERT_EVENT = "INSERT INTO events (id, title, desc, date, extra) VALUES (?, ?, ?, ?, ?)"
+
+
+class SqliteStore:
+    """
+    Хранилище поверх data/bot.db.
+
+    Одно долгоживущее соединение в WAL-режиме; каждое изменение пользователя —
+    это upsert одной строки в users (+ quiz_progress/leaderboard) по первичному
+    ключу в одной транзакции, а не перезапись файла целиком.
+    Чтения идут из словаря в памяти, загруженного при старте.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: str = SQLITE_FILE):
+        self.path = path
+        # снапшоты не нужны: каждая запись и так идёт построчно
+        self.snapshot_source = None
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            # запись идёт из пула services.fileio, по одной операции за раз
+            conn = sqlite3.connect(self.path, isolation_level=None, cached_statements=64,
+                                   check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            for stmt in _SCHEMA:
+                conn.execute(stmt)
+            self._migrate(conn)
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def _migrate(conn: sqlite3.Connection):
+        for table in ("users", "events"):
+            cols = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+            if "extra" not in cols:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN extra TEXT")
+        cols = {row[1] for row in conn.execute("PRAGMA table_info(quiz_progress)")}
+        if "question_order" not in cols:
+            # номера вопросов сессии через запятую; NULL — вопросы банка подряд
+            conn.execute("ALTER TABLE quiz_progress ADD COLUMN question_order TEXT")
+
+    # ----------------- пользователи -----------------
+
+    def load(self) -> Dict[str, Dict[str, Any]]:
+        conn = self._connect()
+        rows = conn.execute(
+            "SELECT u.id, u.username, u.first_name, u.lang, u.extra, q.idx, q.score, q.question_order "
+            "FROM users u LEFT JOIN quiz_progress q ON q.user_id = u.id"
+        )
+        users: Dict[str, Dict[str, Any]] = {}
+        for uid, username, first_name, lang, extra, idx, score, order in rows:
+            rec: Dict[str, Any] = {}
+            if extra:
+                try:
+                    rec.update(json.loads(extra))
+                except ValueError:
+                    logger.warning("Bad extra JSON for user %s", uid)
+            rec.update({
+                "id": uid,
+                "username": username or "",
+                "name": first_name or "",
+                # в старой схеме казахский записан как 'kk'
+                "lang": "kz" if lang == "kk" else (lang or "ru"),
+                "quiz": None if idx is None else {"active": True, "progress": idx, "score": score or 0},
+            })
+            if idx is not None and order:
+                rec["quiz"]["order"] = [int(i) for i in order.split(",")]
+            users[str(uid)] = rec
+        return users
+
+    def _write_user(self, conn: sqlite3.Connection, key: str, record: Dict[str, Any]):
+        uid = int(record.get("id") or key)
+        q = record.get("quiz")
+        score = q.get("score", 0) if isinstance(q, dict) else 0
+        extra = {k: v for k, v in record.items() if k not in _USER_FIELDS}
+        conn.execute(_UPSERT_USER, (
+            uid, record.get("username", ""), record.get("name", ""), record.get("lang", "ru"),
+            score, json.dumps(extra, ensure_ascii=False) if extra else None,
+        ))
+        if isinstance(q, dict):
+            order = q.get("order")
+            conn.execute(_UPSERT_PROGRESS, (uid, q.get("progress", 0), score,
+                                            ",".join(map(str, order)) if order else None))
+        else:
+            conn.execute(_DELETE_PROGRESS, (uid,))
+        conn.execute(_UPSERT_LEADERBOARD, (uid, score))
+
+    def put(self, key: str, record: Dict[str, Any]):
+        self.put_many([(key, record)])
+
+    def put_many(self, items):
+        """Все изменения пачки — в одной транзакции."""
+        conn = self._connect()
+        conn.execute("BEGIN")
+        try:
+            for key, record in items:
+                self._write_user(conn, key, record)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def reset(self):
+        conn = self._connect()
+        conn.execute("BEGIN")
+        for table in ("users", "quiz_progress", "leaderboard"):
+            conn.execute(f"DELETE FROM {table}")
+        conn.execute("COMMIT")
+
+    # ----------------- события -----------------
+
+    def load_events(self):
+        """Вернуть (список событий, следующий id)."""
+        conn = self._connect()
+        events = []
+        for eid, title, desc, date, extra in conn.execute(
+                "SELECT id, title, desc, date, extra FROM events ORDER BY id"):
+            ev: Dict[str, Any] = {}
+            if extra:
+                try:
+                    ev.update(json.loads(extra))
+                except ValueError:
+                    pass
+            if not extra:
+                ev.update({"title": title, "description": desc, "date": date})
+            ev["id"] = eid
+            events.append(ev)
+        # AUTOINCREMENT хранит последний выданный id в sqlite_sequence
+        row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'events'").fetchone()
+        next_id = max((row[0] if row else 0), max([e["id"] for e in events] or [0])) + 1
+        return events, next_id
+
+    def add_event(self, event: Dict[str, Any], events: list, next_id: int):
+        conn = self._connect()
+        conn.execute(_INSERT_EVENT, (
+            event.get("id"), event.get("title"), event.get("description") or event.get("desc"),
+            event.get("date"), json.dumps(event, ensure_ascii=False),
+        ))
+
+    def events_version(self):
+        # меняется только при коммитах других соединений — свои записи не сбрасывают кэш
+        return self._connect().execute("PRAGMA data_version").fetchone()[0]
+
+    def close(self):
+        if self._conn is not None:
+            try:
+                # переносим WAL в основной файл, чтобы bot.db был самодостаточным
+                self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+                self._conn.close()
+            except Exception:
+                logger.exception("Failed to close %s", self.path)
+            self._conn = None
@@ -0,0 +1,121 @@
+# services/storage.py
+import json
+import logging
+import os
+from typing import Dict, Any
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "data")
+USERS_FILE = os.path.join(DATA_DIR, "users.json")
+EVENTS_FILE = os.path.join(DATA_DIR, "events.json")
+
+logger = logging.getLogger(__name__)
+
+
+def write_json_atomic(path: str, data, indent=None):
+    """Записать JSON во временный файл и атомарно заменить им целевой."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=indent)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def read_json(path: str, default):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return default
+    except Exception:
+        logger.exception("Failed to read %s", path)
+        return default
+
+
+class FileEventsMixin:
+    """События в data/events.json — общий код для файловых хранилищ."""
+
+    events_path = EVENTS_FILE
+
+    def load_events(self):
+        """Вернуть (список событий, следующий id)."""
+        data = read_json(self.events_path, {"events": []})
+        if not isinstance(data, dict):
+            data = {}
+        events = data.get("events", []) or []
+        next_id = data.get("next_id") or max([e.get("id", 0) or 0 for e in events] or [0]) + 1
+        return events, next_id
+
+    def add_event(self, event: Dict[str, Any], events: list, next_id: int):
+        """Сохранить новое событие; events — полный список, уже содержащий его."""
+        try:
+            write_json_atomic(self.events_path, {"events": events, "next_id": next_id}, indent=2)
+        except Exception:
+            logger.exception("Failed to save %s", self.events_path)
+
+    def events_version(self):
+        """Версия файла событий (mtime) — чтобы заметить правки извне."""
+        try:
+            return os.stat(self.events_path).st_mtime_ns
+        except OSError:
+            return None
+
+
+class JsonStore(FileEventsMixin):
+    """
+    Старое поведение: весь словарь пользователей переписывается в users.json
+    при каждом изменении. Оставлен для совместимости и отладки.
+    """
+
+    name = "json"
+
+    def __init__(self, path: str = USERS_FILE):
+        self.path = path
+        # функция, возвращающая всех пользователей в формате хранения (задаёт db.py)
+        self.snapshot_source = None
+
+    def load(self) -> Dict[str, Dict[str, Any]]:
+        data = read_json(self.path, {})
+        return data if isinstance(data, dict) else {}
+
+    def put(self, key: str, record: Dict[str, Any]):
+        self._write()
+
+    def put_many(self, items):
+        # пачка изменений — всё равно одна перезапись файла
+        self._write()
+
+    def reset(self):
+        self._write()
+
+    def close(self):
+        pass
+
+    def _write(self):
+        try:
+            write_json_atomic(self.path, self.snapshot_source(), indent=2)
+        except Exception:
+            logger.exception("Failed to save %s", self.path)
+
+
+def open_store(backend: str = "journal"):
+    """
+    Создать хранилище пользователей по имени бэкенда.
+    load() возвращает пользователей в формате хранения ({str(id): dict});
+    изменения приходят через put() / put_many(), а полный снапшот (для
+    перезаписи или compaction) стор берёт у snapshot_source(), который задаёт db.py.
+    """
+    backend = (backend or "journal").strip().lower()
+    if backend == "json":
+        return JsonStore()
+    if backend == "journal":
+        from services.journal import JournalStore
+        return JournalStore()
+    if backend == "sharded":
+        from services.sharded_store import ShardedStore
+        return ShardedStore()
+    if backend == "sqlite":
+        from services.sqlite_store import SqliteStore
+        return SqliteStore()
+    raise ValueError(f"Unknown storage backend: {backend}")
@@ -0,0 +1,157 @@
+# services/timer_wheel.py
+import asyncio
+import logging
+import math
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class _Timer:
+    __slots__ = ("tick", "slot", "deadline", "payload")
+
+    def __init__(self, tick: int, slot: int, deadline: float, payload):
+        self.tick = tick
+        self.slot = slot
+        self.deadline = deadline
+        self.payload = payload
+
+
+class TimerWheel:
+    """
+    Хешированное колесо таймеров: slots корзин по tick секунд, таймер лежит в
+    корзине (номер тика дедлайна) % slots. Один таймер на ключ (user id):
+    schedule() заменяет предыдущий, cancel() удаляет из словаря корзины — O(1).
+    Каждый тик обходится только одна корзина; таймеры с дальних оборотов в ней
+    остаются до своего тика.
+
+    Дедлайны — время эпохи (time.time()), чтобы их можно было сохранить и
+    восстановить после перезапуска. Всё колесо обслуживает одна задача run();
+    задачи и call_later на каждого пользователя не создаются.
+    """
+
+    def __init__(self, tick: float = 0.5, slots: int = 512):
+        self.tick = tick
+        self.slots = slots
+        self._slots: List[Dict[Hashable, _Timer]] = [{} for _ in range(slots)]
+        self._timers: Dict[Hashable, _Timer] = {}
+        # последний обработанный тик; None — колесо ещё не запускалось
+        self._cursor: Optional[int] = None
+        self._inflight = 0
+        self.stats = {
+            "scheduled": 0,
+            "cancelled": 0,
+            "fired": 0,
+            "errors": 0,
+            "late_max": 0.0,
+            "late_total": 0.0,
+            "tick_max": 0.0,
+        }
+
+    def __len__(self) -> int:
+        return len(self._timers)
+
+    def __contains__(self, key) -> bool:
+        return key in self._timers
+
+    def _tick_of(self, now: float) -> int:
+        return int(now // self.tick)
+
+    def _deadline_tick(self, deadline: float) -> int:
+        # округление вверх: таймер не срабатывает раньше дедлайна, опаздывает не больше чем на тик
+        return math.ceil(deadline / self.tick)
+
+    def schedule(self, key: Hashable, deadline: float, payload: Any = None):
+        """Поставить (или переставить) таймер ключа на deadline."""
+        self.cancel(key, count=False)
+        tick = self._deadline_tick(deadline)
+        if self._cursor is not None and tick <= self._cursor:
+            # дедлайн уже прошёл — сработает на ближайшем тике
+            tick = self._cursor + 1
+        t = _Timer(tick, tick % self.slots, deadline, payload)
+        self._timers[key] = t
+        self._slots[t.slot][key] = t
+        self.stats["scheduled"] += 1
+
+    def cancel(self, key: Hashable, count: bool = True) -> bool:
+        t = self._timers.pop(key, None)
+        if t is None:
+            return False
+        del self._slots[t.slot][key]
+        if count:
+            self.stats["cancelled"] += 1
+        return True
+
+    def deadline(self, key: Hashable) -> Optional[float]:
+        t = self._timers.get(key)
+        return t.deadline if t else None
+
+    def expire(self, now: float) -> List[Tuple[Hashable, Any, float]]:
+        """
+        Снять с колеса всё, что истекло к now: [(key, payload, опоздание)].
+        Корзины между прошлым и текущим тиком обходятся по разу, даже если цикл
+        надолго задержался; первый вызов обходит всё колесо (восстановленные
+        после перезапуска таймеры могли истечь в любой корзине).
+        """
+        now_tick = self._tick_of(now)
+        start = now_tick - self.slots + 1 if self._cursor is None else self._cursor + 1
+        start = max(start, now_tick - self.slots + 1)
+        fired = []
+        for tick in range(start, now_tick + 1):
+            bucket = self._slots[tick % self.slots]
+            if not bucket:
+                continue
+            for key in [k for k, t in bucket.items() if t.tick <= now_tick]:
+                t = bucket.pop(key)
+                del self._timers[key]
+                fired.append((key, t.payload, max(0.0, now - t.deadline)))
+        self._cursor = now_tick
+        return fired
+
+    async def _fire(self, callback, key, payload, sem: asyncio.Semaphore):
+        try:
+            await callback(key, payload)
+        except Exception:
+            self.stats["errors"] += 1
+            logger.exception("Timer callback failed for %s", key)
+        finally:
+            self._inflight -= 1
+            sem.release()
+
+    async def run(self, callback: Callable[[Hashable, Any], Awaitable[Any]], concurrency: int = 64):
+        """
+        Единственная фоновая задача колеса: раз в тик снимает истёкшие таймеры
+        и запускает callback(key, payload). Одновременно выполняется не больше
+        concurrency колбэков; если они не успевают, колесо ждёт (это видно по
+        late_max и inflight в get_stats()).
+        """
+        sem = asyncio.Semaphore(concurrency)
+        tasks = set()
+        while True:
+            await asyncio.sleep(self.tick - time.time() % self.tick)
+            started = time.perf_counter()
+            for key, payload, late in self.expire(time.time()):
+                self.stats["fired"] += 1
+                self.stats["late_total"] += late
+                if late > self.stats["late_max"]:
+                    self.stats["late_max"] = late
+                await sem.acquire()
+                self._inflight += 1
+                task = asyncio.create_task(self._fire(callback, key, payload, sem))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            spent = time.perf_counter() - started
+            if spent > self.stats["tick_max"]:
+                self.stats["tick_max"] = spent
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Метрики: сколько таймеров ждёт, сколько колбэков выполняется, опоздания."""
+        stats = dict(self.stats)
+        stats["pending"] = len(self._timers)
+        stats["inflight"] = self._inflight
+        now_tick = self._tick_of(time.time())
+        # таймеры, которые уже должны были сработать, но ещё не сняты
+        stats["overdue"] = sum(1 for t in self._timers.values() if t.tick < now_tick)
+        stats["late_avg"] = stats["late_total"] / stats["fired"] if stats["fired"] else 0.0
+        return stats
@@ -0,0 +1,147 @@
+# services/tournament.py
+import asyncio
+import os
+import random
+import string
+import time
+from typing import Dict, List, Optional, Tuple
+
+MAX_PLAYERS = int(os.getenv("TOURNAMENT_MAX_PLAYERS", "300"))
+_CODE_ALPHABET = string.ascii_uppercase + string.digits
+
+
+class Player:
+    __slots__ = ("id", "name", "lang", "score", "time_total", "sent_at")
+
+    def __init__(self, user_id: int, name: str, lang: str):
+        self.id = user_id
+        self.name = name
+        self.lang = lang
+        self.score = 0
+        # сумма времени верных ответов — для разбивки равных очков
+        self.time_total = 0.0
+        # когда участнику доставлен текущий вопрос (время считается от него)
+        self.sent_at: Optional[float] = None
+
+
+class Tournament:
+    """
+    Состояние одного турнира — только в памяти процесса.
+
+    Ответы текущего вопроса складываются в словарь: первый ответ участника
+    засчитывается, повторные игнорируются. Очки начисляются сразу при ответе,
+    поэтому табло строится из готовых чисел без пересчёта.
+    """
+
+    def __init__(self, code: str, host_id: int, lang: str):
+        self.code = code
+        self.host_id = host_id
+        self.lang = lang
+        self.players: Dict[int, Player] = {}
+        self.questions: List[int] = []
+        self.current = -1
+        self.state = "lobby"  # lobby -> running -> finished
+        self.answers: Dict[int, int] = {}
+        # сообщение-табло у ведущего: (chat_id, message_id)
+        self.board: Optional[Tuple[int, int]] = None
+        # табло изменилось с последнего редактирования
+        self.dirty = False
+        # банк вопросов фиксируется на старте: подмена файла не сдвинет номера посреди игры
+        self.bank = None
+        # взводится, когда на текущий вопрос ответили все
+        self.all_in = asyncio.Event()
+
+    def join(self, user_id: int, name: str, lang: str) -> str:
+        if self.state != "lobby":
+            return "started"
+        if user_id in self.players:
+            return "already"
+        if len(self.players) >= MAX_PLAYERS:
+            return "full"
+        self.players[user_id] = Player(user_id, name, lang)
+        self.dirty = True
+        return "ok"
+
+    def start(self, bank, questions: List[int]):
+        self.bank = bank
+        self.questions = questions
+        self.state = "running"
+
+    def next_question(self) -> Optional[int]:
+        """Перейти к следующему вопросу; номер вопроса в банке или None, если вопросы кончились."""
+        self.current += 1
+        self.answers = {}
+        self.all_in.clear()
+        for p in self.players.values():
+            p.sent_at = None
+        self.dirty = True
+        if self.current >= len(self.questions):
+            return None
+        return self.questions[self.current]
+
+    def answer(self, user_id: int, qnum: int, option: int, correct: bool) -> str:
+        p = self.players.get(user_id)
+        if p is None:
+            return "stranger"
+        if self.state != "running" or qnum != self.current:
+            return "stale"
+        if user_id in self.answers:
+            return "dup"
+        self.answers[user_id] = option
+        if correct:
+            p.score += 1
+            if p.sent_at is not None:
+                p.time_total += time.monotonic() - p.sent_at
+        self.dirty = True
+        if self.all_answered():
+            # run_tournament ждёт это событие: раунд закрывается, не дожидаясь QUESTION_TIME
+            self.all_in.set()
+        return "ok"
+
+    def all_answered(self) -> bool:
+        """На текущий вопрос ответили все участники."""
+        return len(self.answers) >= len(self.players)
+
+    def standings(self) -> List[Player]:
+        return sorted(self.players.values(), key=lambda p: (-p.score, p.time_total, p.id))
+
+    def finish(self):
+        self.state = "finished"
+        self.dirty = True
+
+
+# Активные турниры по коду и код турнира каждого участника
+_tournaments: Dict[str, Tournament] = {}
+_player_of: Dict[int, str] = {}
+
+
+def create(host_id: int, lang: str) -> Tournament:
+    code = "".join(random.choices(_CODE_ALPHABET, k=5))
+    while code in _tournaments:
+        code = "".join(random.choices(_CODE_ALPHABET, k=5))
+    tour = _tournaments[code] = Tournament(code, host_id, lang)
+    return tour
+
+
+def get(code: str) -> Optional[Tournament]:
+    return _tournaments.get((code or "").upper())
+
+
+def join(code: str, user_id: int, name: str, lang: str) -> Tuple[Optional[Tournament], str]:
+    tour = get(code)
+    if tour is None:
+        return None, "unknown"
+    if _player_of.get(user_id) not in (None, tour.code):
+        return tour, "busy"
+    result = tour.join(user_id, name, lang)
+    if result == "ok":
+        _player_of[user_id] = tour.code
+    return tour, result
+
+
+def close(tour: Tournament):
+    tour.finish()
+    for user_id in tour.players:
+        if _player_of.get(user_id) == tour.code:
+            del _player_of[user_id]
+    _tournaments.pop(tour.code, None)
@@ -0,0 +1,121 @@
+# services/usertable.py
+import sys
+from typing import Any, Dict, List, Optional
+
+_LANGS = {lang: sys.intern(lang) for lang in ("ru", "kz", "en")}
+
+
+def intern_lang(lang: Optional[str]) -> str:
+    """Одна общая строка на каждый код языка вместо копии у каждого пользователя."""
+    lang = lang or "ru"
+    return _LANGS.get(lang) or sys.intern(lang)
+
+
+class UserRecord:
+    """
+    Компактная запись пользователя.
+
+    __slots__ вместо dict: нет словаря атрибутов на каждый объект, состояние
+    викторины хранится в самой записи (progress=None — викторины нет; order —
+    номера вопросов сессии в банке), а не во вложенном dict. Редкие/устаревшие
+    поля складываются в extra.
+    Для чтения запись ведёт себя как старый dict: rec.get("lang"), rec["quiz"].
+    """
+
+    __slots__ = ("id", "username", "name", "lang", "progress", "score", "order", "extra")
+
+    def __init__(self, id, username: str = "", name: str = "", lang: str = "ru",
+                 progress: Optional[int] = None, score: int = 0,
+                 extra: Optional[Dict[str, Any]] = None, order: Optional[List[int]] = None):
+        self.id = id
+        self.username = username
+        self.name = name
+        self.lang = intern_lang(lang)
+        self.progress = progress
+        self.score = score
+        self.order = order
+        self.extra = extra or None
+
+    # ----------------- состояние викторины -----------------
+
+    @property
+    def quiz(self) -> Optional[Dict[str, Any]]:
+        if self.progress is None:
+            return None
+        q = {"active": True, "progress": self.progress, "score": self.score}
+        if self.order is not None:
+            q["order"] = self.order
+        return q
+
+    def start_quiz(self, order: Optional[List[int]] = None):
+        """order=None — старый режим: вопросы банка подряд."""
+        self.progress = 0
+        self.score = 0
+        self.order = order
+
+    def stop_quiz(self):
+        self.progress = None
+        self.score = 0
+        self.order = None
+
+    @property
+    def quiz_score(self) -> int:
+        return self.score if self.progress is not None else 0
+
+    # ----------------- совместимость с dict -----------------
+
+    def get(self, field: str, default=None):
+        if field in UserRecord.__slots__ and field not in ("extra", "order"):
+            return getattr(self, field)
+        if field == "quiz":
+            return self.quiz
+        if self.extra:
+            return self.extra.get(field, default)
+        return default
+
+    def __getitem__(self, field: str):
+        sentinel = object()
+        value = self.get(field, sentinel)
+        if value is sentinel:
+            raise KeyError(field)
+        return value
+
+    def set_extra(self, field: str, value):
+        if value is None:
+            if self.extra:
+                self.extra.pop(field, None)
+                if not self.extra:
+                    self.extra = None
+            return
+        if self.extra is None:
+            self.extra = {}
+        self.extra[field] = value
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Формат хранения (тот же, что был у dict-записей)."""
+        d = dict(self.extra) if self.extra else {}
+        d.update({
+            "id": self.id,
+            "username": self.username,
+            "name": self.name,
+            "lang": self.lang,
+            "quiz": self.quiz,
+        })
+        return d
+
+    @classmethod
+    def from_dict(cls, key, d: Dict[str, Any]) -> "UserRecord":
+        q = d.get("quiz")
+        order = None
+        if isinstance(q, dict) and q.get("active", True):
+            progress, score = int(q.get("progress", 0) or 0), int(q.get("score", 0) or 0)
+            if isinstance(q.get("order"), list):
+                order = [int(i) for i in q["order"]]
+        else:
+            progress, score = None, 0
+        extra = {f: v for f, v in d.items() if f not in ("id", "username", "name", "lang", "quiz")}
+        return cls(d.get("id"), d.get("username", "") or "", d.get("name", "") or "",
+                   d.get("lang", "ru"), progress, score, extra, order)
+
+    def __repr__(self) -> str:
+        return f"UserRecord({self.to_dict()!r})"
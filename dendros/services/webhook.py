@@ -0,0 +1,152 @@
+# services/webhook.py
+# Приём апдейтов через вебхук: aiohttp-сервер в том же event loop, что и бот.
+import asyncio
+import hmac
+import logging
+import os
+import secrets
+import signal
+import time
+from typing import Any, Dict, Optional
+
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+from aiohttp import web
+
+from services import health, metrics
+
+# Публичный адрес, который Telegram будет вызывать (https://example.com), и путь на нём
+WEBHOOK_URL = os.getenv("WEBHOOK_URL", "")
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/webhook")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")
+HOST = os.getenv("WEBHOOK_HOST", "0.0.0.0")
+# Тот же порт, что у проверок живости: в режиме вебхука они на одном сервере
+PORT = health.PORT
+# Сколько апдейтов обрабатывается одновременно; сверх этого запрос Telegram ждёт ответа
+CONCURRENCY = int(os.getenv("WEBHOOK_CONCURRENCY", "64"))
+# Сколько параллельных соединений Telegram открывает к вебхуку (1..100)
+MAX_CONNECTIONS = int(os.getenv("WEBHOOK_MAX_CONNECTIONS", "40"))
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+logger = logging.getLogger(__name__)
+
+
+class WebhookServer:
+    """
+    Принимает POST от Telegram на WEBHOOK_PATH и кормит апдейты диспетчеру.
+
+    Секрет из заголовка сверяется за постоянное время; без совпадения — 401.
+    Апдейт обрабатывается в фоне, а ответ 200 уходит сразу, но только после
+    того, как нашёлся свободный слот из CONCURRENCY: при перегрузке Telegram
+    просто ждёт ответа и не открывает новых соединений сверх max_connections.
+    На том же порту — проверки живости и готовности и /metrics (services/health.py).
+    """
+
+    def __init__(self, dp: Dispatcher, bot: Bot, secret: str = WEBHOOK_SECRET, path: str = WEBHOOK_PATH,
+                 concurrency: int = CONCURRENCY, **handler_kwargs: Any):
+        self.dp = dp
+        self.bot = bot
+        self.secret = secret
+        self.path = path
+        self.handler_kwargs = handler_kwargs
+        self._sem = asyncio.Semaphore(concurrency)
+        self._tasks: set = set()
+        self._started = time.monotonic()
+        self.stats = {"received": 0, "processed": 0, "failed": 0, "rejected": 0, "waited": 0}
+        self.app = web.Application()
+        self.app.router.add_post(path, self.handle_update)
+        health.add_routes(self.app)
+        self._runner: Optional[web.AppRunner] = None
+
+    # ---------- HTTP ----------
+
+    async def handle_update(self, request: web.Request) -> web.Response:
+        if self.secret and not hmac.compare_digest(request.headers.get(SECRET_HEADER, ""), self.secret):
+            self.stats["rejected"] += 1
+            return web.Response(status=401)
+        try:
+            update = Update.model_validate(await request.json(), context={"bot": self.bot})
+        except Exception:
+            logger.warning("Malformed webhook payload from %s", request.remote)
+            return web.Response(status=400)
+        self.stats["received"] += 1
+        if self._sem.locked():
+            self.stats["waited"] += 1
+        await self._sem.acquire()
+        task = asyncio.create_task(self._process(update))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return web.Response()
+
+    # ---------- обработка ----------
+
+    async def _process(self, update: Update):
+        try:
+            await self.dp.feed_update(self.bot, update, **self.handler_kwargs)
+            self.stats["processed"] += 1
+        except Exception:
+            self.stats["failed"] += 1
+            logger.exception("Failed to process update %s", update.update_id)
+        finally:
+            self._sem.release()
+
+    # ---------- жизненный цикл ----------
+
+    async def start(self, host: str = HOST, port: int = PORT):
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+        logger.info("Webhook server listening on %s:%s%s", host, port, self.path)
+
+    async def stop(self, timeout: float = 10.0):
+        """Перестать принимать запросы и дождаться апдейтов, которые уже в работе."""
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+        if self._tasks:
+            await asyncio.wait(set(self._tasks), timeout=timeout)
+
+    def get_stats(self) -> Dict[str, Any]:
+        s = dict(self.stats)
+        s["in_flight"] = len(self._tasks)
+        s["uptime"] = round(time.monotonic() - self._started, 1)
+        return s
+
+
+async def run_webhook(dp: Dispatcher, bot: Bot, **kwargs: Any):
+    """
+    Режим вебхука вместо start_polling: поднять сервер, зарегистрировать вебхук
+    и работать до SIGINT/SIGTERM. Вебхук при остановке не удаляется — Telegram
+    копит апдейты до следующего запуска.
+    """
+    if not WEBHOOK_URL:
+        raise RuntimeError("WEBHOOK_URL is required for BOT_MODE=webhook")
+    # вебхук регистрируется при каждом запуске, поэтому без WEBHOOK_SECRET годится случайный
+    secret = WEBHOOK_SECRET or secrets.token_urlsafe(32)
+    server = WebhookServer(dp, bot, secret=secret, **kwargs)
+    metrics.register("webhook", server.get_stats)
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except (NotImplementedError, RuntimeError):
+            # Windows: остаётся KeyboardInterrupt
+            pass
+
+    await dp.emit_startup(bot=bot, **dp.workflow_data)
+    await server.start()
+    try:
+        await bot.set_webhook(
+            WEBHOOK_URL.rstrip("/") + WEBHOOK_PATH,
+            secret_token=secret,
+            allowed_updates=dp.resolve_used_update_types(),
+            max_connections=MAX_CONNECTIONS,
+        )
+        logger.info("Webhook set to %s%s", WEBHOOK_URL.rstrip("/"), WEBHOOK_PATH)
+        await stop.wait()
+    finally:
+        await server.stop()
+        logger.info("Webhook stats: %s", server.get_stats())
+        await dp.emit_shutdown(bot=bot, **dp.workflow_data)
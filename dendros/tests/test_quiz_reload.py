@@ -0,0 +1,91 @@
+# tests/test_quiz_reload.py
+# Перезагрузка банка викторины посреди сессии: номера вопросов, сохранённые в
+# сессии и метках seen, не должны молча указывать на другие вопросы.
+# Запуск из корня проекта: python -m pytest -q tests
+import asyncio
+import json
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+# изменения пользователей остаются в памяти и не трогают data/
+os.environ.setdefault("DB_WRITE_BEHIND", "1")
+
+from services import db, quiz_bank  # noqa: E402
+from services.quiz_bank import QuizAnswer  # noqa: E402
+from handlers.quiz import SESSION_SIZE, current_question  # noqa: E402
+
+USER = 9_900_000_001
+
+
+def question(n: int, answer: str = "a") -> dict:
+    return {"q": {"ru": f"Вопрос {n}"}, "opts": {"ru": ["a", "b"]}, "a": {"ru": answer}}
+
+
+def load(monkeypatch, path: Path, questions: list) -> quiz_bank.QuizBank:
+    path.write_text(json.dumps(questions, ensure_ascii=False), encoding="utf-8")
+    monkeypatch.setattr(quiz_bank, "QUIZ_FILE", str(path))
+    return asyncio.run(quiz_bank.refresh_bank(force=True))
+
+
+def start(bank: quiz_bank.QuizBank):
+    seen = db.get_seen(USER, bank.layout)
+    order = bank.sample("ru", SESSION_SIZE, seen)
+    db.start_quiz(USER, order, seen, layout=bank.layout)
+
+
+def test_reordered_bank_closes_session_and_resets_seen(monkeypatch, tmp_path):
+    path = tmp_path / "quiz_data.json"
+    questions = [question(n) for n in range(5)]
+    bank = load(monkeypatch, path, questions)
+    start(bank)
+    db.advance_quiz(USER, correct=True)
+    idx, state, _ = current_question(USER)
+    assert idx is not None and not state.get("outdated")
+    shown = bank.key(idx)
+
+    reordered = load(monkeypatch, path, questions[::-1])
+    assert reordered.layout != bank.layout
+    # прежний номер в новом банке — уже другой вопрос
+    assert reordered.key(idx) != shown
+    idx, state, _ = current_question(USER)
+    assert idx is None and state["outdated"] and state["score"] == 1
+    # метки просмотренных относились к старой раскладке
+    assert not db.get_seen(USER, reordered.layout)
+    db.stop_quiz(USER)
+
+
+def test_inserted_question_closes_session(monkeypatch, tmp_path):
+    path = tmp_path / "quiz_data.json"
+    questions = [question(n) for n in range(5)]
+    start(load(monkeypatch, path, questions))
+    load(monkeypatch, path, [question(99)] + questions)
+    idx, state, _ = current_question(USER)
+    assert idx is None and state["outdated"]
+    db.stop_quiz(USER)
+
+
+def test_edited_answer_keeps_session(monkeypatch, tmp_path):
+    path = tmp_path / "quiz_data.json"
+    questions = [question(n) for n in range(5)]
+    bank = load(monkeypatch, path, questions)
+    start(bank)
+    idx, _, _ = current_question(USER)
+
+    # ответ поправлен, порядок вопросов прежний — сессия и метки остаются
+    edited = load(monkeypatch, path, [question(n, answer="b") for n in range(5)])
+    assert edited.layout == bank.layout
+    assert current_question(USER)[0] == idx
+    assert db.get_seen(USER, edited.layout)
+    db.stop_quiz(USER)
+
+
+def test_inline_button_carries_question_key(monkeypatch, tmp_path):
+    path = tmp_path / "quiz_data.json"
+    bank = load(monkeypatch, path, [question(n) for n in range(3)])
+    button = bank.view(2, "ru").inline_keyboard.inline_keyboard[0][0]
+    data = QuizAnswer.unpack(button.callback_data)
+    assert data.k == bank.key(2) and data.o == 0
+    # после перестановки кнопка по-прежнему указывает на свой вопрос
+    assert load(monkeypatch, path, [question(n) for n in (2, 0, 1)]).find(data.k) == 0